@@ -0,0 +1,186 @@
+"""
+Asyncio front-end for streaming pose sessions
+Runs PoseDetector.process_frame off the event loop with drop-stale backpressure
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from src.buffer_pool import get_memory_budget
+from src.pose_detector import PoseDetector
+from src.resource_manager import get_resource_manager
+
+
+# Shared executor so many sessions multiplex onto a fixed number of threads
+_shared_executor = None
+
+
+def get_shared_executor(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """Get (or create) the bounded executor shared by all async sessions"""
+    global _shared_executor
+    if _shared_executor is None:
+        # Container-aware: a 2-CPU pod on a 64-core host gets 1 worker, not 63;
+        # each worker pins itself to its own core
+        _shared_executor = get_resource_manager().create_executor(max_workers, "pose-session")
+    return _shared_executor
+
+
+class SessionResult(NamedTuple):
+    timestamp: float
+    image: np.ndarray
+    rep_complete: bool
+    feedback: str
+    rep_count: int
+
+
+_END_OF_STREAM = object()
+
+
+class AsyncPoseSession:
+    """
+    One client video stream processed asynchronously.
+
+    Only the newest submitted frame is kept while a frame is being processed;
+    older pending frames are dropped so latency never builds up.
+    Results are read with `async for result in session`.
+    """
+
+    def __init__(self, exercise_type: str, detector: Optional[PoseDetector] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, result_buffer: int = 32):
+        # Refuse new sessions before memory pressure turns into an OOM kill
+        if not get_memory_budget().admit():
+            raise RuntimeError("Memory budget exhausted; not accepting new sessions")
+
+        self.exercise_type = exercise_type
+        # Counted in before the detector is built, so its inference threads fit the new load
+        self.resources = get_resource_manager()
+        self.resources.add_session()
+        try:
+            self.detector = detector or PoseDetector()
+        except Exception:
+            self.resources.remove_session()
+            raise
+        self.executor = executor or get_shared_executor()
+
+        # Frame waiting for the worker (at most one - newer frames replace it)
+        self._pending = None
+        self._wakeup = asyncio.Event()
+        self._worker_task = None
+        self._inflight = None
+        self._results = asyncio.Queue()
+        self._result_buffer = result_buffer
+        self._closed = False
+        self._closing = None  # shutdown task, started by the first close()
+
+        self.frames_submitted = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.results_dropped = 0
+
+    async def submit(self, frame: np.ndarray, ts: float):
+        """Queue a frame for processing, replacing any frame still waiting"""
+        if self._closed:
+            raise RuntimeError("Session is closed")
+
+        if self._pending is not None:
+            self.frames_dropped += 1
+        self._pending = (frame, ts)
+        self.frames_submitted += 1
+        self._wakeup.set()
+
+        if self._worker_task is None:
+            self._worker_task = asyncio.get_running_loop().create_task(self._run())
+
+        # Give the worker a chance to pick the frame up
+        await asyncio.sleep(0)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            if self._pending is None:
+                continue
+            frame, ts = self._pending
+            self._pending = None
+
+            self._inflight = loop.run_in_executor(
+                self.executor, self.detector.process_frame, frame, self.exercise_type, ts
+            )
+            queued = False
+            try:
+                # Shielded so cancelling the worker never abandons a frame mid-inference
+                image, rep_complete, feedback, count = await asyncio.shield(self._inflight)
+                self.frames_processed += 1
+                self._push_result(SessionResult(ts, image, rep_complete, feedback, count))
+                queued = True
+            finally:
+                if not queued:
+                    # Cancelled mid-inference: nobody will read this frame, so its image goes back to the pool
+                    self._inflight.add_done_callback(self._release_unqueued)
+            self._inflight = None
+
+    def _release_unqueued(self, inflight):
+        if not inflight.cancelled() and inflight.exception() is None:
+            self.detector.release_frame(inflight.result()[0])
+
+    def _push_result(self, result):
+        # Slow consumer: drop the oldest result instead of growing without bound
+        if self._results.qsize() >= self._result_buffer:
+            dropped = self._results.get_nowait()
+            self.detector.release_frame(dropped.image)
+            self.results_dropped += 1
+        self._results.put_nowait(result)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> SessionResult:
+        if self._closed and self._results.empty():
+            raise StopAsyncIteration
+        result = await self._results.get()
+        if result is _END_OF_STREAM:
+            raise StopAsyncIteration
+        return result
+
+    async def close(self):
+        """Stop processing, wait for the in-flight frame and release the detector"""
+        if self._closing is None:
+            self._closed = True
+            self._pending = None
+            if self._worker_task is not None:
+                self._worker_task.cancel()
+            # Its own task, so cancelling close() can't skip the release or the end-of-stream marker
+            self._closing = asyncio.get_running_loop().create_task(self._shutdown())
+        await asyncio.shield(self._closing)
+
+    async def _shutdown(self):
+        try:
+            if self._worker_task is not None:
+                try:
+                    await self._worker_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+            # The detector may still be busy in the executor - never close it under the worker
+            if self._inflight is not None:
+                try:
+                    await self._inflight
+                except Exception:
+                    pass
+                self._inflight = None
+        finally:
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.detector.release)
+            finally:
+                self.resources.remove_session()
+                self._results.put_nowait(_END_OF_STREAM)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
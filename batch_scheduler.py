@@ -0,0 +1,227 @@
+"""
+Cross-camera batched inference
+Collects the newest frame from every active stream, runs them through the
+pose backend as one micro-batch under a latency deadline, and hands each
+stream's landmarks back to its own detector state.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from src.buffer_pool import get_memory_budget
+from src.inference_backend import PoseBackend, create_backend
+from src.pose_detector import PoseDetector
+from src.resource_manager import get_resource_manager
+from src.system_utils import SystemOptimizer
+
+
+class StreamResult(NamedTuple):
+    stream_id: str
+    timestamp: float
+    landmarks: Optional[np.ndarray]
+    rep_complete: bool
+    feedback: str
+    rep_count: int
+
+
+class Stream:
+    """One camera feed: its detector state and at most one frame waiting for inference"""
+
+    def __init__(self, stream_id: str, exercise_type: str, detector: PoseDetector,
+                 on_result: Optional[Callable[[StreamResult], None]]):
+        self.stream_id = stream_id
+        self.exercise_type = exercise_type
+        self.detector = detector
+        self.on_result = on_result
+        self.pending = None  # (frame, timestamp, arrival)
+        self.frame = None  # frame taken into the current batch
+        self.timestamp = None
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+
+
+class BatchScheduler:
+    """
+    Shares one stateless (e.g. ONNX Runtime) backend between many streams.
+
+    `submit()` may be called from any thread (one per camera); newer frames
+    replace a stream's pending frame. A batch is formed when every active
+    stream has a frame waiting, when `max_batch` frames are waiting, or when
+    the oldest waiting frame is `deadline` seconds old. Frames a stream's
+    motion gate considers unchanged skip inference and reuse that stream's
+    previous landmarks.
+    """
+
+    def __init__(self, backend: Optional[PoseBackend] = None, max_batch: int = 32,
+                 deadline: float = 0.020, settings: Optional[Dict] = None):
+        if settings is None:
+            settings = SystemOptimizer().get_optimal_settings()
+        self.settings = settings
+        self.resources = get_resource_manager()
+        # One batch runs at a time, so the shared backend may use the whole CPU budget
+        self.backend = backend or create_backend(self.resources.inference_settings(settings, active_sessions=1))
+        if not self.backend.stateless:
+            # MediaPipe models track one video between calls; mixing cameras would corrupt that
+            raise ValueError(f"The {self.backend.name} backend cannot be shared between streams; "
+                             f"configure a stateless backend such as onnx_model_path")
+        self.max_batch = max_batch
+        self.deadline = deadline
+
+        self.streams = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._stopping = False
+
+        self.batches = 0
+        self.frames_inferred = 0
+        self.frames_gated = 0
+
+        if not self.backend.supports_batch:
+            print(f"⚠️  The pose model has a fixed batch size of {self.backend.batch_size}; "
+                  f"batches run in chunks of that size")
+
+    # ------------------
+    # Streams
+    # ------------------
+    def add_stream(self, stream_id: str, exercise_type: str,
+                   on_result: Optional[Callable[[StreamResult], None]] = None,
+                   detector: Optional[PoseDetector] = None) -> Stream:
+        if not get_memory_budget().admit():
+            raise RuntimeError("Memory budget exhausted; not accepting new streams")
+        # Inference happens here, so per-stream detectors never load a model
+        detector = detector or PoseDetector(settings=self.settings, load_model=False)
+        stream = Stream(stream_id, exercise_type, detector, on_result)
+        with self._cond:
+            replaced = self.streams.get(stream_id)
+            self.streams[stream_id] = stream
+        if replaced is None:
+            self.resources.add_session()
+        return stream
+
+    def remove_stream(self, stream_id: str):
+        with self._cond:
+            removed = self.streams.pop(stream_id, None)
+        if removed is not None:
+            self.resources.remove_session()
+
+    def submit(self, stream_id: str, frame: np.ndarray, timestamp: Optional[float] = None):
+        """Hand over a stream's newest frame (replaces any frame still waiting)"""
+        if timestamp is None:
+            timestamp = time.time()
+        with self._cond:
+            stream = self.streams[stream_id]
+            if stream.pending is not None:
+                stream.frames_dropped += 1
+            stream.pending = (frame, timestamp, time.monotonic())
+            stream.frames_submitted += 1
+            self._cond.notify()
+
+    # ------------------
+    # Batching
+    # ------------------
+    def _waiting(self) -> List[Stream]:
+        return [stream for stream in self.streams.values() if stream.pending is not None]
+
+    def _collect(self, timeout: Optional[float]) -> List[Stream]:
+        """Block until a batch is due; returns the streams in it (oldest frame first)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._waiting() or self._stopping, timeout):
+                return []
+            waiting = self._waiting()
+            if not waiting:
+                return []
+
+            due = min(stream.pending[2] for stream in waiting) + self.deadline
+            while len(waiting) < min(self.max_batch, len(self.streams)) and not self._stopping:
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                waiting = self._waiting()
+
+            waiting.sort(key=lambda stream: stream.pending[2])
+            batch = waiting[:self.max_batch]
+            # Take the frames now so newer submissions start the next batch
+            for stream in batch:
+                stream.frame, stream.timestamp, _ = stream.pending
+                stream.pending = None
+            return batch
+
+    def run_once(self, timeout: Optional[float] = None) -> int:
+        """Form and process one batch; returns the number of streams served"""
+        batch = self._collect(timeout)
+        if not batch:
+            return 0
+
+        to_infer = [stream for stream in batch
+                    if stream.detector.motion_gate.should_infer(stream.frame, stream.timestamp)]
+        if to_infer:
+            poses = self.backend.infer_batch([stream.frame for stream in to_infer],
+                                             [stream.timestamp for stream in to_infer])
+            for stream, landmarks, world in zip(to_infer, poses, self.backend.last_world_batch):
+                stream.detector.last_pose = landmarks
+                stream.detector.last_world_pose = world
+            self.batches += 1
+            self.frames_inferred += len(to_infer)
+        self.frames_gated += len(batch) - len(to_infer)
+
+        for stream in batch:
+            self._dispatch(stream)
+            stream.frame = None
+        return len(batch)
+
+    def _dispatch(self, stream: Stream):
+        detector = stream.detector
+        landmarks = detector.last_pose
+        rep_complete, feedback = False, ""
+        if landmarks is not None:
+            rep_complete, feedback = detector.process_landmarks(landmarks, stream.exercise_type,
+                                                                stream.timestamp, detector.last_world_pose)
+        if stream.on_result is not None:
+            stream.on_result(StreamResult(stream.stream_id, stream.timestamp, landmarks,
+                                          rep_complete, feedback, detector.rep_count))
+
+    # ------------------
+    # Background thread
+    # ------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="pose-batch-scheduler", daemon=True)
+        self._thread.start()
+        print(f"✅ Batch scheduler started (max batch {self.max_batch}, deadline {self.deadline * 1000:.0f} ms)")
+
+    def _loop(self):
+        while self._running:
+            try:
+                self.run_once(timeout=0.5)
+            except Exception as e:
+                print(f"❌ Batch inference error: {e}")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def release(self):
+        self.stop()
+        self.backend.close()
+
+    def stats(self) -> Dict:
+        return {
+            "streams": len(self.streams),
+            "batches": self.batches,
+            "frames_inferred": self.frames_inferred,
+            "frames_gated": self.frames_gated,
+            "avg_batch": self.frames_inferred / self.batches if self.batches else 0.0,
+            "frames_dropped": sum(stream.frames_dropped for stream in self.streams.values()),
+        }
@@ -0,0 +1,218 @@
+"""
+Frame buffer pool and memory budget
+Reuses frame-sized arrays instead of allocating new ones at 30 fps per stream,
+and watches the process RSS so sessions degrade (lower inference resolution,
+no new sessions admitted) before the OOM killer steps in.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.system_utils import get_cgroup_memory_limit_mb, get_total_memory_mb
+
+
+class FramePool:
+    """
+    Free lists of arrays keyed by (shape, dtype).
+
+    `acquire()` hands out a pooled array (or a new one when the list is
+    empty); `release()` gives it back once the caller is done with it.
+    Only arrays this pool handed out are taken back, and arrays that are
+    never released are simply garbage collected.
+    """
+
+    def __init__(self, max_free_per_key: int = 4):
+        self.max_free_per_key = max_free_per_key
+        self._free = defaultdict(list)
+        self._issued = {}  # id -> weakref of arrays currently handed out
+        # Re-entrant: a weakref callback may fire while the lock is held
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                array = free.pop()
+                self.hits += 1
+            else:
+                array = np.empty(shape, dtype=dtype)
+                self.misses += 1
+            key_id = id(array)
+            self._issued[key_id] = weakref.ref(array, lambda _, k=key_id: self._forget(k))
+        return array
+
+    def _forget(self, key_id: int):
+        with self._lock:
+            self._issued.pop(key_id, None)
+
+    def release(self, array: Optional[np.ndarray]) -> bool:
+        """Return an array from `acquire()`; anything else is ignored"""
+        if array is None:
+            return False
+        with self._lock:
+            ref = self._issued.get(id(array))
+            if ref is None or ref() is not array:
+                return False
+            del self._issued[id(array)]
+            free = self._free[(array.shape, array.dtype.str)]
+            if len(free) < self.max_free_per_key:
+                free.append(array)
+            return True
+
+    # ------------------
+    # Pooled versions of the per-frame allocations
+    # ------------------
+    def copy(self, frame: np.ndarray) -> np.ndarray:
+        image = self.acquire(frame.shape, frame.dtype)
+        np.copyto(image, frame)
+        return image
+
+    def cvt_color(self, frame: np.ndarray, code: int) -> np.ndarray:
+        """cv2.cvtColor for 3-channel conversions (BGR<->RGB) into a pooled buffer"""
+        dst = self.acquire(frame.shape, frame.dtype)
+        return cv2.cvtColor(frame, code, dst=dst)
+
+    def resize(self, frame: np.ndarray, scale: float,
+               interpolation: int = cv2.INTER_AREA) -> np.ndarray:
+        h, w = frame.shape[:2]
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        dst = self.acquire((size[1], size[0]) + frame.shape[2:], frame.dtype)
+        return cv2.resize(frame, size, dst=dst, interpolation=interpolation)
+
+    def clear(self):
+        """Drop every free buffer (arrays still handed out are unaffected)"""
+        with self._lock:
+            self._free.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "free_buffers": sum(len(free) for free in self._free.values()),
+                "free_mb": sum(a.nbytes for free in self._free.values() for a in free) / 2 ** 20,
+                "in_use": len(self._issued),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def get_rss_mb() -> Optional[float]:
+    """Resident set size of this process from /proc/self/statm (Linux), or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class MemoryBudget:
+    """
+    Per-process RSS budget with two thresholds.
+
+    Above `degrade_ratio` of the budget inference runs at `degraded_scale`
+    resolution and no new sessions are admitted; above `critical_ratio`
+    free pool buffers are dropped as well. RSS is sampled at most every
+    `interval` seconds.
+    """
+    LEVELS = ("ok", "degraded", "critical")
+
+    def __init__(self, budget_mb: Optional[float] = None, degrade_ratio: float = 0.75,
+                 critical_ratio: float = 0.9, degraded_scale: float = 0.5,
+                 session_estimate_mb: float = 150, interval: float = 1.0,
+                 pool: Optional[FramePool] = None):
+        if budget_mb is None:
+            # Leave 20% of the container (or machine) for everything else
+            known = [m for m in (get_cgroup_memory_limit_mb(), get_total_memory_mb()) if m is not None]
+            budget_mb = min(known) * 0.8 if known else None
+        self.budget_mb = budget_mb
+        self.degrade_ratio = degrade_ratio
+        self.critical_ratio = critical_ratio
+        self.degraded_scale = degraded_scale
+        self.session_estimate_mb = session_estimate_mb
+        self.interval = interval
+        self.pool = pool
+
+        self.rss_mb = None
+        self.level = "ok"
+        self._last_sample = None
+        self._lock = threading.Lock()
+
+    def sample(self, now: Optional[float] = None) -> str:
+        """Re-read RSS if the last sample is stale; returns the current level"""
+        if self.budget_mb is None:
+            return self.level
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last_sample is not None and now - self._last_sample < self.interval:
+                return self.level
+            self._last_sample = now
+            self.rss_mb = get_rss_mb()
+            if self.rss_mb is None:
+                return self.level
+
+            usage = self.rss_mb / self.budget_mb
+            if usage >= self.critical_ratio:
+                level = "critical"
+            elif usage >= self.degrade_ratio:
+                level = "degraded"
+            else:
+                level = "ok"
+            changed = level != self.level
+            self.level = level
+
+        if changed:
+            icon = "✅" if level == "ok" else "⚠️ "
+            print(f"{icon} Memory {level}: RSS {self.rss_mb:.0f} MB of {self.budget_mb:.0f} MB budget")
+        if level == "critical" and self.pool is not None:
+            self.pool.clear()
+        return level
+
+    def inference_scale(self) -> float:
+        """Resolution factor for frames handed to the pose model"""
+        return 1.0 if self.sample() == "ok" else self.degraded_scale
+
+    def admit(self) -> bool:
+        """Whether one more session fits in the budget"""
+        if self.budget_mb is None:
+            return True
+        if self.sample() != "ok":
+            return False
+        if self.rss_mb is None:
+            return True
+        return self.rss_mb + self.session_estimate_mb <= self.budget_mb * self.degrade_ratio
+
+    def stats(self) -> Dict:
+        return {
+            "rss_mb": self.rss_mb,
+            "budget_mb": self.budget_mb,
+            "level": self.level,
+        }
+
+
+# Process-wide instances: RSS is per process, and buffers are shared by all sessions
+_frame_pool = None
+_memory_budget = None
+
+
+def get_frame_pool() -> FramePool:
+    global _frame_pool
+    if _frame_pool is None:
+        _frame_pool = FramePool()
+    return _frame_pool
+
+
+def get_memory_budget(budget_mb: Optional[float] = None) -> MemoryBudget:
+    """Get (or create) the process-wide memory budget"""
+    global _memory_budget
+    if _memory_budget is None:
+        _memory_budget = MemoryBudget(budget_mb, pool=get_frame_pool())
+    return _memory_budget
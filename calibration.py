@@ -0,0 +1,235 @@
+"""
+Offline threshold calibration
+Replays a labelled corpus of landmark traces through the rep counters for a
+grid of DETECTOR_THRESHOLDS overrides, in parallel across cores, and reports
+rep-count accuracy and false-rep rates for every setting.
+
+Usage:
+    python -m src.calibration corpus_dir squat --grid up_angle=150,160,170 --grid down_angle=90,100,110
+"""
+import argparse
+import glob
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from src.pose_detector import DETECTOR_THRESHOLDS, HOLD_EXERCISES, PoseDetector
+from src.system_utils import SystemOptimizer, get_usable_cpus
+from src.vector_engine import EXERCISE_SIGNALS, BatchRepEngine
+
+
+class LabelledTrace(NamedTuple):
+    name: str
+    exercise_type: str
+    timestamps: np.ndarray          # (T,)
+    landmarks: np.ndarray           # (T, 33, 4)
+    reps: int                       # true rep count
+    rep_times: Optional[np.ndarray] = None  # true rep completion times, if annotated
+
+
+def load_trace(path: str) -> LabelledTrace:
+    """
+    Load one .npz trace with arrays `landmarks`, `timestamps`, `exercise`,
+    `reps` and optionally `rep_times`
+    """
+    with np.load(path) as data:
+        return LabelledTrace(
+            name=os.path.splitext(os.path.basename(path))[0],
+            exercise_type=str(data["exercise"]),
+            timestamps=data["timestamps"].astype(np.float64),
+            landmarks=data["landmarks"].astype(np.float32),
+            reps=int(data["reps"]),
+            rep_times=data["rep_times"] if "rep_times" in data.files else None,
+        )
+
+
+def load_corpus(directory: str, exercise_type: Optional[str] = None) -> List[LabelledTrace]:
+    traces = [load_trace(path) for path in sorted(glob.glob(os.path.join(directory, "*.npz")))]
+    if exercise_type is not None:
+        traces = [trace for trace in traces if trace.exercise_type == exercise_type]
+    return traces
+
+
+def traces_from_archive(archive, labels: Dict[str, int]) -> List[LabelledTrace]:
+    """Traces for archived sessions (a SessionArchive) with hand-counted reps by session id"""
+    traces = []
+    for index in range(len(archive.sessions)):
+        info = archive.session_info(index)
+        if info["session_id"] not in labels:
+            continue
+        if info["exercise"] is None:
+            print(f"⚠️  Skipping session {info['session_id']}: unknown exercise")
+            continue
+        frames = archive.session_frames(index)
+        traces.append(LabelledTrace(info["session_id"], info["exercise"],
+                                    np.array(frames["timestamp"]), np.array(frames["landmarks"]),
+                                    labels[info["session_id"]]))
+    return traces
+
+
+def check_rep_exercise(exercise_type: str):
+    """Holds (e.g. wall-sit) never complete a rep, so a sweep over them has nothing to score"""
+    if exercise_type in HOLD_EXERCISES:
+        raise ValueError(f"{exercise_type} is a hold with no reps to count; it cannot be calibrated")
+
+
+def threshold_grid(exercise_type: str, values: Dict[str, Iterable[float]]) -> List[Dict]:
+    """Every combination of the given threshold values (other thresholds keep their defaults)"""
+    check_rep_exercise(exercise_type)
+    unknown = set(values) - set(DETECTOR_THRESHOLDS.get(exercise_type, {}))
+    if unknown:
+        raise ValueError(f"Unknown {exercise_type} thresholds: {', '.join(sorted(unknown))}")
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(values[n] for n in names))]
+
+
+# ------------------
+# Replay (runs in worker processes)
+# ------------------
+def _replay_vectorized(trace: LabelledTrace, grid: List[Dict]) -> List[np.ndarray]:
+    """All settings at once: one BatchRepEngine slot per setting"""
+    n = len(grid)
+    overrides = {name: np.array([setting[name] for setting in grid], dtype=np.float64)
+                 for name in grid[0]}
+    engine = BatchRepEngine(trace.exercise_type, capacity=n, thresholds=overrides)
+    slots = np.array([engine.add_session() for _ in range(n)])
+
+    completed = np.zeros((len(trace.timestamps), n), dtype=bool)
+    for i, (timestamp, landmarks) in enumerate(zip(trace.timestamps, trace.landmarks)):
+        completed[i] = engine.step(np.broadcast_to(landmarks, (n,) + landmarks.shape), slots, timestamp)
+    return [trace.timestamps[completed[:, k]] for k in range(n)]
+
+
+def _replay_detector(trace: LabelledTrace, grid: List[Dict], settings: Dict) -> List[np.ndarray]:
+    """Exercises without a vectorized state machine: one model-less detector per setting"""
+    detector = PoseDetector(settings=settings, load_model=False)
+    rep_times = []
+    for setting in grid:
+        detector.reset()
+        detector.thresholds[trace.exercise_type].update(setting)
+        detector.form.recompile()
+        times = [timestamp for timestamp, landmarks in zip(trace.timestamps, trace.landmarks)
+                 if detector.process_landmarks(landmarks, trace.exercise_type, timestamp)[0]]
+        rep_times.append(np.array(times))
+    return rep_times
+
+
+def uses_engine(exercise_type: str) -> bool:
+    """
+    Whether BatchRepEngine has a state machine for this exercise. It smooths
+    the same gates as the detector, so both replays give the same rep times.
+    """
+    return exercise_type in EXERCISE_SIGNALS
+
+
+def _replay(job) -> List[np.ndarray]:
+    trace, grid, settings = job
+    if uses_engine(trace.exercise_type):
+        return _replay_vectorized(trace, grid)
+    return _replay_detector(trace, grid, settings)
+
+
+# ------------------
+# Scoring
+# ------------------
+def match_reps(detected: np.ndarray, truth: np.ndarray, window: float) -> int:
+    """Detected reps within `window` seconds of a distinct true rep (greedy, in time order)"""
+    matched, j = 0, 0
+    for t in truth:
+        while j < len(detected) and detected[j] < t - window:
+            j += 1
+        if j < len(detected) and detected[j] <= t + window:
+            matched += 1
+            j += 1
+    return matched
+
+
+def score(traces: List[LabelledTrace], grid: List[Dict], results: List[List[np.ndarray]],
+          match_window: float = 1.0) -> List[Dict]:
+    report = []
+    for k, setting in enumerate(grid):
+        exact = abs_error = counted = true_total = false_reps = 0
+        for trace, rep_times in zip(traces, results):
+            detected = rep_times[k]
+            exact += len(detected) == trace.reps
+            abs_error += abs(len(detected) - trace.reps)
+            counted += len(detected)
+            true_total += trace.reps
+            if trace.rep_times is not None:
+                false_reps += len(detected) - match_reps(detected, trace.rep_times, match_window)
+            else:
+                # Without rep times, only over-counting is known to be false
+                false_reps += max(0, len(detected) - trace.reps)
+        report.append({
+            "thresholds": setting,
+            "accuracy": exact / len(traces),
+            "mean_abs_error": abs_error / len(traces),
+            "false_rep_rate": false_reps / counted if counted else 0.0,
+            "recall": (counted - false_reps) / true_total if true_total else 0.0,
+        })
+    report.sort(key=lambda row: (-row["accuracy"], row["false_rep_rate"], row["mean_abs_error"]))
+    return report
+
+
+def calibrate(traces: List[LabelledTrace], grid: List[Dict], settings: Optional[Dict] = None,
+              workers: Optional[int] = None, match_window: float = 1.0) -> List[Dict]:
+    """Replay every trace for every setting (one trace per task) and return the ranked report"""
+    if not traces:
+        raise ValueError("No traces to calibrate against")
+    unknown = sorted({trace.name for trace in traces if trace.exercise_type not in DETECTOR_THRESHOLDS})
+    if unknown:
+        raise ValueError(f"Traces without calibratable exercise: {', '.join(unknown)}")
+    for exercise_type in sorted({trace.exercise_type for trace in traces}):
+        check_rep_exercise(exercise_type)
+    if settings is None:
+        settings = SystemOptimizer().get_optimal_settings()
+
+    workers = workers or get_usable_cpus()
+    jobs = [(trace, grid, settings) for trace in traces]
+    print(f"🎯 Calibrating {len(grid)} settings on {len(traces)} traces ({workers} workers)")
+    if workers == 1:
+        results = [_replay(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_replay, jobs))
+    return score(traces, grid, results, match_window)
+
+
+def print_report(report: List[Dict], top: int = 10):
+    print(f"\n{'=' * 50}")
+    print(f"📊 CALIBRATION RESULTS (top {min(top, len(report))} of {len(report)})")
+    print(f"{'=' * 50}")
+    for row in report[:top]:
+        thresholds = ", ".join(f"{name}={value:g}" for name, value in row["thresholds"].items())
+        print(f"{row['accuracy'] * 100:5.1f}% exact | false reps {row['false_rep_rate'] * 100:4.1f}% | "
+              f"MAE {row['mean_abs_error']:.2f} | {thresholds}")
+    print(f"{'=' * 50}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep detector thresholds over a labelled trace corpus")
+    parser.add_argument("corpus", help="directory of .npz traces")
+    parser.add_argument("exercise", help="exercise id, e.g. squat")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="threshold values to sweep (repeatable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    values = {}
+    for spec in args.grid:
+        name, _, raw = spec.partition("=")
+        values[name] = [float(v) for v in raw.split(",")]
+    if not values:
+        parser.error("give at least one --grid NAME=V1,V2,...")
+
+    grid = threshold_grid(args.exercise, values)
+    traces = load_corpus(args.corpus, args.exercise)
+    print_report(calibrate(traces, grid, workers=args.workers), args.top)
+
+
+if __name__ == "__main__":
+    main()
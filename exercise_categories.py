@@ -15,6 +15,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Chest", "Triceps", "Shoulders"],
                 "difficulty": "Medium",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "3d",
                 "how_to": [
                     "Start in a high plank — hands shoulder-width apart, body in a straight line from head to heels.",
                     "Lower your chest toward the floor by bending both elbows evenly.",
@@ -37,6 +38,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Triceps", "Shoulders"],
                 "difficulty": "Medium",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "3d",
                 "how_to": [
                     "Sit on the edge of a sturdy chair or bench, hands gripping the edge beside your hips.",
                     "Slide your hips off the seat and walk your feet forward until your arms are supporting your weight.",
@@ -65,6 +67,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Abs", "Hip Flexors"],
                 "difficulty": "Medium",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "3d",
                 "how_to": [
                     "Lie on your back with knees bent at roughly 90° and feet flat on the floor.",
                     "Cross your arms over your chest or place your hands lightly behind your head.",
@@ -87,6 +90,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Core", "Shoulders", "Glutes"],
                 "difficulty": "Hard",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "2d",
                 "how_to": [
                     "Place your forearms on the floor, elbows directly below your shoulders.",
                     "Extend your legs behind you, balancing on your toes.",
@@ -109,6 +113,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Lower Abs", "Hip Flexors"],
                 "difficulty": "Medium",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "2d",
                 "how_to": [
                     "Lie flat on your back, legs straight, hands under your glutes for lower back support.",
                     "Keep your legs together and raise them slowly until they are vertical (L-shape at 90°).",
@@ -137,6 +142,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Quads", "Glutes", "Hamstrings"],
                 "difficulty": "Medium",
                 "camera_position": "FRONT or SIDE VIEW",
+                "angle_space": "3d",
                 "how_to": [
                     "Stand with feet shoulder-width apart, toes pointing slightly outward.",
                     "Keep your chest tall and core braced.",
@@ -159,6 +165,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Quads", "Glutes", "Balance"],
                 "difficulty": "Medium",
                 "camera_position": "FRONT VIEW",
+                "angle_space": "3d",
                 "how_to": [
                     "Stand tall with feet together, hands on hips or by your sides.",
                     "Step one foot forward about 60–90 cm, landing heel first.",
@@ -181,6 +188,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Quads", "Glutes"],
                 "difficulty": "Hard",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "3d",
                 "how_to": [
                     "Stand with your back flat against a smooth wall.",
                     "Walk your feet out until they are about 60 cm from the wall.",
@@ -209,6 +217,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Full Body", "Cardiovascular"],
                 "difficulty": "Easy",
                 "camera_position": "FRONT VIEW",
+                "angle_space": "2d",
                 "how_to": [
                     "Stand tall with feet together and arms by your sides.",
                     "Jump and simultaneously spread your feet wider than shoulder-width.",
@@ -231,6 +240,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Legs", "Core", "Cardio"],
                 "difficulty": "Medium",
                 "camera_position": "SIDE VIEW ← REQUIRED",
+                "angle_space": "2d",
                 "how_to": [
                     "Stand sideways to the camera so your full body profile is visible.",
                     "Run in place, driving your knees up as high as possible with each step.",
@@ -253,6 +263,7 @@ EXERCISE_CATEGORIES = {
                 "muscle_groups": ["Full Body", "Cardiovascular"],
                 "difficulty": "Very Hard",
                 "camera_position": "SIDE VIEW",
+                "angle_space": "2d",
                 "how_to": [
                     "Start standing upright with feet shoulder-width apart.",
                     "Drop into a squat, place your hands on the floor in front of your feet.",
@@ -317,4 +328,10 @@ def get_all_exercise_ids() -> list:
     for category_data in EXERCISE_CATEGORIES.values():
         for exercise in category_data["exercises"]:
             all_ids.append(exercise["id"])
-    return all_ids
\ No newline at end of file
+    return all_ids
+
+
+def get_angle_space(exercise_id: str) -> str:
+    """Where joint angles come from: "3d" (world landmarks) or "2d" (image plane)"""
+    info = get_exercise_info(exercise_id)
+    return info.get("angle_space", "2d") if info else "2d"
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Automatic exercise recognition
+Nearest-centroid classifier over a sliding window of joint-angle features,
+trainable from recorded landmark traces.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.exercise_categories import get_all_exercise_ids
+from src.landmark_utils import (
+    LEFT_ANKLE, LEFT_HIP, LEFT_SHOULDER, LEFT_WRIST,
+    RIGHT_ANKLE, RIGHT_HIP, RIGHT_SHOULDER, RIGHT_WRIST,
+    X, Y, all_joint_angles,
+)
+
+DEFAULT_WINDOW = 30  # ~1 second of frames
+
+
+def frame_features(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Per-frame features for (..., 33, 4) landmarks: every named joint angle
+    (scaled to 0-1) plus body orientation and limb placement.
+    """
+    angles = all_joint_angles(landmarks) / 180.0
+
+    shoulder_mid = (landmarks[..., LEFT_SHOULDER, :2] + landmarks[..., RIGHT_SHOULDER, :2]) / 2
+    hip_mid = (landmarks[..., LEFT_HIP, :2] + landmarks[..., RIGHT_HIP, :2]) / 2
+    torso = shoulder_mid - hip_mid
+    # 0 = upright, 1 = lying horizontal
+    torso_tilt = np.abs(np.arctan2(torso[..., X], -torso[..., Y])) / np.pi * 2
+    torso_tilt = np.minimum(torso_tilt, 2 - torso_tilt)
+
+    torso_length = np.maximum(np.linalg.norm(torso, axis=-1), 1e-6)
+    wrist_y = (landmarks[..., LEFT_WRIST, Y] + landmarks[..., RIGHT_WRIST, Y]) / 2
+    wrist_height = (shoulder_mid[..., 1] - wrist_y) / torso_length
+    ankle_spread = np.abs(landmarks[..., LEFT_ANKLE, X] - landmarks[..., RIGHT_ANKLE, X]) / torso_length
+
+    extra = np.stack([torso_tilt, wrist_height, ankle_spread], axis=-1)
+    return np.concatenate([angles, extra], axis=-1).astype(np.float32)
+
+
+def window_features(frames: np.ndarray) -> np.ndarray:
+    """Summarize a (T, F) window of frame features: mean, spread and range per feature"""
+    return np.concatenate([frames.mean(axis=0), frames.std(axis=0),
+                           frames.max(axis=0) - frames.min(axis=0)])
+
+
+class ExerciseClassifier:
+    """
+    Recognizes which catalogued exercise is being performed.
+
+    Feed one landmark array per frame with `update()`; once the window is
+    full it returns (exercise_id, confidence), or (None, confidence) when
+    the movement does not resemble any trained exercise.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, max_distance: float = 6.0):
+        self.window = window
+        self.max_distance = max_distance
+        self.labels = []
+        self.centroids = None
+        self.feature_mean = None
+        self.feature_scale = None
+        self._buffer = None
+        self._filled = 0
+        self._pos = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def fit(self, traces: List[Tuple[str, np.ndarray]], stride: int = 5) -> "ExerciseClassifier":
+        """
+        Train from recorded traces: a list of (exercise_id, (T, 33, 4) landmarks).
+        Every window of the trace (every `stride` frames) becomes a sample.
+        """
+        known = set(get_all_exercise_ids())
+        samples = {}
+        for exercise_id, landmarks in traces:
+            if exercise_id not in known:
+                raise ValueError(f"Unknown exercise id '{exercise_id}'")
+            frames = frame_features(np.asarray(landmarks, dtype=np.float32))
+            for start in range(0, len(frames) - self.window + 1, stride):
+                samples.setdefault(exercise_id, []).append(window_features(frames[start:start + self.window]))
+
+        if not samples:
+            raise ValueError(f"Traces must be at least {self.window} frames long")
+
+        self.labels = sorted(samples)
+        all_samples = np.concatenate([np.stack(samples[label]) for label in self.labels])
+        self.feature_mean = all_samples.mean(axis=0)
+        self.feature_scale = np.maximum(all_samples.std(axis=0), 1e-3)
+        self.centroids = np.stack([
+            ((np.stack(samples[label]) - self.feature_mean) / self.feature_scale).mean(axis=0)
+            for label in self.labels
+        ]).astype(np.float32)
+        self.reset()
+
+        print(f"✅ Exercise classifier trained on {len(all_samples)} windows: {', '.join(self.labels)}")
+        return self
+
+    def classify_window(self, frames: np.ndarray) -> Tuple[Optional[str], float]:
+        """Classify a (T, F) block of frame features"""
+        if not self.is_trained:
+            raise RuntimeError("Classifier has not been trained")
+        x = (window_features(frames) - self.feature_mean) / self.feature_scale
+        distances = np.sqrt(((self.centroids - x) ** 2).mean(axis=1))
+
+        order = np.argsort(distances)
+        best = distances[order[0]]
+        second = distances[order[1]] if len(order) > 1 else best * 2 + 1
+        # Margin between the two closest centroids, 0..1
+        confidence = float((second - best) / max(second, 1e-6))
+        if best > self.max_distance:
+            return None, confidence
+        return self.labels[order[0]], confidence
+
+    def update(self, landmarks: np.ndarray) -> Tuple[Optional[str], float]:
+        """Add one frame; classifies the latest window once enough frames have arrived"""
+        features = frame_features(landmarks)
+        if self._buffer is None:
+            self._buffer = np.zeros((self.window, len(features)), dtype=np.float32)
+        self._buffer[self._pos] = features
+        self._pos = (self._pos + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+        if self._filled < self.window:
+            return None, 0.0
+        # Window statistics are order-independent, so the ring buffer is used as-is
+        return self.classify_window(self._buffer)
+
+    def reset(self):
+        self._buffer = None
+        self._filled = 0
+        self._pos = 0
+
+    def save(self, path: str):
+        np.savez(path, labels=np.array(self.labels), centroids=self.centroids,
+                 feature_mean=self.feature_mean, feature_scale=self.feature_scale,
+                 window=self.window, max_distance=self.max_distance)
+
+    @classmethod
+    def load(cls, path: str) -> "ExerciseClassifier":
+        data = np.load(path)
+        classifier = cls(window=int(data["window"]), max_distance=float(data["max_distance"]))
+        classifier.labels = [str(label) for label in data["labels"]]
+        classifier.centroids = data["centroids"]
+        classifier.feature_mean = data["feature_mean"]
+        classifier.feature_scale = data["feature_scale"]
+        return classifier
+
+    def summary(self) -> Dict:
+        return {"labels": self.labels, "window": self.window, "trained": self.is_trained}
@@ -0,0 +1,250 @@
+"""
+Declarative form-fault rules
+Each exercise lists fault rules as allowed ranges over a shared feature
+vector (joint angles plus a few distances). All of an exercise's rules are
+checked in one vectorized comparison per frame; violations are accumulated
+into per-rep fault scores and the highest-priority one becomes the feedback.
+"""
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from src.landmark_utils import (
+    JOINT_ANGLE_NAMES, LEFT_HIP, LEFT_SHOULDER, LEFT_WRIST, RIGHT_SHOULDER, RIGHT_WRIST,
+    X, Y, all_joint_angles,
+)
+from src.rolling_stats import RollingStats
+
+# Features beyond the joint angles, all from one (..., 33, 4) landmark array
+EXTRA_FEATURES = [
+    "elbow_asymmetry",       # |left - right| elbow angle
+    "knee_asymmetry",        # |left - right| knee angle
+    "torso_offset_x",        # |shoulder x - hip x|: 0 when the torso is vertical
+    "shoulder_hip_offset_y",  # |shoulder y - hip y|: 0 when the torso is horizontal
+    "left_wrist_drop",       # wrist y - shoulder y: > 0 when the wrist is below the shoulder
+    "right_wrist_drop",
+]
+FEATURE_NAMES = JOINT_ANGLE_NAMES + EXTRA_FEATURES
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+_LEFT_ELBOW, _RIGHT_ELBOW = FEATURE_INDEX["left_elbow"], FEATURE_INDEX["right_elbow"]
+_LEFT_KNEE, _RIGHT_KNEE = FEATURE_INDEX["left_knee"], FEATURE_INDEX["right_knee"]
+
+
+def compute_features(landmarks: np.ndarray, world: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (..., 33, 4) landmarks -> (..., len(FEATURE_NAMES)) float32 features.
+    With matching world landmarks the joint angles are measured in 3D.
+    """
+    angles = all_joint_angles(world, world=True) if world is not None else all_joint_angles(landmarks)
+    extra = np.stack([
+        np.abs(angles[..., _LEFT_ELBOW] - angles[..., _RIGHT_ELBOW]),
+        np.abs(angles[..., _LEFT_KNEE] - angles[..., _RIGHT_KNEE]),
+        np.abs(landmarks[..., LEFT_SHOULDER, X] - landmarks[..., LEFT_HIP, X]),
+        np.abs(landmarks[..., LEFT_SHOULDER, Y] - landmarks[..., LEFT_HIP, Y]),
+        landmarks[..., LEFT_WRIST, Y] - landmarks[..., LEFT_SHOULDER, Y],
+        landmarks[..., RIGHT_WRIST, Y] - landmarks[..., RIGHT_SHOULDER, Y],
+    ], axis=-1)
+    return np.concatenate([angles, extra], axis=-1).astype(np.float32)
+
+
+Bound = Union[float, str, None]  # number, name of a DETECTOR_THRESHOLDS entry, or unbounded
+
+
+class FormRule(NamedTuple):
+    code: str                 # stable feedback code, e.g. "ARMS_UNEVEN"
+    feature: str              # entry of FEATURE_NAMES
+    message: str
+    min_value: Bound = None   # the allowed range; outside it the fault is active
+    max_value: Bound = None
+    priority: int = 0         # higher wins when several faults are active
+    blocking: bool = False    # the position does not count while this fault is active
+    smooth: bool = False      # judge the windowed mean instead of the current frame
+    weight: float = 1.0       # contribution to the rep's form score
+
+
+PLANK_MESSAGE = "Get in proper plank position - body straight, hands below shoulders"
+
+FORM_RULES = {
+    "push-up": [
+        FormRule("BODY_NOT_STRAIGHT", "left_body", PLANK_MESSAGE,
+                 "body_min_angle", "body_max_angle", priority=30, blocking=True),
+        FormRule("HIPS_OUT_OF_LINE", "shoulder_hip_offset_y", PLANK_MESSAGE,
+                 max_value="shoulder_hip_offset", priority=30, blocking=True),
+        FormRule("LEFT_HAND_NOT_UNDER", "left_wrist_drop", PLANK_MESSAGE,
+                 min_value=0.0, priority=30, blocking=True),
+        FormRule("RIGHT_HAND_NOT_UNDER", "right_wrist_drop", PLANK_MESSAGE,
+                 min_value=0.0, priority=30, blocking=True),
+        FormRule("ARMS_UNEVEN", "elbow_asymmetry", "KEEP ARMS EVEN",
+                 max_value="arm_symmetry", priority=10, smooth=True),
+    ],
+    "squat": [
+        FormRule("LEGS_UNEVEN", "knee_asymmetry", "KEEP LEGS EVEN - BOTH KNEES SHOULD BEND TOGETHER",
+                 max_value="leg_symmetry", priority=20, blocking=True, smooth=True),
+    ],
+    "wall-sit": [
+        FormRule("NOT_UPRIGHT", "torso_offset_x", "LEAN BACK AGAINST WALL",
+                 max_value="upright_offset", priority=30, blocking=True),
+        FormRule("TOO_HIGH", "left_knee", "SLIDE DOWN - KNEES AT 90°",
+                 max_value="sit_max_angle", priority=20, blocking=True),
+        FormRule("TOO_LOW", "left_knee", "LIFT UP SLIGHTLY - 90° ANGLE",
+                 min_value="sit_min_angle", priority=20, blocking=True),
+    ],
+}
+
+
+class FormCheck(NamedTuple):
+    codes: List[str]            # active faults, highest priority first
+    feedback: Optional[str]     # message of the top fault
+    blocked: bool               # a blocking fault is active
+
+
+NO_FAULTS = FormCheck([], None, False)
+
+
+class CompiledRules:
+    """One exercise's rules as arrays, so checking them is a single comparison"""
+
+    def __init__(self, rules: List[FormRule], thresholds: Dict):
+        def resolve(bound: Bound, default: float) -> float:
+            if bound is None:
+                return default
+            return float(thresholds[bound]) if isinstance(bound, str) else float(bound)
+
+        # Highest priority first, so the first active rule is the one to report
+        self.rules = sorted(rules, key=lambda rule: -rule.priority)
+        self.feature = np.array([FEATURE_INDEX[rule.feature] for rule in self.rules])
+        self.low = np.array([resolve(rule.min_value, -np.inf) for rule in self.rules], dtype=np.float32)
+        self.high = np.array([resolve(rule.max_value, np.inf) for rule in self.rules], dtype=np.float32)
+        self.smooth = np.array([rule.smooth for rule in self.rules])
+        self.smoothed_features = sorted({FEATURE_INDEX[rule.feature] for rule in self.rules if rule.smooth})
+        self.blocking = np.array([rule.blocking for rule in self.rules])
+        # Per-frame blocking rules gate the smoothing window (e.g. no plank, no arm symmetry)
+        self.gate = self.blocking & ~self.smooth
+        self.weight = np.array([rule.weight for rule in self.rules], dtype=np.float32)
+        self.codes = [rule.code for rule in self.rules]
+
+    def violations(self, features: np.ndarray, smoothed: Optional[np.ndarray] = None) -> np.ndarray:
+        """(..., F) features -> (..., R) bool, True where a rule is broken"""
+        values = features[..., self.feature]
+        if smoothed is not None:
+            values = np.where(self.smooth, smoothed[..., self.feature], values)
+        return (values < self.low) | (values > self.high)
+
+
+class FormScorer:
+    """
+    Per-session form evaluation.
+
+    `check()` is called once per analysed frame; `finish_rep()` when a rep
+    is counted turns the frames since the previous rep into fault scores
+    (fraction of frames each fault was active) and a 0-100 form score.
+    Smoothed rules judge the mean of a RollingStats stream per feature; the
+    detector passes its own angle_stats so both smooth over the same window.
+    """
+
+    def __init__(self, thresholds: Dict, rules: Optional[Dict] = None,
+                 window: int = 5, history: int = 256, stats: Optional[RollingStats] = None):
+        self.thresholds = thresholds
+        self.rules = rules if rules is not None else FORM_RULES
+        self.stats = stats if stats is not None else RollingStats(window=window)
+        self.window = self.stats.window
+        self.compiled = {}
+        self.rep_scores = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        self.rep_scores.clear()
+        self.start_exercise(None)
+
+    def start_exercise(self, exercise_type: Optional[str]):
+        self.exercise_type = exercise_type
+        for name in FEATURE_NAMES:
+            stream = self.stats.get(name)
+            if stream is not None:
+                stream.clear()
+        self.frames = 0
+        self.fault_frames = None
+        self.last_check = NO_FAULTS
+
+    def rules_for(self, exercise_type: str) -> Optional[CompiledRules]:
+        rules = self.rules.get(exercise_type)
+        if rules is None:
+            return None
+        compiled = self.compiled.get(exercise_type)
+        if compiled is None:
+            compiled = CompiledRules(rules, self.thresholds.get(exercise_type, {}))
+            self.compiled[exercise_type] = compiled
+        return compiled
+
+    def recompile(self):
+        """Call after changing thresholds (e.g. from calibration)"""
+        self.compiled.clear()
+
+    def check(self, landmarks: np.ndarray, exercise_type: str,
+              world: Optional[np.ndarray] = None, features: Optional[np.ndarray] = None) -> FormCheck:
+        """features: precomputed compute_features(landmarks, world) row, if the caller batched it"""
+        compiled = self.rules_for(exercise_type)
+        if compiled is None:
+            return NO_FAULTS
+        if exercise_type != self.exercise_type:
+            self.start_exercise(exercise_type)
+
+        if features is None:
+            features = compute_features(landmarks, world)
+        broken = compiled.violations(features)
+        if (broken & compiled.gate).any():
+            # Out of position: smoothed rules are not judged and the frame stays out of their window
+            broken &= ~compiled.smooth
+        else:
+            smoothed = features.copy()
+            for index in compiled.smoothed_features:
+                smoothed[index] = self.stats.push(FEATURE_NAMES[index], features[index]).mean
+            broken = compiled.violations(features, smoothed)
+        if self.fault_frames is None:
+            self.fault_frames = np.zeros(len(compiled.rules), dtype=np.int32)
+        self.fault_frames += broken
+        self.frames += 1
+
+        active = np.flatnonzero(broken)
+        if len(active) == 0:
+            self.last_check = NO_FAULTS
+        else:
+            self.last_check = FormCheck([compiled.codes[i] for i in active],
+                                        compiled.rules[active[0]].message,
+                                        bool(compiled.blocking[active].any()))
+        return self.last_check
+
+    def current_scores(self) -> Dict:
+        """Fault scores for the frames since the last finished rep"""
+        compiled = self.rules_for(self.exercise_type) if self.exercise_type else None
+        if compiled is None or not self.frames:
+            return {"frames": 0, "faults": {}, "score": 100.0}
+        fractions = self.fault_frames / self.frames
+        penalty = float(np.dot(fractions, compiled.weight) / compiled.weight.sum())
+        return {
+            "frames": self.frames,
+            "faults": {code: float(f) for code, f in zip(compiled.codes, fractions) if f > 0},
+            "score": round(100.0 * (1.0 - penalty), 1),
+        }
+
+    def finish_rep(self, rep: int) -> Dict:
+        scores = dict(self.current_scores(), rep=rep)
+        self.rep_scores.append(scores)
+        self.clear_rep()
+        return scores
+
+    def clear_rep(self):
+        """Forget the frames counted towards the current rep (the smoothing window stays)"""
+        self.frames = 0
+        if self.fault_frames is not None:
+            self.fault_frames[:] = 0
+
+
+def fault_matrix(landmarks: np.ndarray, exercise_type: str, thresholds: Dict,
+                 rules: Optional[Dict] = None) -> np.ndarray:
+    """(T, 33, 4) landmark trace -> (T, R) unsmoothed violations, for offline analysis"""
+    rule_list = (rules if rules is not None else FORM_RULES)[exercise_type]
+    compiled = CompiledRules(rule_list, thresholds.get(exercise_type, {}))
+    return compiled.violations(compute_features(landmarks))
@@ -0,0 +1,392 @@
+"""
+Pose inference backends
+One interface over the pose models the engine can run: a BGR frame in, a
+(33, 4) landmark array (or None) out.
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from src.buffer_pool import get_frame_pool
+from src.landmark_utils import NUM_LANDMARKS, landmarks_to_array
+from src.resource_manager import get_resource_manager
+
+# PoseLandmarker bundles by model complexity, looked up in settings["pose_model_dir"]
+TASK_MODEL_FILES = {
+    0: "pose_landmarker_lite.task",
+    1: "pose_landmarker_full.task",
+    2: "pose_landmarker_heavy.task",
+}
+
+
+class PoseBackend:
+    """
+    Base class: frame in, landmarks out.
+
+    After `infer`, `last_world_landmarks` holds the same pose as a (33, 4)
+    array of metric 3D world coordinates (hip-centred) and visibility, or
+    None when the model has no world output; after `infer_batch`,
+    `last_world_batch` holds one such entry per frame.
+    """
+    name = "base"
+    supports_batch = False  # True when infer_batch runs one call for any number of frames
+    batch_size = 1  # Frames per model call when the batch dimension is fixed
+    stateless = False  # True when frames may come from different videos (no tracking between calls)
+    last_world_landmarks = None
+    last_world_batch = ()
+
+    def infer(self, frame: np.ndarray, timestamp: float) -> Optional[np.ndarray]:
+        """Estimate the pose in a BGR frame; timestamp is in seconds"""
+        raise NotImplementedError
+
+    def infer_batch(self, frames: Sequence[np.ndarray],
+                    timestamps: Sequence[float]) -> List[Optional[np.ndarray]]:
+        """Estimate poses for several independent frames (e.g. one per camera)"""
+        poses, worlds = [], []
+        for frame, timestamp in zip(frames, timestamps):
+            poses.append(self.infer(frame, timestamp))
+            worlds.append(self.last_world_landmarks)
+        self.last_world_batch = worlds
+        return poses
+
+    def close(self):
+        pass
+
+
+class SolutionPoseBackend(PoseBackend):
+    """Legacy mp.solutions.pose.Pose (always runs on the CPU)"""
+    name = "mediapipe-solution"
+
+    def __init__(self, settings: Dict, model_complexity: int):
+        self.model_complexity = model_complexity
+        self.frame_pool = get_frame_pool()
+        self.model = mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            enable_segmentation=False,
+            min_detection_confidence=settings['min_detection_confidence'],
+            min_tracking_confidence=settings['min_tracking_confidence'],
+            smooth_landmarks=settings['smooth_landmarks'],
+        )
+
+    def infer(self, frame: np.ndarray, timestamp: float) -> Optional[np.ndarray]:
+        image = self.frame_pool.cvt_color(frame, cv2.COLOR_BGR2RGB)
+        image.flags.writeable = False
+        try:
+            results = self.model.process(image)
+        finally:
+            image.flags.writeable = True
+            self.frame_pool.release(image)
+        if not results.pose_landmarks:
+            self.last_world_landmarks = None
+            return None
+        world = results.pose_world_landmarks
+        self.last_world_landmarks = landmarks_to_array(world.landmark) if world else None
+        return landmarks_to_array(results.pose_landmarks.landmark)
+
+    def close(self):
+        self.model.close()
+
+
+class TasksPoseBackend(PoseBackend):
+    """
+    MediaPipe Tasks PoseLandmarker with an explicit delegate ("CPU" runs on
+    XNNPACK, "GPU" where the platform supports it).
+
+    VIDEO mode is synchronous. LIVE_STREAM mode hands frames to the
+    landmarker and returns straight away: `infer` then returns the newest
+    completed result (usually the previous frame's), and `on_result`, if
+    given, is called from MediaPipe's thread with (landmarks, timestamp).
+
+    The Tasks API has no XNNPACK thread count option. On the CPU delegate,
+    `cpus` (Linux) is the affinity of the threads MediaPipe starts while the
+    landmarker is built, which caps the cores one landmarker can use.
+    """
+    name = "mediapipe-tasks"
+
+    def __init__(self, model_path: str, settings: Dict, delegate: str = "CPU",
+                 running_mode: str = "VIDEO",
+                 on_result: Optional[Callable[[Optional[np.ndarray], float], None]] = None,
+                 cpus: Optional[Sequence[int]] = None):
+        from mediapipe.tasks import python as mp_tasks
+        from mediapipe.tasks.python import vision
+
+        self.delegate = delegate.upper()
+        self.live = running_mode.upper() == "LIVE_STREAM"
+        self.on_result = on_result
+        self.last_timestamp_ms = -1
+        self._lock = threading.Lock()
+        self._latest = (None, None)
+        self.frame_pool = get_frame_pool()
+        self.cpus = list(cpus) if cpus and self.delegate == "CPU" else None
+
+        options = vision.PoseLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(
+                model_asset_path=model_path,
+                delegate=mp_tasks.BaseOptions.Delegate[self.delegate],
+            ),
+            running_mode=vision.RunningMode[running_mode.upper()],
+            num_poses=1,
+            min_pose_detection_confidence=settings['min_detection_confidence'],
+            min_tracking_confidence=settings['min_tracking_confidence'],
+            result_callback=self._on_result if self.live else None,
+        )
+        with get_resource_manager().threads_started_on(self.cpus):
+            self.landmarker = vision.PoseLandmarker.create_from_options(options)
+
+    @staticmethod
+    def _first_pose(result) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """(image landmarks, world landmarks) of the first detected person"""
+        if not result.pose_landmarks:
+            return None, None
+        world = result.pose_world_landmarks
+        return (landmarks_to_array(result.pose_landmarks[0]),
+                landmarks_to_array(world[0]) if world else None)
+
+    def _on_result(self, result, output_image, timestamp_ms: int):
+        landmarks, world = self._first_pose(result)
+        with self._lock:
+            self._latest = (landmarks, world)
+        if self.on_result is not None:
+            self.on_result(landmarks, timestamp_ms / 1000.0)
+
+    def infer(self, frame: np.ndarray, timestamp: float) -> Optional[np.ndarray]:
+        # Both streaming modes require strictly increasing timestamps
+        timestamp_ms = max(int(timestamp * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+
+        if self.live:
+            # The landmarker may still read the image after detect_async returns: never pool it
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self.landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), timestamp_ms)
+            with self._lock:
+                landmarks, self.last_world_landmarks = self._latest
+            return landmarks
+
+        rgb = self.frame_pool.cvt_color(frame, cv2.COLOR_BGR2RGB)
+        try:
+            image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+            landmarks, self.last_world_landmarks = self._first_pose(
+                self.landmarker.detect_for_video(image, timestamp_ms))
+            return landmarks
+        finally:
+            self.frame_pool.release(rgb)
+
+    def close(self):
+        self.landmarker.close()
+
+
+class OnnxPoseBackend(PoseBackend):
+    """
+    BlazePose-compatible landmark model on ONNX Runtime (CPU).
+
+    Expects the BlazePose GHUM landmark model layout: a 256x256 RGB input
+    (NHWC or NCHW) and a (39 * 5) landmark output of x, y, z, visibility,
+    presence in input pixels, plus a one-value pose score and, if present,
+    the (39 * 3) metric world landmark output. The whole frame is
+    letterboxed into the input, which suits fitness framing where the user
+    fills most of the picture.
+
+    Models exported with a dynamic batch dimension run a whole batch of
+    frames in a single call; a fixed batch dimension gets the frames in
+    chunks of that size, the last one zero-padded.
+
+    Requires: pip install onnxruntime
+    """
+    name = "onnxruntime"
+    stateless = True
+
+    def __init__(self, model_path: str, settings: Dict,
+                 intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 input_range: Sequence[float] = (0.0, 1.0)):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # 0 lets ONNX Runtime pick (one thread per physical core)
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.min_score = settings['min_detection_confidence']
+        self.input_low, self.input_high = input_range
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape
+        self.channels_first = shape[1] == 3
+        self.input_size = shape[2] if self.channels_first else shape[1]
+        self.supports_batch = not isinstance(shape[0], int) or shape[0] <= 0
+        self.batch_size = 1 if self.supports_batch else shape[0]
+
+        # Landmarks are the (N, 195) output, the pose score the (N, 1) one, world landmarks (N, 117)
+        self.landmark_output = self.score_output = self.world_output = None
+        for output in self.session.get_outputs():
+            size = int(np.prod([d for d in output.shape[1:] if isinstance(d, int)]))
+            if size == 39 * 5 and self.landmark_output is None:
+                self.landmark_output = output.name
+            elif size == 1 and self.score_output is None:
+                self.score_output = output.name
+            elif size == 39 * 3 and self.world_output is None:
+                self.world_output = output.name
+        if self.landmark_output is None:
+            raise ValueError(f"{model_path} has no (39 * 5) landmark output")
+
+        self._canvas = np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8)
+        self._batch = np.zeros((0, self.input_size, self.input_size, 3), dtype=np.float32)
+        self.last_world_batch = []
+
+    def _letterbox(self, frame: np.ndarray, out: np.ndarray):
+        """Fit frame into the square input without distortion; returns (scale, pad_x, pad_y)"""
+        h, w = frame.shape[:2]
+        size = self.input_size
+        scale = size / max(h, w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+        self._canvas[:] = 0
+        self._canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(self._canvas, cv2.COLOR_BGR2RGB)
+        np.multiply(rgb, (self.input_high - self.input_low) / 255.0, out=out)
+        out += self.input_low
+        return scale, pad_x, pad_y
+
+    def _run(self, batch: np.ndarray):
+        """(landmarks (N, 39, 5), scores (N,), world landmarks (N, 39, 3) or None)"""
+        inputs = batch.transpose(0, 3, 1, 2) if self.channels_first else batch
+        names = [name for name in (self.landmark_output, self.score_output, self.world_output) if name]
+        outputs = dict(zip(names, self.session.run(names, {self.input_name: np.ascontiguousarray(inputs)})))
+        n = len(batch)
+        landmarks = outputs[self.landmark_output].reshape(n, 39, 5)
+        world = outputs[self.world_output].reshape(n, 39, 3) if self.world_output else None
+        if self.score_output is None:
+            return landmarks, np.ones(n), world
+        # The pose score is a logit, like visibility
+        return landmarks, 1.0 / (1.0 + np.exp(-outputs[self.score_output].reshape(n))), world
+
+    def infer_batch(self, frames: Sequence[np.ndarray],
+                    timestamps: Sequence[float]) -> List[Optional[np.ndarray]]:
+        n = len(frames)
+        # Fixed batch dimensions need whole chunks; the padding rows are zeroed and dropped below
+        size = n if self.supports_batch else -(-n // self.batch_size) * self.batch_size
+        if len(self._batch) < size:
+            self._batch = np.zeros((size, self.input_size, self.input_size, 3), dtype=np.float32)
+        batch = self._batch[:size]
+        batch[n:] = 0
+        letterbox = np.array([self._letterbox(frame, batch[i]) for i, frame in enumerate(frames)])
+
+        if self.supports_batch:
+            raw, scores, raw_world = self._run(batch)
+        else:
+            results = [self._run(batch[i:i + self.batch_size]) for i in range(0, size, self.batch_size)]
+            raw = np.concatenate([r[0] for r in results])[:n]
+            scores = np.concatenate([r[1] for r in results])[:n]
+            raw_world = np.concatenate([r[2] for r in results])[:n] if self.world_output else None
+
+        # Input pixels -> normalized frame coordinates, all frames at once
+        scale, pad_x, pad_y = letterbox[:, 0, None], letterbox[:, 1, None], letterbox[:, 2, None]
+        sizes = np.array([frame.shape[:2] for frame in frames], dtype=np.float32)
+        h, w = sizes[:, 0, None], sizes[:, 1, None]
+        landmarks = np.empty((n, NUM_LANDMARKS, 4), dtype=np.float32)
+        landmarks[:, :, 0] = (raw[:, :NUM_LANDMARKS, 0] - pad_x) / scale / w
+        landmarks[:, :, 1] = (raw[:, :NUM_LANDMARKS, 1] - pad_y) / scale / h
+        landmarks[:, :, 2] = raw[:, :NUM_LANDMARKS, 2] / scale / w
+        # Visibility is a logit in BlazePose outputs
+        landmarks[:, :, 3] = 1.0 / (1.0 + np.exp(-raw[:, :NUM_LANDMARKS, 3]))
+
+        found = scores >= self.min_score
+        if raw_world is not None:
+            # World coordinates are already metric; visibility is shared with the image landmarks
+            world = np.empty_like(landmarks)
+            world[:, :, :3] = raw_world[:, :NUM_LANDMARKS]
+            world[:, :, 3] = landmarks[:, :, 3]
+            self.last_world_batch = [world[i] if found[i] else None for i in range(n)]
+        else:
+            self.last_world_batch = [None] * n
+        return [landmarks[i] if found[i] else None for i in range(n)]
+
+    def infer(self, frame: np.ndarray, timestamp: float) -> Optional[np.ndarray]:
+        landmarks = self.infer_batch([frame], [timestamp])[0]
+        self.last_world_landmarks = self.last_world_batch[0]
+        return landmarks
+
+
+def resolve_task_model(settings: Dict, model_complexity: int) -> Optional[str]:
+    """PoseLandmarker bundle for this complexity, if the settings point at one"""
+    path = settings.get('pose_model_path')
+    if path is None and settings.get('pose_model_dir'):
+        path = os.path.join(settings['pose_model_dir'], TASK_MODEL_FILES[model_complexity])
+    if path is not None and os.path.isfile(path):
+        return path
+    return None
+
+
+def backend_candidates(settings: Dict, model_complexity: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    (backend name, device) pairs create_backend tries for these settings, in
+    order; the last one, the legacy solution model, always builds.
+    """
+    if model_complexity is None:
+        model_complexity = settings['model_complexity']
+    candidates = []
+    if settings.get('onnx_model_path') is not None:
+        candidates.append((OnnxPoseBackend.name, "CPU"))
+    if resolve_task_model(settings, model_complexity) is not None:
+        delegate = settings.get('delegate', "CPU").upper()
+        candidates.append((TasksPoseBackend.name, delegate))
+        if delegate != "CPU":
+            candidates.append((TasksPoseBackend.name, "CPU"))
+    candidates.append((SolutionPoseBackend.name, "CPU"))
+    return candidates
+
+
+def create_backend(settings: Dict, model_complexity: Optional[int] = None,
+                   running_mode: str = "VIDEO",
+                   on_result: Optional[Callable[[Optional[np.ndarray], float], None]] = None) -> PoseBackend:
+    """
+    Pick the best available backend for these settings.
+
+    An `onnx_model_path` selects ONNX Runtime. With a PoseLandmarker bundle
+    configured, tries the Tasks runtime on the requested delegate, then on
+    the CPU. Anything unavailable falls through to the legacy solution model.
+    """
+    if model_complexity is None:
+        model_complexity = settings['model_complexity']
+
+    for name, device in backend_candidates(settings, model_complexity):
+        if name == SolutionPoseBackend.name:
+            return SolutionPoseBackend(settings, model_complexity)
+
+        if name == OnnxPoseBackend.name:
+            onnx_path = settings['onnx_model_path']
+            # Thread counts follow the current session load unless the settings fix them
+            plan = get_resource_manager().plan()
+            try:
+                backend = OnnxPoseBackend(onnx_path, settings,
+                                          intra_op_threads=settings.get('onnx_intra_op_threads',
+                                                                        plan['onnx_intra_op_threads']),
+                                          inter_op_threads=settings.get('onnx_inter_op_threads',
+                                                                        plan['onnx_inter_op_threads']))
+                print(f"✅ Pose backend: ONNX Runtime ({os.path.basename(onnx_path)}, "
+                      f"batch={'yes' if backend.supports_batch else 'no'})")
+                return backend
+            except Exception as e:
+                print(f"⚠️  ONNX Runtime backend unavailable: {e}")
+        else:
+            # CPU-delegate threads run on the configured cores, else on this session's share
+            cpus = None
+            if device == "CPU":
+                cpus = settings.get('tasks_cpus') or get_resource_manager().cpus_for_backend()
+            try:
+                backend = TasksPoseBackend(resolve_task_model(settings, model_complexity), settings,
+                                           device, running_mode, on_result, cpus)
+                print(f"✅ Pose backend: MediaPipe Tasks ({device}, {running_mode.upper()})")
+                return backend
+            except Exception as e:
+                print(f"⚠️  MediaPipe Tasks {device} delegate unavailable: {e}")
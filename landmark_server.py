@@ -0,0 +1,251 @@
+"""
+Local landmark ingestion server
+Accepts compressed frames or pre-computed landmark arrays over WebSocket,
+runs the rep/form logic per session and streams back rep/feedback events.
+
+Requires: pip install websockets
+"""
+import asyncio
+import json
+import time
+from http import HTTPStatus
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from src.async_session import get_shared_executor
+from src.landmark_utils import NUM_LANDMARKS
+from src.pose_detector import PoseDetector
+from src.resource_manager import get_resource_manager
+from src.stream_encoder import (
+    TAG_FRAME, TAG_LANDMARKS, TAG_LANDMARKS_F16, StreamEncoder, client_options, decode_landmarks,
+    encode_landmarks,
+)
+from src.system_utils import SystemOptimizer
+
+
+def encode_frame(frame: np.ndarray, quality: int = 80) -> bytes:
+    """JPEG-encode a BGR frame into a tagged binary message"""
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode frame")
+    return bytes([TAG_FRAME]) + buf.tobytes()
+
+
+class ClientSession:
+    """Detector state for one connected client"""
+
+    def __init__(self, settings: Dict):
+        self.exercise_type = None
+        # The pose model is only loaded if the client actually sends frames
+        self.detector = PoseDetector(settings=settings, load_model=False)
+        self.last_feedback = None
+        self.last_count = 0
+        self.encoder = None  # preview stream back to this client, if it asked for one
+
+    def ensure_model(self):
+        if self.detector.pose is None:
+            self.detector.init_model()
+
+    def handle_landmarks(self, landmarks: np.ndarray, ts: float,
+                         world_landmarks: Optional[np.ndarray] = None) -> List[Dict]:
+        """Run the detector and return the events worth sending back"""
+        if self.exercise_type is None:
+            return [{"type": "error", "message": "Send a 'start' message with an exercise first"}]
+
+        rep_complete, feedback = self.detector.process_landmarks(landmarks, self.exercise_type, ts,
+                                                                 world_landmarks)
+        count = self.detector.rep_count
+
+        # Only send what changed - keeps the downlink as small as the uplink
+        events = []
+        if rep_complete or count != self.last_count:
+            events.append({"type": "rep", "ts": ts, "count": count, "rep_complete": rep_complete})
+            self.last_count = count
+        if feedback != self.last_feedback:
+            events.append({"type": "feedback", "ts": ts, "text": feedback})
+            self.last_feedback = feedback
+        return events
+
+    def handle_frame(self, data: bytes, ts: float) -> List:
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return [{"type": "error", "message": "Could not decode frame"}]
+
+        self.ensure_model()
+        landmarks = self.detector.estimate_landmarks(frame)
+        if landmarks is None:
+            events = [{"type": "no_pose", "ts": ts}]
+        else:
+            events = self.handle_landmarks(landmarks, ts, self.detector.pose.last_world_landmarks)
+        if self.encoder is not None:
+            events.extend(self.preview(frame, landmarks, ts))
+        return events
+
+    def preview(self, frame: np.ndarray, landmarks: Optional[np.ndarray], ts: float) -> List[bytes]:
+        """Binary preview messages for the client's own frame"""
+        if self.encoder.mode == "landmarks" or landmarks is None:
+            return self.encoder.encode(frame, landmarks, ts)
+        image = self.detector.frame_pool.copy(frame)
+        self.detector.overlay.draw_skeleton(image, landmarks)
+        messages = self.encoder.encode(image, landmarks, ts)
+        self.detector.release_frame(image)
+        return messages
+
+    def start(self, exercise_type: str, preview: Optional[Dict] = None):
+        # Build the new encoder first, so invalid options leave the session untouched
+        encoder = StreamEncoder(**client_options(preview)) if preview is not None else None
+
+        self.exercise_type = exercise_type
+        self.detector.current_exercise = exercise_type
+        self.detector.reset()
+        self.last_feedback = None
+        self.last_count = 0
+        if encoder is not None:
+            self.encoder = encoder
+        elif self.encoder is not None:
+            self.encoder.reset()
+
+    def release(self):
+        self.detector.release()
+
+
+class LandmarkServer:
+    """
+    WebSocket server for remote sessions.
+
+    Text messages are JSON:
+        {"type": "start", "exercise": "squat"}
+        {"type": "start", "exercise": "squat", "preview": {"mode": "landmarks", "bandwidth_kbps": 300}}
+        {"type": "landmarks", "ts": 12.3, "landmarks": [[x, y, z, visibility], ...]}
+        {"type": "reset"}
+    Binary messages are tagged with their first byte (see TAG_LANDMARKS / TAG_FRAME).
+    Client-sent landmarks are image landmarks only, so the `world_angles`
+    setting applies to sessions that send frames.
+    With a "preview" in the start message, each frame a client sends is answered
+    with binary preview messages (see StreamEncoder) besides the JSON events.
+
+    GET /health answers over plain HTTP with the number of active sessions.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, settings: Optional[Dict] = None):
+        self.host = host
+        self.port = port
+        # Profile hardware once for all sessions
+        self.settings = settings or SystemOptimizer().get_optimal_settings()
+        self.executor = get_shared_executor()
+        self.resources = get_resource_manager()
+        self.sessions = {}
+
+    def process_request(self, connection, request):
+        if request.path == "/health":
+            body = json.dumps({"status": "ok", "sessions": len(self.sessions)})
+            return connection.respond(HTTPStatus.OK, body + "\n")
+        return None
+
+    async def handler(self, websocket):
+        loop = asyncio.get_running_loop()
+        session = ClientSession(self.settings)
+        self.sessions[id(websocket)] = session
+        # Thread counts (OpenCV pool, ONNX threads of models loaded from now on) follow the client count
+        self.resources.add_session()
+        try:
+            async for message in websocket:
+                events = await self.handle_message(loop, session, message)
+                for event in events:
+                    await websocket.send(event if isinstance(event, bytes) else json.dumps(event))
+        except ConnectionClosed:
+            pass
+        finally:
+            del self.sessions[id(websocket)]
+            self.resources.remove_session()
+            await loop.run_in_executor(self.executor, session.release)
+
+    async def handle_message(self, loop, session: ClientSession, message) -> List:
+        ts = time.time()
+
+        if isinstance(message, bytes):
+            if not message:
+                return [{"type": "error", "message": "Empty message"}]
+            tag, payload = message[0], message[1:]
+            if tag in (TAG_LANDMARKS, TAG_LANDMARKS_F16):
+                landmarks = decode_landmarks(tag, payload)
+                if landmarks is None:
+                    return [{"type": "error", "message": "Landmark payload must be 33 x 4 float32/float16"}]
+                # Landmark-only logic is cheap enough to run inline on the loop
+                return session.handle_landmarks(landmarks, ts)
+            if tag == TAG_FRAME:
+                return await loop.run_in_executor(self.executor, session.handle_frame, payload, ts)
+            return [{"type": "error", "message": f"Unknown binary tag {tag}"}]
+
+        try:
+            msg = json.loads(message)
+        except json.JSONDecodeError:
+            return [{"type": "error", "message": "Invalid JSON"}]
+        if not isinstance(msg, dict):
+            return [{"type": "error", "message": "Messages must be JSON objects"}]
+
+        msg_type = msg.get("type")
+        if msg_type == "start":
+            exercise_type = msg.get("exercise")
+            if not isinstance(exercise_type, str) or exercise_type not in session.detector.detectors:
+                return [{"type": "error", "message": f"Unknown exercise {exercise_type}"}]
+            try:
+                session.start(exercise_type, msg.get("preview"))
+            except (TypeError, ValueError) as e:
+                return [{"type": "error", "message": f"Invalid preview options: {e}"}]
+            return [{"type": "started", "exercise": session.exercise_type}]
+        if msg_type == "reset":
+            if session.exercise_type is None:
+                return [{"type": "error", "message": "Send a 'start' message with an exercise first"}]
+            session.start(session.exercise_type)
+            return [{"type": "started", "exercise": session.exercise_type}]
+        if msg_type == "landmarks":
+            try:
+                landmarks = np.asarray(msg["landmarks"], dtype=np.float32).reshape(NUM_LANDMARKS, 4)
+                ts = float(msg.get("ts", ts))
+            except (KeyError, TypeError, ValueError):
+                return [{"type": "error",
+                         "message": "Landmarks must be 33 rows of [x, y, z, visibility] with a numeric ts"}]
+            return session.handle_landmarks(landmarks, ts)
+        return [{"type": "error", "message": f"Unknown message type {msg_type}"}]
+
+    async def serve_forever(self):
+        async with serve(self.handler, self.host, self.port, process_request=self.process_request):
+            print(f"🛰️  Landmark server listening on ws://{self.host}:{self.port}")
+            await asyncio.get_running_loop().create_future()
+
+
+async def run_standin_client(uri: str, exercise_type: str, landmark_frames, binary: bool = True) -> List[Dict]:
+    """
+    Local stand-in for a remote client: replays landmark arrays and
+    collects every event the server sends back.
+    """
+    events = []
+    async with connect(uri) as websocket:
+        await websocket.send(json.dumps({"type": "start", "exercise": exercise_type}))
+        events.append(json.loads(await websocket.recv()))
+
+        for landmarks in landmark_frames:
+            if binary:
+                await websocket.send(encode_landmarks(landmarks))
+            else:
+                await websocket.send(json.dumps({"type": "landmarks",
+                                                 "landmarks": np.asarray(landmarks).tolist()}))
+
+        # Drain replies until the server goes quiet
+        while True:
+            try:
+                reply = await asyncio.wait_for(websocket.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                break
+            events.append(json.loads(reply))
+    return events
+
+
+if __name__ == "__main__":
+    asyncio.run(LandmarkServer().serve_forever())
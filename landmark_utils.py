@@ -0,0 +1,121 @@
+"""
+Landmark array utilities
+Converts between MediaPipe landmark lists and compact (33, 4) NumPy arrays
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+# Column layout of a landmark array
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+# Landmark indices (same values as mp.solutions.pose.PoseLandmark) for array code
+NOSE = 0
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """Convert a MediaPipe (solution or Tasks) landmark list to a (33, 4) float32 array of x, y, z, visibility"""
+    arr = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    for i, lm in enumerate(landmarks):
+        arr[i, 0] = lm.x
+        arr[i, 1] = lm.y
+        arr[i, 2] = lm.z
+        arr[i, 3] = lm.visibility or 0.0  # Tasks landmarks may leave it unset
+    return arr
+
+
+def angles_2d(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Vectorized PoseDetector.calculate_angle: angle at b (degrees, 0-180)
+    for any number of (..., >=2) point arrays, using x/y only.
+    """
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) -
+               np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+def angles_3d(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Angle at b (degrees, 0-180) in 3D for any number of (..., >=3) point
+    arrays, e.g. metric world landmarks, so it does not depend on where the
+    camera stands.
+    """
+    ba = a[..., :3] - b[..., :3]
+    bc = c[..., :3] - b[..., :3]
+    norms = np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)
+    cosine = np.sum(ba * bc, axis=-1) / np.maximum(norms, 1e-9)
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def joint_angles(landmarks: np.ndarray, a: int, b: int, c: int) -> np.ndarray:
+    """Angle at landmark b for a (..., 33, 4) landmark array (any batch shape)"""
+    return angles_2d(landmarks[..., a, :], landmarks[..., b, :], landmarks[..., c, :])
+
+
+# Named joint angles used across the engine (vertex is the middle landmark)
+JOINT_ANGLES = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP),
+    "right_shoulder": (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+    "left_body": (LEFT_SHOULDER, LEFT_HIP, LEFT_ANKLE),
+    "right_body": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_ANKLE),
+}
+JOINT_ANGLE_NAMES = list(JOINT_ANGLES)
+_JOINT_INDEX = np.array([JOINT_ANGLES[name] for name in JOINT_ANGLE_NAMES])
+
+
+def all_joint_angles(landmarks: np.ndarray, world: bool = False) -> np.ndarray:
+    """
+    Every JOINT_ANGLES entry at once: (..., 33, 4) -> (..., len(JOINT_ANGLES)).
+    world=True treats the input as world landmarks and measures angles in 3D.
+    """
+    kernel = angles_3d if world else angles_2d
+    return kernel(landmarks[..., _JOINT_INDEX[:, 0], :],
+                  landmarks[..., _JOINT_INDEX[:, 1], :],
+                  landmarks[..., _JOINT_INDEX[:, 2], :])
+
+
+class LandmarkPoint:
+    """Read-only view of one landmark row, shaped like a MediaPipe landmark"""
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, row):
+        self.x = float(row[0])
+        self.y = float(row[1])
+        self.z = float(row[2])
+        self.visibility = float(row[3])
+
+
+class LandmarkList:
+    """
+    Wraps a (33, 4) landmark array so the detect_* methods can index it
+    exactly like `results.pose_landmarks.landmark`.
+    """
+
+    def __init__(self, array: np.ndarray):
+        array = np.asarray(array, dtype=np.float32)
+        if array.shape != (NUM_LANDMARKS, 4):
+            raise ValueError(f"Expected landmark array of shape (33, 4), got {array.shape}")
+        self.array = array
+
+    def __getitem__(self, index) -> LandmarkPoint:
+        return LandmarkPoint(self.array[index])
+
+    def __len__(self):
+        return NUM_LANDMARKS
+
+    def __iter__(self):
+        for row in self.array:
+            yield LandmarkPoint(row)
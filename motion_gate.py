@@ -0,0 +1,74 @@
+"""
+Motion-gated inference
+Compares tiny grayscale thumbnails of consecutive frames so pose inference
+can be skipped while the scene is static.
+"""
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_THUMB_SIZE = (32, 24)
+
+
+class MotionGate:
+    """
+    Decides per frame whether the pose model needs to run.
+
+    Each frame is shrunk to a small grayscale thumbnail (area averaging also
+    cancels most sensor noise) and compared with the thumbnail of the last
+    frame that was actually inferred. Inference runs when more than
+    `min_changed` of the thumbnail pixels differ by over `pixel_threshold`
+    grey levels, or when `max_interval` seconds have passed since the last
+    inference. Counting changed pixels rather than averaging the difference
+    keeps a small moving limb from being drowned out by a still background.
+    """
+
+    def __init__(self, pixel_threshold: int = 6, min_changed: float = 0.005,
+                 max_interval: float = 0.5, thumb_size: Tuple[int, int] = DEFAULT_THUMB_SIZE):
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_interval = max_interval
+        self.thumb_size = thumb_size
+        self.inferred = 0
+        self.skipped = 0
+        self.last_changed = 0.0
+        self._thumb = np.empty((thumb_size[1], thumb_size[0]), dtype=np.uint8)
+        self.reset()
+
+    def reset(self):
+        """Force the next frame through the model"""
+        self._reference = None
+        self._reference_time = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        # Shrink first so the colour conversion only touches a few hundred pixels
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 2:
+            return small
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._thumb)
+
+    def should_infer(self, frame: np.ndarray, timestamp: float) -> bool:
+        thumb = self._thumbnail(frame)
+
+        if self._reference is None:
+            self.last_changed = 1.0
+        else:
+            diff = cv2.absdiff(thumb, self._reference)
+            self.last_changed = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+        # A clock that jumps backwards (new video, restored session) also refreshes
+        if (self._reference is None or self.last_changed > self.min_changed or
+                not 0 <= timestamp - self._reference_time < self.max_interval):
+            self._reference = thumb.copy()
+            self._reference_time = timestamp
+            self.inferred += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_rate(self) -> Optional[float]:
+        total = self.inferred + self.skipped
+        return self.skipped / total if total else None
@@ -0,0 +1,242 @@
+"""
+Multi-person pose tracking
+One camera, several users: detects every body in the frame with the MediaPipe
+Tasks PoseLandmarker, keeps stable track ids across frames and runs a separate
+detector state machine per track.
+
+Requires a PoseLandmarker model bundle, e.g. pose_landmarker_lite.task
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks import python as mp_tasks
+from mediapipe.tasks.python import vision
+
+from src.buffer_pool import get_frame_pool
+from src.form_rules import compute_features
+from src.landmark_utils import NUM_LANDMARKS, VISIBILITY
+from src.overlay_renderer import OverlayRenderer
+from src.pose_detector import PoseDetector
+from src.system_utils import SystemOptimizer
+
+# Distinct skeleton colours so people can tell which track is theirs
+TRACK_COLORS = [
+    (0, 212, 255), (255, 107, 107), (78, 205, 196), (255, 215, 0),
+    (69, 183, 209), (180, 120, 255), (120, 255, 120), (255, 160, 60),
+]
+
+
+def poses_to_array(pose_landmarks) -> np.ndarray:
+    """Convert PoseLandmarker results to one (N, 33, 4) array"""
+    arr = np.zeros((len(pose_landmarks), NUM_LANDMARKS, 4), dtype=np.float32)
+    for p, landmarks in enumerate(pose_landmarks):
+        for i, lm in enumerate(landmarks):
+            arr[p, i, 0] = lm.x
+            arr[p, i, 1] = lm.y
+            arr[p, i, 2] = lm.z
+            arr[p, i, 3] = lm.visibility or 0.0
+    return arr
+
+
+def world_poses_to_array(result) -> Optional[np.ndarray]:
+    """(N, 33, 4) world landmarks matching result.pose_landmarks, or None if the model has none"""
+    world = result.pose_world_landmarks
+    if not world or len(world) != len(result.pose_landmarks):
+        return None
+    return poses_to_array(world)
+
+
+def pose_boxes(poses: np.ndarray, min_visibility: float = 0.5) -> np.ndarray:
+    """Bounding boxes (N, 4) as x1, y1, x2, y2 over the visible landmarks of each pose"""
+    visible = poses[:, :, VISIBILITY] >= min_visibility
+    # Poses with nothing visible fall back to all landmarks
+    visible[~visible.any(axis=1)] = True
+    xs = np.where(visible, poses[:, :, 0], np.nan)
+    ys = np.where(visible, poses[:, :, 1], np.nan)
+    return np.stack([np.nanmin(xs, axis=1), np.nanmin(ys, axis=1),
+                     np.nanmax(xs, axis=1), np.nanmax(ys, axis=1)], axis=1)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (T, 4) and (N, 4) boxes -> (T, N)"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    """One person followed across frames, with their own rep-counting state"""
+
+    def __init__(self, track_id: int, box: np.ndarray, detector: PoseDetector):
+        self.track_id = track_id
+        self.box = box
+        self.detector = detector
+        self.landmarks = None
+        self.missed_frames = 0
+
+
+class PoseTracker:
+    """Greedy IoU matching of detected poses to existing tracks"""
+
+    def __init__(self, settings: Dict, min_iou: float = 0.3, max_missed_frames: int = 15):
+        self.settings = settings
+        self.min_iou = min_iou
+        self.max_missed_frames = max_missed_frames
+        self.tracks = {}
+        self.next_track_id = 1
+
+    def update(self, poses: np.ndarray) -> List[Tuple[Track, int]]:
+        """Assign each detected pose to a track; returns matched (track, pose index) pairs"""
+        boxes = pose_boxes(poses) if len(poses) else np.zeros((0, 4))
+        track_list = list(self.tracks.values())
+        matched = []
+        used_tracks = set()
+        used_poses = set()
+
+        if track_list and len(poses):
+            track_boxes = np.stack([t.box for t in track_list])
+            iou = box_iou(track_boxes, boxes)
+            # Best overlaps first
+            for flat in np.argsort(-iou, axis=None):
+                t, p = np.unravel_index(flat, iou.shape)
+                if iou[t, p] < self.min_iou:
+                    break
+                if t in used_tracks or p in used_poses:
+                    continue
+                used_tracks.add(t)
+                used_poses.add(p)
+                matched.append((track_list[t], p))
+
+        for p in range(len(poses)):
+            if p not in used_poses:
+                track = Track(self.next_track_id, boxes[p],
+                              PoseDetector(settings=self.settings, load_model=False))
+                self.tracks[track.track_id] = track
+                self.next_track_id += 1
+                matched.append((track, p))
+                print(f"👤 New person tracked: #{track.track_id}")
+
+        for t, track in enumerate(track_list):
+            if t not in used_tracks:
+                track.missed_frames += 1
+                if track.missed_frames > self.max_missed_frames:
+                    del self.tracks[track.track_id]
+                    track.detector.release()
+                    print(f"👋 Person #{track.track_id} left the frame")
+
+        pairs = []
+        for track, p in matched:
+            track.box = boxes[p]
+            track.landmarks = poses[p]
+            track.missed_frames = 0
+            pairs.append((track, p))
+        return pairs
+
+    def reset(self):
+        for track in self.tracks.values():
+            track.detector.release()
+        self.tracks = {}
+        self.next_track_id = 1
+
+
+class MultiPersonDetector:
+    """Counts reps for several people seen by one camera"""
+
+    def __init__(self, model_path: str, max_people: int = 4, settings: Optional[Dict] = None):
+        if settings is None:
+            settings = SystemOptimizer().get_optimal_settings()
+        self.settings = settings
+        self.max_people = max_people
+
+        options = vision.PoseLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=max_people,
+            min_pose_detection_confidence=settings['min_detection_confidence'],
+            min_tracking_confidence=settings['min_tracking_confidence'],
+        )
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+        self.tracker = PoseTracker(settings)
+        self.overlay = OverlayRenderer(mp.solutions.pose.POSE_CONNECTIONS)
+        self.frame_pool = get_frame_pool()
+        self.last_timestamp_ms = 0
+        self.last_world_poses = None  # (N, 33, 4) world landmarks of the last detect_poses call
+
+        print(f"✅ Multi-person detector initialized (up to {max_people} people)")
+
+    def detect_poses(self, frame, timestamp_ms: Optional[int] = None) -> np.ndarray:
+        """Run the landmarker once for the whole frame -> (N, 33, 4)"""
+        if timestamp_ms is None:
+            timestamp_ms = int(time.monotonic() * 1000)
+        # VIDEO mode requires strictly increasing timestamps
+        timestamp_ms = max(timestamp_ms, self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+
+        rgb = self.frame_pool.cvt_color(frame, cv2.COLOR_BGR2RGB)
+        try:
+            result = self.landmarker.detect_for_video(
+                mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), timestamp_ms
+            )
+        finally:
+            self.frame_pool.release(rgb)
+        self.last_world_poses = world_poses_to_array(result)
+        return poses_to_array(result.pose_landmarks)
+
+    def process_frame(self, frame, exercise_type: str,
+                      timestamp_ms: Optional[int] = None) -> Tuple[np.ndarray, List[Dict]]:
+        """Returns the annotated frame and one result dict per tracked person"""
+        poses = self.detect_poses(frame, timestamp_ms)
+        timestamp = self.last_timestamp_ms / 1000.0
+        image = self.frame_pool.copy(frame)
+        people = []
+
+        world = self.last_world_poses
+        pairs = self.tracker.update(poses)
+        if pairs:
+            # Joint angles and form features for everyone in one vectorized pass;
+            # all tracks share the settings, so they agree on 2D vs 3D angles
+            use_world = world is not None and pairs[0][0].detector.uses_world_angles(exercise_type)
+            features = compute_features(poses, world if use_world else None)
+
+        for track, p in pairs:
+            rep_complete, feedback = track.detector.process_landmarks(
+                poses[p], exercise_type, timestamp, world[p] if world is not None else None, features[p])
+            people.append({
+                "track_id": track.track_id,
+                "rep_complete": rep_complete,
+                "feedback": feedback,
+                "rep_count": track.detector.rep_count,
+            })
+            self.draw_track(image, track)
+
+        return image, people
+
+    def release_frame(self, image: np.ndarray):
+        """Hand an annotated frame from process_frame back to the pool"""
+        self.frame_pool.release(image)
+
+    def draw_track(self, image, track: Track):
+        h, w = image.shape[:2]
+        color = TRACK_COLORS[track.track_id % len(TRACK_COLORS)]
+        self.overlay.draw_skeleton(image, track.landmarks, color=color)
+
+        x1, y1 = int(track.box[0] * w), int(track.box[1] * h)
+        y = max(y1 - 30, 0)
+        x = self.overlay.draw_text(image, f"#{track.track_id}: ", x1, y, scale=0.6, color=color)
+        self.overlay.draw_number(image, track.detector.rep_count, x, y, scale=0.6, color=color)
+
+    def reset(self):
+        self.tracker.reset()
+
+    def release(self):
+        self.tracker.reset()
+        self.landmarker.close()
@@ -0,0 +1,158 @@
+"""
+Overlay renderer
+Draws the skeleton straight from landmark arrays and the HUD from cached,
+pre-rendered text sprites, so per-frame drawing cost does not depend on
+what the text says.
+"""
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.landmark_utils import VISIBILITY
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+WHITE = (255, 255, 255)
+
+# Matches mp.solutions.drawing_utils: landmarks below this visibility are not drawn
+VISIBILITY_THRESHOLD = 0.5
+
+
+class Sprite:
+    """Pre-rendered BGR image, premultiplied by its alpha mask"""
+    __slots__ = ("image", "inv_alpha", "width", "height")
+
+    def __init__(self, image: np.ndarray, alpha: np.ndarray):
+        alpha = cv2.cvtColor(alpha, cv2.COLOR_GRAY2BGR)
+        self.image = cv2.multiply(image, alpha, scale=1 / 255)
+        self.inv_alpha = 255 - alpha
+        self.height, self.width = image.shape[:2]
+
+    def blit(self, frame: np.ndarray, x: int, y: int):
+        """Alpha-blend onto frame with the top-left corner at (x, y), clipped to the frame"""
+        h, w = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, w), min(y + self.height, h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        sw, sh = x1 - x0, y1 - y0
+
+        # Only the sprite's own rectangle is touched, in place, in uint8
+        roi = frame[y0:y1, x0:x1]
+        cv2.multiply(roi, self.inv_alpha[sy:sy + sh, sx:sx + sw], dst=roi, scale=1 / 255)
+        cv2.add(roi, self.image[sy:sy + sh, sx:sx + sw], dst=roi)
+
+
+def render_text(text: str, scale: float, color: Tuple[int, int, int], thickness: int,
+                background: Optional[Tuple[int, int, int]] = None,
+                background_alpha: float = 0.6, padding: int = 8) -> Sprite:
+    """Render text once into a sprite, optionally on a translucent banner"""
+    (text_w, text_h), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+    pad = padding if background is not None else thickness
+    w, h = text_w + 2 * pad, text_h + baseline + 2 * pad
+    origin = (pad, pad + text_h)
+
+    image = np.zeros((h, w, 3), dtype=np.uint8)
+    alpha = np.zeros((h, w), dtype=np.uint8)
+    if background is not None:
+        image[:] = background
+        alpha[:] = int(background_alpha * 255)
+
+    cv2.putText(image, text, origin, FONT, scale, color, thickness, cv2.LINE_AA)
+    # The same text drawn in white on the mask gives anti-aliased coverage
+    cv2.putText(alpha, text, origin, FONT, scale, 255, thickness, cv2.LINE_AA)
+    return Sprite(image, alpha)
+
+
+class OverlayRenderer:
+    """
+    Skeleton and HUD drawing for annotated frames.
+
+    Drawing styles are fixed at construction. Text sprites are cached (LRU)
+    so feedback that repeats frame after frame is rendered only once, and
+    numbers are composed from pre-rendered digit glyphs.
+    """
+
+    def __init__(self, connections: Iterable[Tuple[int, int]],
+                 landmark_color: Tuple[int, int, int] = (0, 212, 255),
+                 connection_color: Tuple[int, int, int] = (0, 191, 255),
+                 thickness: int = 2, circle_radius: int = 2, max_sprites: int = 128):
+        self.connections = np.array(sorted(connections), dtype=np.int32)
+        self.landmark_color = landmark_color
+        self.connection_color = connection_color
+        self.thickness = thickness
+        self.circle_radius = circle_radius
+        self.border_radius = max(circle_radius + 1, int(circle_radius * 1.2))
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()
+        self.glyphs = {}
+
+    # ------------------
+    # Skeleton
+    # ------------------
+    def draw_skeleton(self, image: np.ndarray, landmarks: np.ndarray,
+                      color: Optional[Tuple[int, int, int]] = None):
+        """Draw a (33, 4) landmark array (normalized coordinates) onto image in place"""
+        h, w = image.shape[:2]
+        points = np.rint(landmarks[:, :2] * (w, h)).astype(np.int32)
+        visible = landmarks[:, VISIBILITY] >= VISIBILITY_THRESHOLD
+
+        # One call for all bones, and one per colour for the joints: a
+        # zero-length segment drawn with a thick pen is a filled dot
+        bones = self.connections[visible[self.connections].all(axis=1)]
+        if len(bones):
+            cv2.polylines(image, points[bones], False, color or self.connection_color, self.thickness)
+
+        dots = np.repeat(points[visible][:, None, :], 2, axis=1)
+        if len(dots):
+            if color is None:
+                cv2.polylines(image, dots, False, WHITE, 2 * self.border_radius + self.thickness)
+            cv2.polylines(image, dots, False, color or self.landmark_color,
+                          2 * self.circle_radius + self.thickness)
+
+    # ------------------
+    # Text
+    # ------------------
+    def sprite(self, text: str, scale: float = 0.7, color: Tuple[int, int, int] = WHITE,
+               thickness: int = 2, background: Optional[Tuple[int, int, int]] = None) -> Sprite:
+        key = (text, scale, color, thickness, background)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = render_text(text, scale, color, thickness, background)
+            self.sprites[key] = sprite
+            if len(self.sprites) > self.max_sprites:
+                self.sprites.popitem(last=False)
+        else:
+            self.sprites.move_to_end(key)
+        return sprite
+
+    def draw_text(self, image: np.ndarray, text: str, x: int, y: int, **style) -> int:
+        """Blit text with its top-left corner at (x, y); returns the x after it"""
+        sprite = self.sprite(text, **style)
+        sprite.blit(image, x, y)
+        return x + sprite.width
+
+    def draw_number(self, image: np.ndarray, value: int, x: int, y: int,
+                    scale: float = 1.0, color: Tuple[int, int, int] = (0, 212, 255),
+                    thickness: int = 2) -> int:
+        """Blit an integer from cached digit glyphs; returns the x after it"""
+        style = (scale, color, thickness)
+        glyphs = self.glyphs.get(style)
+        if glyphs is None:
+            glyphs = {ch: render_text(ch, scale, color, thickness) for ch in "-0123456789"}
+            self.glyphs[style] = glyphs
+        for ch in str(value):
+            glyph = glyphs[ch]
+            glyph.blit(image, x, y)
+            # Glyphs carry `thickness` of padding on each side; advance by the text width only
+            x += glyph.width - 2 * thickness
+        return x + 2 * thickness
+
+    def draw_hud(self, image: np.ndarray, count: int, feedback: str, label: str = "Reps: "):
+        """Rep counter and feedback banner in the top-left corner"""
+        x = self.draw_text(image, label, 10, 20, scale=1.0, color=(0, 212, 255))
+        self.draw_number(image, count, x, 20)
+        if feedback:
+            self.draw_text(image, feedback, 10, 70, background=(0, 0, 0))
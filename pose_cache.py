@@ -0,0 +1,97 @@
+"""
+Pose change detection
+Watches the joints an exercise depends on so frames where the body has not
+moved can reuse the previous detector result instead of recomputing it.
+"""
+from typing import Optional
+
+import numpy as np
+
+from src.landmark_utils import (
+    LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST,
+    RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST,
+    X, Y,
+)
+
+BODY_JOINTS = [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST,
+               LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE]
+
+# Joints each detector reads; anything not listed falls back to BODY_JOINTS
+EXERCISE_JOINTS = {
+    "squat": [LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE],
+    "wall-sit": [LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE],
+    "sit-up": [LEFT_SHOULDER, LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE],
+    "tricep-dip": [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW,
+                   LEFT_WRIST, RIGHT_WRIST, LEFT_HIP],
+    "arm-circles": [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST],
+    "jumping-jack": [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_WRIST, RIGHT_WRIST, LEFT_ANKLE, RIGHT_ANKLE],
+    "high-knees": [LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE],
+}
+
+# Detectors whose stage can keep advancing on an unchanged pose (a horizontal
+# body counts as both "standing" and "plank" for burpees), so never skip them
+UNCACHED_EXERCISES = {"burpee"}
+
+DEFAULT_TOLERANCE = 0.01  # ~6 px at 640x480, about MediaPipe's jitter on a still body
+
+
+class PoseChangeCache:
+    """
+    Tells the detector when a frame can reuse the previous result.
+
+    A frame is a repeat when no relevant joint has moved more than
+    `tolerance` (normalized units) from the pose the detector last saw
+    change. Comparing against that anchor rather than fixed grid cells means
+    a still joint sitting on a cell edge cannot flicker. The first `settle_frames`
+    repeats are still evaluated so the detector (and its smoothing windows)
+    settles into its steady-state result for that pose; after that, repeats
+    are skipped until the pose changes.
+    """
+
+    def __init__(self, tolerance: float = DEFAULT_TOLERANCE, settle_frames: int = 1):
+        self.tolerance = tolerance
+        self.settle_frames = settle_frames
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self):
+        self._exercise = None
+        self._joints = None
+        self._anchor = None
+        self._repeats = 0
+
+    def prime(self, landmarks: np.ndarray, exercise_type: str):
+        """Treat `landmarks` as a pose the detector has already settled on"""
+        self._exercise = exercise_type
+        self._joints = EXERCISE_JOINTS.get(exercise_type, BODY_JOINTS)
+        self._anchor = landmarks[self._joints, X:Y + 1].copy()
+        self._repeats = self.settle_frames
+
+    def is_repeat(self, landmarks: np.ndarray, exercise_type: str) -> bool:
+        """True when the detector can be skipped for this frame"""
+        if exercise_type in UNCACHED_EXERCISES:
+            self.misses += 1
+            return False
+        if exercise_type != self._exercise:
+            self._exercise = exercise_type
+            self._joints = EXERCISE_JOINTS.get(exercise_type, BODY_JOINTS)
+            self._anchor = None
+
+        points = landmarks[self._joints, X:Y + 1]
+        if self._anchor is None or np.abs(points - self._anchor).max() > self.tolerance:
+            self._anchor = points.copy()
+            self._repeats = 0
+            self.misses += 1
+            return False
+        if self._repeats < self.settle_frames:
+            self._repeats += 1
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
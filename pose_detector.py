@@ -1,32 +1,101 @@
+import copy
+
 import cv2
 import mediapipe as mp
 import numpy as np
 import time
 from typing import Optional, Tuple, Dict
 
+from src.buffer_pool import get_frame_pool, get_memory_budget
+from src.form_rules import FEATURE_INDEX, FormScorer
+from src.inference_backend import create_backend
+from src.exercise_categories import get_angle_space
+from src.landmark_utils import (
+    LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST,
+    RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST,
+    JOINT_ANGLES, LandmarkList, angles_3d, landmarks_to_array,
+)
+from src.motion_gate import MotionGate
+from src.overlay_renderer import OverlayRenderer
+from src.pose_cache import PoseChangeCache
+from src.rep_events import RepEventLog
+from src.rolling_stats import RollingStats
+from src.session_state import SessionState
 from src.system_utils import SystemOptimizer
 
+# Angle/position thresholds shared by the detectors, the vectorized engine and calibration.
+# Angles in degrees, distances in normalized image units.
+DETECTOR_THRESHOLDS = {
+    "push-up": {
+        "up_angle": 160,             # arms extended
+        "down_angle": 90,            # arms bent
+        "deep_angle": 70,
+        "body_min_angle": 160,       # shoulder-hip-ankle straight line
+        "body_max_angle": 200,
+        "shoulder_hip_offset": 0.15,
+        "arm_symmetry": 20,
+    },
+    "squat": {
+        "up_angle": 160,
+        "down_angle": 100,
+        "deep_angle": 80,
+        "leg_symmetry": 30,
+    },
+    "sit-up": {
+        "up_angle": 60,              # torso angle when sitting up (below)
+        "down_angle": 100,           # torso angle when lying down (above)
+        "full_range_angle": 140,
+        "knee_bent_angle": 95,       # pyramid position
+    },
+    "lunge": {
+        "stance_ratio": 1.5,         # ankle distance vs shoulder width
+        "forward_ratio": 1.2,
+        "bent_angle": 120,
+        "straight_angle": 160,
+        "deep_angle": 90,
+    },
+    "tricep-dip": {
+        "up_angle": 160,
+        "down_angle": 100,
+        "deep_angle": 80,
+        "wrist_offset": 0.05,        # wrists behind hips
+    },
+    "wall-sit": {
+        "sit_min_angle": 80,         # knee angle range counted as sitting
+        "sit_max_angle": 110,
+        "upright_offset": 0.1,       # shoulder-hip horizontal offset (back against the wall)
+    },
+}
+
+# Exercises whose "rep_count" is the hold time in seconds
+HOLD_EXERCISES = {"plank", "wall-sit"}
+
+# (a, b, c) landmark triple -> column of a form_rules feature row
+JOINT_FEATURES = {joint: FEATURE_INDEX[name] for name, joint in JOINT_ANGLES.items()}
+
 
 class PoseDetector:
-    def __init__(self):
+    def __init__(self, settings: Optional[Dict] = None, load_model: bool = True):
+        """
+        settings: pre-computed SystemOptimizer settings (skips hardware profiling)
+        load_model: False for sessions that only receive landmark arrays
+        """
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
 
         # DETECT HARDWARE AND GET OPTIMAL SETTINGS
-        optimizer = SystemOptimizer()
-        settings = optimizer.get_optimal_settings()
+        if settings is None:
+            optimizer = SystemOptimizer()
+            settings = optimizer.get_optimal_settings()
 
         print(f"🎯 Pose Detection Mode: {settings['description']}")
 
-        # Initialize MediaPipe with optimal settings
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=settings['model_complexity'],
-            enable_segmentation=False,
-            min_detection_confidence=settings['min_detection_confidence'],
-            min_tracking_confidence=settings['min_tracking_confidence'],
-            smooth_landmarks=settings['smooth_landmarks'],
-        )
+        self.settings = settings
+
+        # Initialize the pose inference backend with optimal settings
+        self.pose = None
+        if load_model:
+            self.init_model()
 
         # Store settings for camera optimization
         self.camera_settings = {
@@ -37,21 +106,103 @@ class PoseDetector:
 
         self.frame_skip = settings['process_every_n_frames']
 
-        self.current_exercise = None
-        self.rep_count = 0
-        self.stage = None
-        self.form_feedback = ""
+        # Per-instance copy so a session (or a calibration run) can override thresholds
+        self.thresholds = copy.deepcopy(DETECTOR_THRESHOLDS)
+
+        # All per-session progress lives in one slotted record
+        self.state = SessionState()
+
+        # Per-frame inputs shared with the detectors
+        self.frame_time = time.time()
+        self.rebase_timers = False  # set by restore_checkpoint: hold timers are relative to 0
+        self.primary_angle = None  # main joint angle of the current exercise, for rep events
+        self.last_landmarks = None  # (33, 4) array of the last pose seen, for checkpoints
+        self.angle_landmarks = None  # world landmarks the joint angles come from, None for 2D
+        self.frame_features = None  # precomputed form features of this frame (batched callers)
+        self.rep_events = RepEventLog()
+        self.angle_stats = RollingStats(window=5)
+
+        # Declarative form-fault rules (form_rules.FORM_RULES) with per-rep fault scores
+        self.form = FormScorer(self.thresholds, stats=self.angle_stats)
+
+        # Skips the detector while the body is still; holds keep their timers running
+        self.pose_cache = PoseChangeCache(settle_frames=self.angle_stats.window)
+        self.hold_position = None  # (in position, form feedback) from the last plank/wall-sit check
+        self.hold_timers = {
+            "plank": self.advance_plank_timer,
+            "wall-sit": self.advance_wall_sit_timer,
+        }
 
-        # Plank-specific attributes
-        self.plank_start_time = None
-        self.plank_duration = 0
-        self.plank_hold_active = False
+        # Skips pose inference while the scene is static, reusing the last results
+        self.motion_gate = MotionGate()
+        self.last_pose = None  # last inference output, reused on static frames
+        self.last_world_pose = None
+
+        # Opt-in 3D joint angles from metric world landmarks, for exercises registered as "3d"
+        self.world_angles = settings.get('world_angles', False)
+        self.angle_spaces = {}
+
+        # Skeleton/HUD drawing with styles and text sprites built once
+        self.overlay = OverlayRenderer(self.mp_pose.POSE_CONNECTIONS)
+
+        # Annotated frames come from a process-wide pool; callers hand them back with release_frame()
+        self.frame_pool = get_frame_pool()
+        self.memory_budget = get_memory_budget(settings.get('memory_budget_mb'))
+
+        # Exercise id -> detector method
+        self.detectors = {
+            "push-up": self.detect_pushup,
+            "squat": self.detect_squat,
+            "jumping-jack": self.detect_jumping_jack,
+            "sit-up": self.detect_situp,
+            "lunge": self.detect_lunge,
+            "plank": self.detect_plank,
+            "arm-circles": self.detect_arm_circles,
+            "wall-sit": self.detect_wall_sit,
+            "tricep-dip": self.detect_tricep_dip,
+            "burpee": self.detect_burpee,
+            "high-knees": self.detect_high_knees,
+            "leg-raise": self.detect_leg_raise,
+        }
 
         print(f"✅ Pose detector initialized")
         print(f"   └─ Model Complexity: {settings['model_complexity']}")
         print(f"   └─ Camera: {settings['camera_width']}x{settings['camera_height']}@{settings['camera_fps']}fps")
         print(f"   └─ Frame Processing: Every {settings['process_every_n_frames']} frames")
 
+    # Public progress fields, kept as attributes of the detector for callers
+    @property
+    def rep_count(self) -> int:
+        return self.state.rep_count
+
+    @rep_count.setter
+    def rep_count(self, value: int):
+        self.state.rep_count = value
+
+    @property
+    def stage(self):
+        return self.state.stage
+
+    @stage.setter
+    def stage(self, value):
+        self.state.stage = value
+
+    @property
+    def current_exercise(self) -> Optional[str]:
+        return self.state.current_exercise
+
+    @current_exercise.setter
+    def current_exercise(self, value: Optional[str]):
+        self.state.current_exercise = value
+
+    def init_model(self):
+        """Create the pose inference backend from the stored settings"""
+        self.pose = self.create_model()
+
+    def create_model(self, model_complexity: Optional[int] = None):
+        """Build a pose inference backend (optionally with a different complexity)"""
+        return create_backend(self.settings, model_complexity)
+
     def get_interpolation_method(self):
         """Get OpenCV interpolation method based on quality preset"""
         methods = {
@@ -76,113 +227,88 @@ class PoseDetector:
 
         return angle
 
+    def joint_angle(self, landmarks, a: int, b: int, c: int) -> float:
+        """Angle at landmark b: 3D from world landmarks when enabled, else in the image plane"""
+        if self.frame_features is not None:
+            column = JOINT_FEATURES.get((a, b, c))
+            if column is not None:
+                return float(self.frame_features[column])
+        world = self.angle_landmarks
+        if world is not None:
+            return float(angles_3d(world[a], world[b], world[c]))
+        return self.calculate_angle([landmarks[a].x, landmarks[a].y],
+                                    [landmarks[b].x, landmarks[b].y],
+                                    [landmarks[c].x, landmarks[c].y])
+
     def detect_pushup(self, landmarks) -> Tuple[bool, str]:
-        # Get all necessary landmarks
-        left_shoulder = [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                         landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-        right_shoulder = [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                          landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-        left_elbow = [landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-        right_elbow = [landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-        left_wrist = [landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-        right_wrist = [landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-        left_hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-        right_hip = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-        left_ankle = [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-        right_ankle = [landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
+        th = self.thresholds["push-up"]
 
         # Calculate angles
-        left_arm_angle = self.calculate_angle(left_shoulder, left_elbow, left_wrist)
-        right_arm_angle = self.calculate_angle(right_shoulder, right_elbow, right_wrist)
+        left_arm_angle = self.joint_angle(landmarks, LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST)
+        right_arm_angle = self.joint_angle(landmarks, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)
         avg_arm_angle = (left_arm_angle + right_arm_angle) / 2
+        self.primary_angle = avg_arm_angle
 
-        # NEW: Calculate body horizontal alignment (shoulder-hip-ankle)
-        body_angle = self.calculate_angle(left_shoulder, left_hip, left_ankle)
-
-        # NEW: Check if body is properly horizontal (plank position)
-        is_horizontal = 160 < body_angle < 200  # The Body should be straight
-        shoulders_hips_aligned = abs(left_shoulder[1] - left_hip[1]) < 0.15  # Shoulders and hips at the same height
-
-        # NEW: Check if wrists are below shoulders (proper push-up position)
-        wrists_below_shoulders = (left_wrist[1] > left_shoulder[1] and
-                                  right_wrist[1] > right_shoulder[1])
-
-        is_plank_position = is_horizontal and shoulders_hips_aligned and wrists_below_shoulders
+        # Plank position (body straight, hips in line, hands below shoulders) and
+        # arm symmetry are form rules; a blocking fault means no plank yet
+        form = self.form.check(self.last_landmarks, "push-up", world=self.angle_landmarks,
+                               features=self.frame_features)
 
         feedback = "GET IN PLANK POSITION"
         rep_complete = False
 
-        if not is_plank_position:
-            return False, "Get in proper plank position - body straight, hands below shoulders"
+        if form.blocked:
+            return False, form.feedback
 
         # Only count reps if in proper plank position
-        if avg_arm_angle > 160:
-            if self.stage == "down":
-                self.rep_count += 1
+        if avg_arm_angle > th["up_angle"]:
+            if self.state.stage == "down":
+                self.state.rep_count += 1
                 rep_complete = True
-            self.stage = "up"
+            self.state.stage = "up"
             feedback = "START PUSH UP"
-        elif avg_arm_angle < 90:
-            self.stage = "down"
-            if avg_arm_angle < 70:
+        elif avg_arm_angle < th["down_angle"]:
+            self.state.stage = "down"
+            if avg_arm_angle < th["deep_angle"]:
                 feedback = "GO LOWER - CHEST TO GROUND"
             else:
                 feedback = "GOOD DEPTH"
 
-        # Check arm symmetry
-        arm_symmetry = abs(left_arm_angle - right_arm_angle)
-        if arm_symmetry > 20:
-            feedback = "KEEP ARMS EVEN"
+        # Remaining faults (e.g. uneven arms, averaged over recent frames) take over the feedback
+        if form.feedback:
+            feedback = form.feedback
 
         return rep_complete, feedback
 
     def detect_squat(self, landmarks) -> Tuple[bool, str]:
-        left_hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-        right_hip = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-        left_knee = [landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-        right_knee = [landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-        left_ankle = [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-        right_ankle = [landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
+        th = self.thresholds["squat"]
 
         # Calculate angles for BOTH legs
-        left_angle = self.calculate_angle(left_hip, left_knee, left_ankle)
-        right_angle = self.calculate_angle(right_hip, right_knee, right_ankle)
+        left_angle = self.joint_angle(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        right_angle = self.joint_angle(landmarks, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
 
         # NEW: Use average of both legs and ensure they move together
         avg_angle = (left_angle + right_angle) / 2
-        leg_symmetry = abs(left_angle - right_angle)
+        self.primary_angle = avg_angle
 
         feedback = "GOOD FORM"
         rep_complete = False
 
-        # Check if legs are moving symmetrically
-        if leg_symmetry > 30:
-            feedback = "KEEP LEGS EVEN - BOTH KNEES SHOULD BEND TOGETHER"
-            return False, feedback
+        # Check if legs are moving symmetrically (form rule over recent frames)
+        form = self.form.check(self.last_landmarks, "squat", world=self.angle_landmarks,
+                               features=self.frame_features)
+        if form.blocked:
+            return False, form.feedback
 
-        if avg_angle > 160:
-            if self.stage == "down":
-                self.rep_count += 1
+        if avg_angle > th["up_angle"]:
+            if self.state.stage == "down":
+                self.state.rep_count += 1
                 rep_complete = True
-            self.stage = "up"
+            self.state.stage = "up"
             feedback = "YOU ARE STANDING, SQUAD DOWN⬇️"
-        elif avg_angle < 100:
-            self.stage = "down"
-            if avg_angle < 80:
+        elif avg_angle < th["down_angle"]:
+            self.state.stage = "down"
+            if avg_angle < th["deep_angle"]:
                 feedback = "PERFECT DEPTH🔥! NOW GET BACK UP "
             else:
                 feedback = "GOOD SQUAT"
@@ -223,33 +349,33 @@ class PoseDetector:
         rep_complete = False
 
         # Initialize state machine
-        if self.stage is None:
-            self.stage = "init"
+        if self.state.stage is None:
+            self.state.stage = "init"
             return False, "Get ready - arms down, legs together"
 
         # State machine logic
-        if self.stage == "init":
+        if self.state.stage == "init":
             if is_neutral:
-                self.stage = "together"
+                self.state.stage = "together"
                 feedback = "READY - JUMP AND SPREAD!"
             else:
                 feedback = "START WITH ARMS DOWN & LEGS TOGETHER"
 
-        elif self.stage == "together":
+        elif self.state.stage == "together":
             if arms_raised and arms_spread and legs_spread:
-                self.stage = "apart"
+                self.state.stage = "apart"
                 feedback = "GOOD SPREAD! NOW RETURN ✨"
             elif is_neutral:
                 feedback = "JUMP! SPREAD ARMS & LEGS WIDER"
             else:
                 feedback = "SPREAD ARMS & LEGS WIDER"
 
-        elif self.stage == "apart":
+        elif self.state.stage == "apart":
             if is_neutral:
                 # COUNT THE REP - Full cycle completed
-                self.rep_count += 1
+                self.state.rep_count += 1
                 rep_complete = True
-                self.stage = "together"  # Reset for next rep
+                self.state.stage = "together"  # Reset for next rep
                 feedback = "REP COMPLETE! 🔥"
             elif not arms_raised:
                 feedback = "BRING LEGS TOGETHER"
@@ -261,50 +387,37 @@ class PoseDetector:
         return rep_complete, feedback
 
     def detect_situp(self, landmarks) -> Tuple[bool, str]:
-        left_shoulder = [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                         landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-        right_shoulder = [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                          landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-        left_hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-        right_hip = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-        left_knee = [landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-        right_knee = [landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-        left_ankle = [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-        right_ankle = [landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
+        th = self.thresholds["sit-up"]
 
         # Calculate leg angles to ensure proper sit-up position
-        left_leg_angle = self.calculate_angle(left_hip, left_knee, left_ankle)
-        right_leg_angle = self.calculate_angle(right_hip, right_knee, right_ankle)
+        left_leg_angle = self.joint_angle(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        right_leg_angle = self.joint_angle(landmarks, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
         avg_leg_angle = (left_leg_angle + right_leg_angle) / 2
 
         # Calculate torso angle
-        torso_angle = self.calculate_angle(left_shoulder, left_hip, left_knee)
+        torso_angle = self.joint_angle(landmarks, LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)
+        self.primary_angle = torso_angle
 
         feedback = "GET IN SIT-UP POSITION"
         rep_complete = False
 
         # FIXED: Adjust pyramid position to <95° for better user experience
-        legs_bent = avg_leg_angle < 95  # CHANGED: More user-friendly pyramid detection
+        smoothed_leg_angle = self.angle_stats.push('situp_leg_angle', avg_leg_angle).mean
+        legs_bent = smoothed_leg_angle < th["knee_bent_angle"]  # CHANGED: More user-friendly pyramid detection
 
         if not legs_bent:
             return False, "Bend knees to pyramid position 🔺 (knees at <95°)"
 
         # Sit-up state machine - only works with proper leg position
-        if torso_angle < 60:  # Sitting up position
-            if self.stage == "down":
-                self.rep_count += 1
+        if torso_angle < th["up_angle"]:  # Sitting up position
+            if self.state.stage == "down":
+                self.state.rep_count += 1
                 rep_complete = True
-            self.stage = "up"
+            self.state.stage = "up"
             feedback = "SIT UP COMPLETE! 💪"
-        elif torso_angle > 100:  # Lying down position
-            self.stage = "down"
-            if torso_angle > 140:
+        elif torso_angle > th["down_angle"]:  # Lying down position
+            self.state.stage = "down"
+            if torso_angle > th["full_range_angle"]:
                 feedback = "FULL RANGE - EXCELLENT! 🔥"
             else:
                 feedback = "GOOD RANGE OF MOTION"
@@ -313,14 +426,6 @@ class PoseDetector:
 
     def detect_lunge(self, landmarks) -> Tuple[bool, str]:
         """Enhanced lunge detection with proper stance validation"""
-        left_hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-        right_hip = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-        left_knee = [landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-        right_knee = [landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
         left_ankle = [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
                       landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
         right_ankle = [landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
@@ -330,9 +435,12 @@ class PoseDetector:
         right_shoulder = [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
                           landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
 
+        th = self.thresholds["lunge"]
+
         # Calculate knee angles for both legs
-        left_knee_angle = self.calculate_angle(left_hip, left_knee, left_ankle)
-        right_knee_angle = self.calculate_angle(right_hip, right_knee, right_ankle)
+        left_knee_angle = self.joint_angle(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        right_knee_angle = self.joint_angle(landmarks, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+        self.primary_angle = min(left_knee_angle, right_knee_angle)
 
         # Check for proper lunge stance (legs split front/back)
         # Calculate horizontal distance between ankles
@@ -343,11 +451,11 @@ class PoseDetector:
 
         # CRITICAL: Legs must be split apart (front/back stance)
         # In a lunge, ankles should be wider apart than shoulders
-        is_split_stance = ankle_distance > shoulder_width * 1.5
+        is_split_stance = ankle_distance > shoulder_width * th["stance_ratio"]
 
         # Check if one leg is in front of the other
         # (not just standing with knees bent)
-        front_leg_forward = abs(left_ankle[0] - right_ankle[0]) > shoulder_width * 1.2
+        front_leg_forward = abs(left_ankle[0] - right_ankle[0]) > shoulder_width * th["forward_ratio"]
 
         feedback = "Step into a lunge - one leg forward, one back"
         rep_complete = False
@@ -357,35 +465,35 @@ class PoseDetector:
             return False, "Get into lunge position - step one leg forward 🦿"
 
         # Now check knee bending (only if in proper stance)
-        both_knees_bent = left_knee_angle < 120 and right_knee_angle < 120
-        both_knees_straight = left_knee_angle > 160 and right_knee_angle > 160
+        both_knees_bent = left_knee_angle < th["bent_angle"] and right_knee_angle < th["bent_angle"]
+        both_knees_straight = left_knee_angle > th["straight_angle"] and right_knee_angle > th["straight_angle"]
 
         # State machine (only works with proper stance)
-        if self.stage is None:
-            self.stage = "standing"
+        if self.state.stage is None:
+            self.state.stage = "standing"
             feedback = "Good stance! Now lower into lunge"
 
-        if self.stage == "standing" and both_knees_bent:
+        if self.state.stage == "standing" and both_knees_bent:
             # Entered lunge position
-            self.stage = "lunge"
+            self.state.stage = "lunge"
             feedback = "Good lunge! Hold it for a moment"
 
-        elif self.stage == "lunge" and both_knees_straight:
+        elif self.state.stage == "lunge" and both_knees_straight:
             # Returned to standing - COUNT THE REP
-            self.rep_count += 1
+            self.state.rep_count += 1
             rep_complete = True
-            self.stage = "standing"
+            self.state.stage = "standing"
             feedback = "REP COMPLETE! 💪 Great work!"
 
-        elif self.stage == "lunge" and not both_knees_bent:
+        elif self.state.stage == "lunge" and not both_knees_bent:
             feedback = "Hold the lunge position"
 
-        elif self.stage == "standing" and not both_knees_straight:
+        elif self.state.stage == "standing" and not both_knees_straight:
             feedback = "Stand up fully between reps"
 
         # Additional form guidance
         if both_knees_bent and is_split_stance:
-            if left_knee_angle < 90 or right_knee_angle < 90:
+            if left_knee_angle < th["deep_angle"] or right_knee_angle < th["deep_angle"]:
                 feedback = "Perfect depth! 🔥"
             else:
                 feedback = "Good! Lower a bit more for full depth"
@@ -423,9 +531,7 @@ class PoseDetector:
         left_arm_angle = self.calculate_angle(left_shoulder, left_elbow, left_wrist)
         right_arm_angle = self.calculate_angle(right_shoulder, right_elbow, right_wrist)
         avg_arm_angle = (left_arm_angle + right_arm_angle) / 2
-
-        feedback = "GET IN PLANK POSITION"
-        rep_complete = False
+        self.primary_angle = body_angle
 
         # Comprehensive plank position check
         is_body_straight = 160 < body_angle < 200  # Body straight
@@ -438,89 +544,98 @@ class PoseDetector:
         is_plank_position = (is_body_straight and is_body_horizontal and
                              is_facing_down and has_proper_arms and wrists_below_shoulders)
 
-        current_time = time.time()
+        # Specific form feedback, shown until the first plank starts
+        if not is_body_straight:
+            form_feedback = "KEEP BODY STRAIGHT - DON'T SAG OR ARCH"
+        elif not is_body_horizontal:
+            form_feedback = "ALIGN SHOULDERS WITH HIPS"
+        elif not has_proper_arms:
+            form_feedback = "FORM 90-DEGREE ANGLES WITH ARMS"
+        elif not is_facing_down:
+            form_feedback = "FACE DOWN - HEAD IN NEUTRAL POSITION"
+        else:
+            form_feedback = "GET IN PLANK POSITION - ARMS BENT, BODY STRAIGHT"
+
+        self.hold_position = (is_plank_position, form_feedback)
+        return self.advance_plank_timer(is_plank_position, form_feedback)
+
+    def advance_plank_timer(self, is_plank_position: bool, form_feedback: str) -> Tuple[bool, str]:
+        """Plank hold/pause bookkeeping for the current frame time"""
+        feedback = "GET IN PLANK POSITION"
+        current_time = self.frame_time
 
         if is_plank_position:
             # USER IS IN PLANK POSITION
-            if not self.plank_hold_active:
+            if not self.state.plank_hold_active:
                 # Just entered plank position - check if we were paused
-                if hasattr(self, 'plank_pause_time'):
-                    pause_duration = current_time - self.plank_pause_time
+                if self.state.plank_pause_time is not None:
+                    pause_duration = current_time - self.state.plank_pause_time
 
                     if pause_duration <= 20:  # Within 20-second rest limit
                         # Resume the timer by adjusting start time
-                        self.plank_start_time += pause_duration
+                        self.state.plank_start_time += pause_duration
                         feedback = "WELCOME BACK! PLANK RESUMED 💪"
                         # Clear the pause time
-                        delattr(self, 'plank_pause_time')
+                        self.state.plank_pause_time = None
                     else:
                         # Rest limit exceeded - reset plank completely
-                        self.plank_start_time = current_time
-                        self.plank_duration = 0
-                        self.rep_count = 0
+                        self.state.plank_start_time = current_time
+                        self.state.plank_duration = 0
+                        self.state.rep_count = 0
                         feedback = "REST TIME EXCEEDED - PLANK RESET! 🔄"
                         # Clear the pause time
-                        delattr(self, 'plank_pause_time')
+                        self.state.plank_pause_time = None
                 else:
                     # Starting fresh plank (no previous pause)
-                    if self.plank_start_time is None:
-                        self.plank_start_time = current_time
-                        self.plank_duration = 0
+                    if self.state.plank_start_time is None:
+                        self.state.plank_start_time = current_time
+                        self.state.plank_duration = 0
                     feedback = "PLANK STARTED! HOLD IT! 💪"
 
-                self.plank_hold_active = True
+                self.state.plank_hold_active = True
 
             # Calculate current hold duration
-            self.plank_duration = current_time - self.plank_start_time
-            self.rep_count = int(self.plank_duration)
+            self.state.plank_duration = current_time - self.state.plank_start_time
+            self.state.rep_count = int(self.state.plank_duration)
 
             # Time-based feedback
-            if self.plank_duration < 10:
-                feedback = f"PLANK: {int(self.plank_duration)}s - KEEP GOING!"
-            elif self.plank_duration < 30:
-                feedback = f"PLANK: {int(self.plank_duration)}s - GREAT HOLD!"
-            elif self.plank_duration < 60:
-                feedback = f"PLANK: {int(self.plank_duration)}s - AMAZING ENDURANCE! 🔥"
+            if self.state.plank_duration < 10:
+                feedback = f"PLANK: {int(self.state.plank_duration)}s - KEEP GOING!"
+            elif self.state.plank_duration < 30:
+                feedback = f"PLANK: {int(self.state.plank_duration)}s - GREAT HOLD!"
+            elif self.state.plank_duration < 60:
+                feedback = f"PLANK: {int(self.state.plank_duration)}s - AMAZING ENDURANCE! 🔥"
             else:
-                feedback = f"PLANK: {int(self.plank_duration)}s - LEGENDARY! ⚡"
+                feedback = f"PLANK: {int(self.state.plank_duration)}s - LEGENDARY! ⚡"
 
         else:
             # USER IS NOT IN PLANK POSITION
-            if self.plank_hold_active:
+            if self.state.plank_hold_active:
                 # Just left plank position - start rest timer
-                self.plank_hold_active = False
-                self.plank_pause_time = current_time
+                self.state.plank_hold_active = False
+                self.state.plank_pause_time = current_time
                 feedback = "PLANK PAUSED - GET BACK IN 20s! ⏰"
             else:
                 # Already paused - show countdown
-                if hasattr(self, 'plank_pause_time'):
-                    rest_time = current_time - self.plank_pause_time
+                if self.state.plank_pause_time is not None:
+                    rest_time = current_time - self.state.plank_pause_time
                     time_remaining = 20 - rest_time
 
                     if time_remaining > 0:
                         feedback = f"RETURN TO PLANK IN {int(time_remaining)}s! ⏳"
                     else:
                         # Rest time exceeded - reset everything
-                        self.plank_start_time = None
-                        self.plank_duration = 0
-                        self.rep_count = 0
+                        self.state.plank_start_time = None
+                        self.state.plank_duration = 0
+                        self.state.rep_count = 0
                         feedback = "REST TIME EXCEEDED - PLANK RESET! 🔄"
                         # Clear pause time
-                        delattr(self, 'plank_pause_time')
+                        self.state.plank_pause_time = None
                 else:
                     # First time getting into position or specific form feedback
-                    if not is_body_straight:
-                        feedback = "KEEP BODY STRAIGHT - DON'T SAG OR ARCH"
-                    elif not is_body_horizontal:
-                        feedback = "ALIGN SHOULDERS WITH HIPS"
-                    elif not has_proper_arms:
-                        feedback = "FORM 90-DEGREE ANGLES WITH ARMS"
-                    elif not is_facing_down:
-                        feedback = "FACE DOWN - HEAD IN NEUTRAL POSITION"
-                    else:
-                        feedback = "GET IN PLANK POSITION - ARMS BENT, BODY STRAIGHT"
+                    feedback = form_feedback
 
-        return rep_complete, feedback
+        return False, feedback
 
     def detect_arm_circles(self, landmarks) -> Tuple[bool, str]:
         """
@@ -551,13 +666,8 @@ class PoseDetector:
         feedback = "EXTEND YOUR ARMS OUT"
         rep_complete = False
 
-        # Initialize tracking variables
-        if not hasattr(self, 'arm_circle_stage'):
-            self.arm_circle_stage = None
-            print("🔄 Arm circles tracking initialized")
-
         if not arms_extended:
-            self.arm_circle_stage = None
+            self.state.arm_circle_stage = None
             return False, "EXTEND ARMS STRAIGHT OUT (like airplane wings)"
 
         # ✅ SIMPLIFIED APPROACH: Track vertical position of wrists
@@ -571,44 +681,44 @@ class PoseDetector:
         wrists_at_shoulder = not wrists_above_shoulder and not wrists_below_shoulder
 
         # Simple state machine: up → down → up = 1 circle
-        if self.arm_circle_stage is None:
+        if self.state.arm_circle_stage is None:
             # Initialize based on current position
             if wrists_at_shoulder:
-                self.arm_circle_stage = "middle"
+                self.state.arm_circle_stage = "middle"
                 feedback = "GOOD! START ROTATING - MAKE BIG CIRCLES!"
             elif wrists_above_shoulder:
-                self.arm_circle_stage = "up"
+                self.state.arm_circle_stage = "up"
                 feedback = "START FROM HERE - ROTATE ARMS!"
             elif wrists_below_shoulder:
-                self.arm_circle_stage = "down"
+                self.state.arm_circle_stage = "down"
                 feedback = "START FROM HERE - ROTATE ARMS!"
 
-        elif self.arm_circle_stage == "middle":
+        elif self.state.arm_circle_stage == "middle":
             if wrists_above_shoulder:
-                self.arm_circle_stage = "up"
+                self.state.arm_circle_stage = "up"
                 feedback = "ARMS UP! KEEP GOING!"
             elif wrists_below_shoulder:
-                self.arm_circle_stage = "down"
+                self.state.arm_circle_stage = "down"
                 feedback = "ARMS DOWN! KEEP GOING!"
 
-        elif self.arm_circle_stage == "up":
+        elif self.state.arm_circle_stage == "up":
             if wrists_below_shoulder:
                 # Went from up to down - half circle
-                self.arm_circle_stage = "down"
+                self.state.arm_circle_stage = "down"
                 feedback = "HALFWAY! KEEP ROTATING!"
             elif wrists_at_shoulder:
-                self.arm_circle_stage = "middle"
+                self.state.arm_circle_stage = "middle"
 
-        elif self.arm_circle_stage == "down":
+        elif self.state.arm_circle_stage == "down":
             if wrists_above_shoulder:
                 # Went from down to up
-                self.rep_count += 1
+                self.state.rep_count += 1
                 rep_complete = True
-                self.arm_circle_stage = "up"
-                feedback = f"CIRCLE {self.rep_count} COMPLETE! 🔥"
-                print(f"✅ Arm circle rep counted: {self.rep_count}")
+                self.state.arm_circle_stage = "up"
+                feedback = f"CIRCLE {self.state.rep_count} COMPLETE! 🔥"
+                print(f"✅ Arm circle rep counted: {self.state.rep_count}")
             elif wrists_at_shoulder:
-                self.arm_circle_stage = "middle"
+                self.state.arm_circle_stage = "middle"
 
         return rep_complete, feedback
 
@@ -656,6 +766,7 @@ class PoseDetector:
 
         # Hip-Knee-Ankle angle on the near (more visible) leg
         knee_angle = self.calculate_angle(hip, knee, ankle)
+        self.primary_angle = knee_angle
 
         # Knee physically above hip? (Y decreases going up in image coords)
         knee_above_hip = knee[1] < hip[1]
@@ -665,24 +776,24 @@ class PoseDetector:
         leg_is_down = knee_angle > 150                         # Leg hanging down
 
         # === STATE MACHINE ===
-        if self.stage is None:
-            self.stage = "down"
+        if self.state.stage is None:
+            self.state.stage = "down"
             return False, "STAND SIDEWAYS - KNEES UP! 🔥"
 
-        if self.stage == "down":
+        if self.state.stage == "down":
             if leg_is_up:
-                self.stage = "up"
+                self.state.stage = "up"
                 feedback = "KNEE UP! 💪 NOW SWITCH!"
             else:
                 feedback = "DRIVE THAT KNEE HIGHER! ⬆️"
 
-        elif self.stage == "up":
+        elif self.state.stage == "up":
             if leg_is_down:
                 # Full cycle complete — count the rep
-                self.rep_count += 1
+                self.state.rep_count += 1
                 rep_complete = True
-                self.stage = "down"
-                feedback = f"REP {self.rep_count}! 🔥 KEEP RUNNING!"
+                self.state.stage = "down"
+                feedback = f"REP {self.state.rep_count}! 🔥 KEEP RUNNING!"
             elif not leg_is_up:
                 # Mid-transition, just keep going
                 feedback = "SWITCH LEGS FAST!"
@@ -696,14 +807,6 @@ class PoseDetector:
         """
         Tricep dips: Arms behind back, lower and raise body
         """
-        left_shoulder = [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                         landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-        right_shoulder = [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                          landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-        left_elbow = [landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-        right_elbow = [landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
         left_wrist = [landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].x,
                       landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].y]
         right_wrist = [landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
@@ -711,36 +814,39 @@ class PoseDetector:
         left_hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
                     landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
 
+        th = self.thresholds["tricep-dip"]
+
         # Calculate arm angles
-        left_arm_angle = self.calculate_angle(left_shoulder, left_elbow, left_wrist)
-        right_arm_angle = self.calculate_angle(right_shoulder, right_elbow, right_wrist)
+        left_arm_angle = self.joint_angle(landmarks, LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST)
+        right_arm_angle = self.joint_angle(landmarks, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)
         avg_arm_angle = (left_arm_angle + right_arm_angle) / 2
+        self.primary_angle = avg_arm_angle
 
         # Check if elbows are behind body (wrists behind hips)
         avg_wrist_x = (left_wrist[0] + right_wrist[0]) / 2
         avg_hip_x = left_hip[0]
 
-        elbows_behind = avg_wrist_x > avg_hip_x + 0.05
+        elbows_behind = avg_wrist_x > avg_hip_x + th["wrist_offset"]
 
         feedback = "SIT ON EDGE, HANDS BEHIND"
         rep_complete = False
 
         if not elbows_behind:
-            self.stage = None
+            self.state.stage = None
             return False, "Place hands behind you on chair/bench"
 
         # Arms straight = up position
         # Arms bent = down position
-        if avg_arm_angle > 160:
-            if self.stage == "down":
-                self.rep_count += 1
+        if avg_arm_angle > th["up_angle"]:
+            if self.state.stage == "down":
+                self.state.rep_count += 1
                 rep_complete = True
-            self.stage = "up"
+            self.state.stage = "up"
             feedback = "LOWER DOWN"
 
-        elif avg_arm_angle < 100:
-            self.stage = "down"
-            if avg_arm_angle < 80:
+        elif avg_arm_angle < th["down_angle"]:
+            self.state.stage = "down"
+            if avg_arm_angle < th["deep_angle"]:
                 feedback = "PERFECT DEPTH! Push up!"
             else:
                 feedback = "GOOD! Now push up!"
@@ -770,6 +876,7 @@ class PoseDetector:
 
         # Determine body position
         body_angle = self.calculate_angle(left_shoulder, left_hip, left_ankle)
+        self.primary_angle = body_angle
 
         is_standing = body_angle > 160  # Upright
         is_plank = 160 < body_angle < 200 and left_shoulder[1] < left_ankle[1]  # Horizontal
@@ -777,22 +884,22 @@ class PoseDetector:
         feedback = "START STANDING"
         rep_complete = False
 
-        if self.stage is None:
-            self.stage = "standing"
+        if self.state.stage is None:
+            self.state.stage = "standing"
 
-        if self.stage == "standing":
+        if self.state.stage == "standing":
             if is_plank:
-                self.stage = "plank"
+                self.state.stage = "plank"
                 feedback = "IN PLANK! Now jump up!"
             else:
                 feedback = "Drop to plank position!"
 
-        elif self.stage == "plank":
+        elif self.state.stage == "plank":
             if is_standing:
-                self.rep_count += 1
+                self.state.rep_count += 1
                 rep_complete = True
-                self.stage = "standing"
-                feedback = f"BURPEE {self.rep_count}! 🔥"
+                self.state.stage = "standing"
+                feedback = f"BURPEE {self.state.rep_count}! 🔥"
             else:
                 feedback = "Jump back up to standing!"
 
@@ -846,60 +953,61 @@ class PoseDetector:
         # === ANGLE 2: Hip Flexion (Shoulder → Hip → Ankle) ===
         # Tracks actual range of motion
         hip_flexion_angle = self.calculate_angle(avg_shoulder, avg_hip, avg_ankle)
+        self.primary_angle = hip_flexion_angle
 
         feedback = "LIE FLAT - LEGS STRAIGHT"
         rep_complete = False
 
         # === FORM CHECK 1: Are legs straight? ===
         if not legs_straight:
-            self.stage = None
+            self.state.stage = None
             return False, "STRAIGHTEN LEGS - NO KNEE TUCKS! 🚫"
 
         # === FORM CHECK 2: Basic lying down position ===
         # Check if shoulders and hips are roughly aligned (lying flat)
         is_lying = abs(avg_shoulder[1] - avg_hip[1]) < 0.35
         if not is_lying:
-            self.stage = None
+            self.state.stage = None
             return False, "LIE FLAT ON YOUR BACK"
 
         # === STATE MACHINE ===
         # Initialize stage
-        if self.stage is None:
+        if self.state.stage is None:
             if hip_flexion_angle > 150:
-                self.stage = "down"
+                self.state.stage = "down"
                 feedback = "LEGS DOWN - READY TO RAISE!"
             else:
-                self.stage = "unknown"
+                self.state.stage = "unknown"
                 feedback = "Lower legs to start position"
 
         # DOWN STATE: Legs near floor (hip flexion > 150°)
-        if self.stage == "down":
+        if self.state.stage == "down":
             # FORM CHECK 3: Floor resting detection
             if hip_flexion_angle > 175:
                 feedback = "DON'T REST - HOVER HEELS! 🔥"
 
             # Transition to UP when legs reach L-shape (< 105°)
             if hip_flexion_angle < 105:
-                self.stage = "up"
+                self.state.stage = "up"
                 feedback = "PERFECT L-SHAPE! 🔥 NOW LOWER SLOWLY"
             else:
                 feedback = "RAISE LEGS TO 90° (L-SHAPE)"
 
         # UP STATE: Legs at L-shape (hip flexion < 105°)
-        elif self.stage == "up":
+        elif self.state.stage == "up":
             # Rep completes when returning to down position (> 150°)
             if hip_flexion_angle > 150:
-                self.rep_count += 1
+                self.state.rep_count += 1
                 rep_complete = True
-                self.stage = "down"
-                feedback = f"REP {self.rep_count} COMPLETE! 💪 GREAT CONTROL!"
+                self.state.stage = "down"
+                feedback = f"REP {self.state.rep_count} COMPLETE! 💪 GREAT CONTROL!"
             else:
                 feedback = "LOWER SLOWLY - CONTROL THE ECCENTRIC"
 
         # UNKNOWN STATE: Help user get into position
-        elif self.stage == "unknown":
+        elif self.state.stage == "unknown":
             if hip_flexion_angle > 150:
-                self.stage = "down"
+                self.state.stage = "down"
                 feedback = "GOOD START - NOW RAISE LEGS!"
             else:
                 feedback = "Lower legs to floor to begin"
@@ -913,139 +1021,192 @@ class PoseDetector:
         """
         Wall sit: Isometric hold with back against wall, thighs parallel
         """
-        left_hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-        left_knee = [landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-        left_ankle = [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                      landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-        left_shoulder = [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                         landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-
         # Calculate leg angle
-        leg_angle = self.calculate_angle(left_hip, left_knee, left_ankle)
-
-        # Check if in sitting position (90 degree angle)
-        is_sitting = 80 < leg_angle < 110
+        leg_angle = self.joint_angle(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        self.primary_angle = leg_angle
 
-        # Check if back is vertical (against wall)
-        is_upright = abs(left_shoulder[0] - left_hip[0]) < 0.1
-
-        feedback = "GET INTO WALL SIT POSITION"
-        rep_complete = False
+        # Back against the wall and knees near 90° are form rules; the most
+        # important broken one tells the user what to fix
+        form = self.form.check(self.last_landmarks, "wall-sit", world=self.angle_landmarks,
+                               features=self.frame_features)
+        is_wall_sit = not form.blocked
+        form_feedback = form.feedback or "GET INTO WALL SIT POSITION"
 
-        is_wall_sit = is_sitting and is_upright
+        self.hold_position = (is_wall_sit, form_feedback)
+        return self.advance_wall_sit_timer(is_wall_sit, form_feedback)
 
+    def advance_wall_sit_timer(self, is_wall_sit: bool, form_feedback: str) -> Tuple[bool, str]:
+        """Wall-sit hold bookkeeping for the current frame time"""
         if not is_wall_sit:
-            if not is_upright:
-                feedback = "LEAN BACK AGAINST WALL"
-            elif not is_sitting:
-                if leg_angle > 110:
-                    feedback = "SLIDE DOWN - KNEES AT 90°"
-                else:
-                    feedback = "LIFT UP SLIGHTLY - 90° ANGLE"
-
             # Reset timer if not in position
-            if hasattr(self, 'wall_sit_start_time'):
-                self.wall_sit_start_time = None
-            return False, feedback
+            self.state.wall_sit_start_time = None
+            return False, form_feedback
 
         # Track hold duration (like plank)
-        current_time = time.time()
+        current_time = self.frame_time
 
-        if not hasattr(self, 'wall_sit_start_time') or self.wall_sit_start_time is None:
-            self.wall_sit_start_time = current_time
-            self.wall_sit_duration = 0
+        if self.state.wall_sit_start_time is None:
+            self.state.wall_sit_start_time = current_time
+            self.state.wall_sit_duration = 0
 
-        self.wall_sit_duration = current_time - self.wall_sit_start_time
-        self.rep_count = int(self.wall_sit_duration)
+        self.state.wall_sit_duration = current_time - self.state.wall_sit_start_time
+        self.state.rep_count = int(self.state.wall_sit_duration)
+
+        if self.state.wall_sit_duration < 10:
+            feedback = f"HOLD IT! {int(self.state.wall_sit_duration)}s"
+        elif self.state.wall_sit_duration < 30:
+            feedback = f"STRONG! {int(self.state.wall_sit_duration)}s 🔥"
+        else:
+            feedback = f"AMAZING! {int(self.state.wall_sit_duration)}s 💪"
+
+        return False, feedback
+
+    def estimate_landmarks(self, frame, timestamp: Optional[float] = None) -> Optional[np.ndarray]:
+        """Run pose estimation only - returns a (33, 4) landmark array or None"""
+        return self.pose.infer(frame, timestamp if timestamp is not None else time.time())
+
+    def uses_world_angles(self, exercise_type: str) -> bool:
+        """Whether joint angles for this exercise come from world landmarks (when they are available)"""
+        if not self.world_angles:
+            return False
+        space = self.angle_spaces.get(exercise_type)
+        if space is None:
+            space = self.angle_spaces[exercise_type] = get_angle_space(exercise_type)
+        return space == "3d"
+
+    def process_landmarks(self, landmarks, exercise_type: str,
+                          timestamp: Optional[float] = None,
+                          world_landmarks: Optional[np.ndarray] = None,
+                          features: Optional[np.ndarray] = None) -> Tuple[bool, str]:
+        """
+        Run rep/form logic on MediaPipe landmarks or a (33, 4) landmark array.
+        world_landmarks: matching (33, 4) metric world landmarks, used for the
+        joint angles of "3d" exercises when the `world_angles` setting is on
+        features: this pose's row of a batched form_rules.compute_features call
+        (with the world landmarks if uses_world_angles), so several people can
+        share one vectorized pass
+        """
+        detector = self.detectors.get(exercise_type)
+        if detector is None:
+            return False, ""
 
-        if self.wall_sit_duration < 10:
-            feedback = f"HOLD IT! {int(self.wall_sit_duration)}s"
-        elif self.wall_sit_duration < 30:
-            feedback = f"STRONG! {int(self.wall_sit_duration)}s 🔥"
+        if isinstance(landmarks, np.ndarray):
+            self.last_landmarks = landmarks
+        else:
+            self.last_landmarks = landmarks_to_array(landmarks)
+
+        self.frame_time = timestamp if timestamp is not None else time.time()
+        if self.rebase_timers:
+            self.state.shift_timers(self.frame_time)
+            self.rebase_timers = False
+        if world_landmarks is not None and self.uses_world_angles(exercise_type):
+            self.angle_landmarks = world_landmarks
+        else:
+            self.angle_landmarks = None
+        self.frame_features = features
+
+        if self.pose_cache.is_repeat(self.last_landmarks, exercise_type):
+            # Same pose as before: nothing to recompute, but holds still tick
+            advance_timer = self.hold_timers.get(exercise_type)
+            if advance_timer is not None and self.hold_position is not None:
+                rep_complete, feedback = advance_timer(*self.hold_position)
+            else:
+                rep_complete, feedback = False, self.state.form_feedback
         else:
-            feedback = f"AMAZING! {int(self.wall_sit_duration)}s 💪"
+            if isinstance(landmarks, np.ndarray):
+                landmarks = LandmarkList(landmarks)
+            self.primary_angle = None
+            rep_complete, feedback = detector(landmarks)
+            if rep_complete:
+                self.form.finish_rep(self.state.rep_count)
+        self.state.form_feedback = feedback
+
+        stage = self.state.arm_circle_stage if exercise_type == "arm-circles" else self.state.stage
+        self.rep_events.observe(self.frame_time, exercise_type, stage, self.primary_angle, rep_complete)
 
         return rep_complete, feedback
 
-    def process_frame(self, frame, exercise_type: str) -> Tuple[np.ndarray, bool, str, int]:
+    def prime(self, landmarks: np.ndarray, exercise_type: str):
+        """
+        Warm the smoothing windows and the pose cache with one (33, 4) pose,
+        e.g. the last one before a checkpoint, so gating resumes without a
+        settle period. Rep progress and per-rep form scores are untouched.
+        """
+        detector = self.detectors.get(exercise_type)
+        if detector is None:
+            return
+        self.last_landmarks = landmarks
+        if self.uses_world_angles(exercise_type):
+            # Angles here come from world landmarks, which checkpoints do not keep
+            return
+
+        snapshot = self.state.snapshot()
+        pose = LandmarkList(landmarks)
+        for _ in range(self.angle_stats.window):
+            _, feedback = detector(pose)
+        self.state.restore(snapshot)
+        if exercise_type not in self.hold_timers:
+            # Hold feedback shows the timer, which only makes sense once the next frame rebases it
+            self.state.form_feedback = feedback
+        self.primary_angle = None
+        self.form.clear_rep()
+        self.pose_cache.prime(landmarks, exercise_type)
+
+    def process_frame(self, frame, exercise_type: str,
+                      timestamp: Optional[float] = None) -> Tuple[np.ndarray, bool, str, int]:
         try:
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            results = self.pose.process(image)
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            if timestamp is None:
+                timestamp = time.time()
+
+            if self.motion_gate.should_infer(frame, timestamp):
+                # Landmarks are normalized, so a downscaled frame needs no mapping back
+                scale = self.memory_budget.inference_scale()
+                if scale < 1.0:
+                    small = self.frame_pool.resize(frame, scale)
+                    self.last_pose = self.estimate_landmarks(small, timestamp)
+                    self.frame_pool.release(small)
+                else:
+                    self.last_pose = self.estimate_landmarks(frame, timestamp)
+                self.last_world_pose = self.pose.last_world_landmarks
+            # Otherwise nothing moved: the previous landmarks still describe this frame
 
+            image = self.frame_pool.copy(frame)
             rep_complete = False
             feedback = ""
 
-            if results.pose_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    image,
-                    results.pose_landmarks,
-                    self.mp_pose.POSE_CONNECTIONS,
-                    self.mp_drawing.DrawingSpec(color=(0, 212, 255), thickness=2, circle_radius=2),
-                    self.mp_drawing.DrawingSpec(color=(0, 191, 255), thickness=2, circle_radius=2)
-                )
-
-                landmarks = results.pose_landmarks.landmark
-
-                if exercise_type == "push-up":
-                    rep_complete, feedback = self.detect_pushup(landmarks)
-                elif exercise_type == "squat":
-                    rep_complete, feedback = self.detect_squat(landmarks)
-                elif exercise_type == "jumping-jack":
-                    rep_complete, feedback = self.detect_jumping_jack(landmarks)
-                elif exercise_type == "sit-up":
-                    rep_complete, feedback = self.detect_situp(landmarks)
-                elif exercise_type == "lunge":
-                    rep_complete, feedback = self.detect_lunge(landmarks)
-                elif exercise_type == "plank":
-                    rep_complete, feedback = self.detect_plank(landmarks)
-                elif exercise_type == "arm-circles":
-                    rep_complete, feedback = self.detect_arm_circles(landmarks)
-                elif exercise_type == "wall-sit":
-                    rep_complete, feedback = self.detect_wall_sit(landmarks)
-                elif exercise_type == "tricep-dip":
-                    rep_complete, feedback = self.detect_tricep_dip(landmarks)
-                elif exercise_type == "burpee":
-                    rep_complete, feedback = self.detect_burpee(landmarks)
-                elif exercise_type == "high-knees":
-                    rep_complete, feedback = self.detect_high_knees(landmarks)
-                elif exercise_type == "leg-raise":
-                    rep_complete, feedback = self.detect_leg_raise(landmarks)
-
-            return image, rep_complete, feedback, self.rep_count
+            if self.last_pose is not None:
+                rep_complete, feedback = self.process_landmarks(self.last_pose, exercise_type, timestamp,
+                                                                self.last_world_pose)
+                self.overlay.draw_skeleton(image, self.last_pose)
+
+            return image, rep_complete, feedback, self.state.rep_count
 
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             print(f"❌ Pose detection error: {e}")
             print(f"📋 Full traceback:\n{error_details}")
-            return frame, False, f"Error: {str(e)[:50]}", self.rep_count
+            return frame, False, f"Error: {str(e)[:50]}", self.state.rep_count
+
+    def release_frame(self, image: np.ndarray):
+        """Hand an annotated frame from process_frame back to the pool once it has been shown/sent"""
+        self.frame_pool.release(image)
 
     def reset(self):
         """Reset detector state for new workout session"""
-        self.rep_count = 0
-        self.stage = None  # Always start with None
-        self.form_feedback = ""
-        self.plank_start_time = None
-        self.plank_duration = 0
-        self.plank_hold_active = False
-
-        # Clear any pause time on reset
-        if hasattr(self, 'plank_pause_time'):
-            delattr(self, 'plank_pause_time')
-
-        # Initialize exercises properly based on type
-        if hasattr(self, 'current_exercise'):
-            if self.current_exercise == "jumping-jack":
-                self.stage = "init"  # Start in init stage for jumping jacks
-            elif self.current_exercise == "plank":
-                self.stage = None  # Plank handles its own initialization
-            else:
-                self.stage = None  # All other exercises start fresh
+        self.state.reset()
+        self.rebase_timers = False
+        self.rep_events.reset()
+        self.angle_stats.clear()
+        self.form.reset()
+        self.pose_cache.reset()
+        self.hold_position = None
+        self.motion_gate.reset()
+        self.last_pose = None
+        self.last_world_pose = None
+        self.angle_landmarks = None
+        self.frame_features = None
 
     def release(self):
-        self.pose.close()
\ No newline at end of file
+        if self.pose is not None:
+            self.pose.close()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Per-rep event stream
+Records every detector state transition into a preallocated ring buffer and
+derives rep duration, time-under-tension and cadence incrementally.
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.exercise_categories import get_all_exercise_ids
+
+# Compact codes so events fit in a fixed-size NumPy record
+EXERCISE_CODES = {exercise_id: i for i, exercise_id in enumerate(get_all_exercise_ids() + ["arm-circles"])}
+STAGE_CODES = {
+    None: 0, "up": 1, "down": 2, "init": 3, "together": 4, "apart": 5,
+    "standing": 6, "lunge": 7, "plank": 8, "middle": 9, "unknown": 10,
+}
+UNKNOWN_CODE = 255
+
+EVENT_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("exercise", "u1"),
+    ("stage", "u1"),
+    ("rep_complete", "?"),
+    ("rep", "u4"),
+    ("min_angle", "f4"),   # joint angle range over the segment that just ended
+    ("max_angle", "f4"),
+])
+
+REP_DTYPE = np.dtype([
+    ("rep", "u4"),
+    ("exercise", "u1"),
+    ("start", "f8"),              # previous rep finished (or first movement)
+    ("bottom", "f8"),             # time of the extreme joint angle
+    ("end", "f8"),                # rep counted
+    ("duration", "f4"),
+    ("time_under_tension", "f4"),  # first movement -> rep counted
+    ("min_angle", "f4"),
+    ("max_angle", "f4"),
+])
+
+
+class RingBuffer:
+    """Fixed-capacity record buffer; the oldest records are overwritten"""
+
+    def __init__(self, dtype: np.dtype, capacity: int):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.total = 0  # records ever written (also the next sequence number)
+
+    def append(self) -> np.void:
+        """Claim the next slot and return it for in-place filling"""
+        slot = self.data[self.total % self.capacity]
+        self.total += 1
+        return slot
+
+    def since(self, seq: int) -> Tuple[np.ndarray, int]:
+        """Records written after sequence number `seq` (oldest first) and the new sequence number"""
+        start = max(seq, self.total - self.capacity)
+        if start >= self.total:
+            return self.data[:0].copy(), self.total
+        idx = np.arange(start, self.total) % self.capacity
+        return self.data[idx], self.total
+
+    def latest(self, n: Optional[int] = None) -> np.ndarray:
+        n = min(n or self.capacity, self.total, self.capacity)
+        return self.since(self.total - n)[0]
+
+    def clear(self):
+        self.total = 0
+
+
+class RepEventLog:
+    """
+    Fed once per frame by PoseDetector.process_landmarks.
+
+    An event is written only when the stage changes or a rep is counted,
+    so polling `events_since(seq)` is cheap and nothing between polls is lost
+    (as long as the consumer keeps up with the buffer capacity).
+    """
+
+    def __init__(self, capacity: int = 1024, rep_capacity: int = 256, cadence_smoothing: float = 0.3):
+        self.events = RingBuffer(EVENT_DTYPE, capacity)
+        self.reps = RingBuffer(REP_DTYPE, rep_capacity)
+        self.cadence_smoothing = cadence_smoothing
+        self.reset()
+
+    def reset(self):
+        self.events.clear()
+        self.reps.clear()
+        self.last_stage = None
+        self.rep_number = 0
+        # Current segment (between two events)
+        self.segment_min = math.inf
+        self.segment_max = -math.inf
+        # Current rep
+        self.rep_start = None
+        self.rep_moving_since = None
+        self.rep_min = math.inf
+        self.rep_max = -math.inf
+        self.rep_extreme_time = None
+        # Running aggregates
+        self.last_rep_end = None
+        self.mean_duration = 0.0
+        self.total_time_under_tension = 0.0
+        self.cadence = 0.0  # reps per minute (smoothed)
+
+    def observe(self, timestamp: float, exercise_type: str, stage, angle: Optional[float],
+                rep_complete: bool):
+        if angle is not None:
+            if angle < self.segment_min:
+                self.segment_min = angle
+            if angle > self.segment_max:
+                self.segment_max = angle
+            if angle < self.rep_min:
+                self.rep_min = angle
+                self.rep_extreme_time = timestamp
+            if angle > self.rep_max:
+                self.rep_max = angle
+
+        if self.rep_start is None:
+            self.rep_start = timestamp
+
+        stage_changed = stage != self.last_stage
+        if not stage_changed and not rep_complete:
+            return
+
+        if stage_changed and self.rep_moving_since is None and self.last_stage is not None:
+            self.rep_moving_since = timestamp
+
+        if rep_complete:
+            self.rep_number += 1
+
+        exercise_code = EXERCISE_CODES.get(exercise_type, UNKNOWN_CODE)
+        event = self.events.append()
+        event["timestamp"] = timestamp
+        event["exercise"] = exercise_code
+        event["stage"] = STAGE_CODES.get(stage, UNKNOWN_CODE)
+        event["rep_complete"] = rep_complete
+        event["rep"] = self.rep_number
+        event["min_angle"] = self.segment_min if self.segment_min != math.inf else np.nan
+        event["max_angle"] = self.segment_max if self.segment_max != -math.inf else np.nan
+        self.segment_min = math.inf
+        self.segment_max = -math.inf
+        self.last_stage = stage
+
+        if rep_complete:
+            self._finish_rep(timestamp, exercise_code)
+
+    def _finish_rep(self, timestamp: float, exercise_code: int):
+        moving_since = self.rep_moving_since if self.rep_moving_since is not None else self.rep_start
+        duration = timestamp - self.rep_start
+        time_under_tension = timestamp - moving_since
+
+        rep = self.reps.append()
+        rep["rep"] = self.rep_number
+        rep["exercise"] = exercise_code
+        rep["start"] = self.rep_start
+        rep["bottom"] = self.rep_extreme_time if self.rep_extreme_time is not None else moving_since
+        rep["end"] = timestamp
+        rep["duration"] = duration
+        rep["time_under_tension"] = time_under_tension
+        rep["min_angle"] = self.rep_min if self.rep_min != math.inf else np.nan
+        rep["max_angle"] = self.rep_max if self.rep_max != -math.inf else np.nan
+
+        # Incremental aggregates - no history re-scan
+        self.mean_duration += (duration - self.mean_duration) / self.rep_number
+        self.total_time_under_tension += time_under_tension
+        if self.last_rep_end is not None and timestamp > self.last_rep_end:
+            rate = 60.0 / (timestamp - self.last_rep_end)
+            if self.cadence == 0.0:
+                self.cadence = rate
+            else:
+                self.cadence += self.cadence_smoothing * (rate - self.cadence)
+        self.last_rep_end = timestamp
+
+        # Next rep starts now
+        self.rep_start = timestamp
+        self.rep_moving_since = None
+        self.rep_min = math.inf
+        self.rep_max = -math.inf
+        self.rep_extreme_time = None
+
+    def events_since(self, seq: int) -> Tuple[np.ndarray, int]:
+        return self.events.since(seq)
+
+    def reps_since(self, seq: int) -> Tuple[np.ndarray, int]:
+        return self.reps.since(seq)
+
+    def summary(self) -> dict:
+        return {
+            "reps": self.rep_number,
+            "mean_rep_duration": self.mean_duration,
+            "total_time_under_tension": self.total_time_under_tension,
+            "cadence_rpm": self.cadence,
+        }
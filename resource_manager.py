@@ -0,0 +1,173 @@
+"""
+CPU resource management for multi-stream hosts
+Sizes OpenCV and inference thread pools to the cores this container may use
+and pins worker threads to disjoint CPU sets so sessions don't oversubscribe.
+"""
+import contextlib
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+
+from src.system_utils import get_cgroup_cpu_limit, get_usable_cpus
+
+
+def get_allowed_cpus() -> List[int]:
+    """CPU ids in this process's affinity mask"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:  # not available on Windows/macOS
+        return list(range(os.cpu_count() or 4))
+
+
+class ResourceManager:
+    """
+    Splits the usable cores between the active sessions.
+
+    With few sessions each gets several threads for intra-frame parallelism;
+    once sessions outnumber cores every session runs single-threaded and
+    parallelism comes from running sessions side by side.
+    """
+
+    def __init__(self, reserved_cpus: int = 0):
+        self.allowed_cpus = get_allowed_cpus()
+        self.cpu_limit = get_cgroup_cpu_limit()
+        # Cores left for pose work after e.g. the UI / network threads
+        self.cpu_budget = max(1, get_usable_cpus() - reserved_cpus)
+        self.active_sessions = 0
+        self._backends = 0
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+        quota = f", quota {self.cpu_limit:g} CPUs" if self.cpu_limit is not None else ""
+        print(f"✅ Resource manager: {self.cpu_budget} usable cores "
+              f"({len(self.allowed_cpus)} in affinity mask{quota})")
+
+    def plan(self, active_sessions: Optional[int] = None) -> Dict:
+        """Thread counts for the given number of concurrent sessions"""
+        sessions = max(1, active_sessions if active_sessions is not None else self.active_sessions)
+        per_session = max(1, self.cpu_budget // sessions)
+        return {
+            "sessions": sessions,
+            "workers": min(sessions, self.cpu_budget),
+            "threads_per_session": per_session,
+            # OpenCV's pool is process-wide: only worth using when cores are idle
+            "opencv_threads": per_session if sessions == 1 else 1,
+            "onnx_intra_op_threads": per_session,
+            "onnx_inter_op_threads": 1,
+        }
+
+    def apply(self, active_sessions: int) -> Dict:
+        """Record the session count and resize the process-wide OpenCV pool"""
+        self.active_sessions = active_sessions
+        plan = self.plan(active_sessions)
+        cv2.setNumThreads(plan["opencv_threads"])
+        return plan
+
+    def add_session(self) -> Dict:
+        """Count a new session in (call on admission) and re-plan for the new load"""
+        with self._lock:
+            return self.apply(self.active_sessions + 1)
+
+    def remove_session(self) -> Dict:
+        """Count a session out (call on teardown) and re-plan for the new load"""
+        with self._lock:
+            return self.apply(max(0, self.active_sessions - 1))
+
+    def inference_settings(self, settings: Dict, active_sessions: Optional[int] = None) -> Dict:
+        """Copy of detector settings with inference thread counts for this load"""
+        plan = self.plan(active_sessions)
+        return dict(settings,
+                    onnx_intra_op_threads=plan["onnx_intra_op_threads"],
+                    onnx_inter_op_threads=plan["onnx_inter_op_threads"])
+
+    def cpus_for_worker(self, index: int, workers: int) -> List[int]:
+        """Disjoint slice of the allowed CPUs for worker `index` of `workers`"""
+        cpus = self.allowed_cpus[:self.cpu_budget]
+        if workers >= len(cpus):
+            return [cpus[index % len(cpus)]]
+        chunk = len(cpus) // workers
+        extra = len(cpus) % workers
+        start = index * chunk + min(index, extra)
+        return cpus[start:start + chunk + (1 if index < extra else 0)]
+
+    def cpus_for_backend(self) -> List[int]:
+        """CPU slice for the next inference backend's own threads, handed out round-robin"""
+        workers = max(1, self.cpu_budget // self.plan()["threads_per_session"])
+        with self._lock:
+            index = self._backends % workers
+            self._backends += 1
+        return self.cpus_for_worker(index, workers)
+
+    @contextlib.contextmanager
+    def threads_started_on(self, cpus: List[int]):
+        """
+        Threads started inside the block inherit `cpus` as their affinity
+        (Linux only); the calling thread gets its own mask back afterwards.
+        """
+        previous = None
+        if cpus and hasattr(os, "sched_setaffinity"):
+            try:
+                previous = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, cpus)
+            except OSError as e:
+                print(f"⚠️  Could not set CPU affinity: {e}")
+                previous = None
+        try:
+            yield
+        finally:
+            if previous is not None:
+                os.sched_setaffinity(0, previous)
+
+    def pin_current_thread(self, cpus: List[int]) -> bool:
+        """Restrict the calling thread to `cpus` (Linux only)"""
+        if not hasattr(os, "sched_setaffinity"):
+            return False
+        try:
+            # On Linux pid 0 is the calling thread, not the whole process
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"⚠️  Could not set CPU affinity: {e}")
+            return False
+        with self._lock:
+            self._pinned[threading.get_ident()] = cpus
+        return True
+
+    def create_executor(self, workers: Optional[int] = None,
+                        thread_name_prefix: str = "pose-worker") -> ThreadPoolExecutor:
+        """Thread pool whose workers pin themselves to disjoint CPU slices (default: one per usable core)"""
+        workers = workers or self.cpu_budget
+        counter = itertools.count()
+
+        def init_worker():
+            self.pin_current_thread(self.cpus_for_worker(next(counter), workers))
+
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix,
+                                  initializer=init_worker)
+
+    def summary(self) -> Dict:
+        return {
+            "allowed_cpus": self.allowed_cpus,
+            "cpu_limit": self.cpu_limit,
+            "cpu_budget": self.cpu_budget,
+            "active_sessions": self.active_sessions,
+            "pinned_threads": len(self._pinned),
+        }
+
+
+# Process-wide manager shared by every session front-end and backend
+_resource_manager = None
+
+
+def get_resource_manager(reserved_cpus: int = 1) -> ResourceManager:
+    """
+    Get (or create) the process-wide ResourceManager. By default one core is
+    left for the event loop / UI thread.
+    """
+    global _resource_manager
+    if _resource_manager is None:
+        _resource_manager = ResourceManager(reserved_cpus=reserved_cpus)
+    return _resource_manager
@@ -0,0 +1,115 @@
+"""
+Rolling statistics over joint-angle streams
+O(1) per frame windowed mean, variance, min and max keyed by angle name
+"""
+import math
+from collections import deque
+from typing import Dict
+
+
+class RollingWindow:
+    """
+    Fixed-size window over one value stream.
+
+    Mean and variance come from running sums; min and max from monotonic
+    deques, so no update ever re-scans the window.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("Window size must be at least 1")
+        self.size = size
+        self.clear()
+
+    def clear(self):
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.index = 0
+        # (index, value) pairs - increasing values for min, decreasing for max
+        self.min_candidates = deque()
+        self.max_candidates = deque()
+
+    def push(self, value: float) -> "RollingWindow":
+        value = float(value)
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+
+        while self.min_candidates and self.min_candidates[-1][1] >= value:
+            self.min_candidates.pop()
+        self.min_candidates.append((self.index, value))
+        while self.max_candidates and self.max_candidates[-1][1] <= value:
+            self.max_candidates.pop()
+        self.max_candidates.append((self.index, value))
+
+        # Drop candidates that slid out of the window
+        oldest = self.index - self.size + 1
+        if self.min_candidates[0][0] < oldest:
+            self.min_candidates.popleft()
+        if self.max_candidates[0][0] < oldest:
+            self.max_candidates.popleft()
+
+        self.index += 1
+        return self
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def last(self) -> float:
+        return self.values[-1] if self.values else math.nan
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else math.nan
+
+    @property
+    def variance(self) -> float:
+        n = len(self.values)
+        if n == 0:
+            return math.nan
+        mean = self.total / n
+        # Running sums can dip just below zero from rounding
+        return max(self.total_sq / n - mean * mean, 0.0)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self) -> float:
+        return self.min_candidates[0][1] if self.min_candidates else math.nan
+
+    @property
+    def max(self) -> float:
+        return self.max_candidates[0][1] if self.max_candidates else math.nan
+
+
+class RollingStats:
+    """Named rolling windows, e.g. stats.push("arm_symmetry", 12.5).mean"""
+
+    def __init__(self, window: int = 5, windows: Dict[str, int] = None):
+        self.window = window
+        self.window_sizes = windows or {}
+        self.streams = {}
+
+    def push(self, name: str, value: float) -> RollingWindow:
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = RollingWindow(self.window_sizes.get(name, self.window))
+            self.streams[name] = stream
+        return stream.push(value)
+
+    def get(self, name: str) -> RollingWindow:
+        return self.streams.get(name)
+
+    def clear(self):
+        for stream in self.streams.values():
+            stream.clear()
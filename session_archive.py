@@ -0,0 +1,285 @@
+"""
+Session landmark archive
+Append-only on-disk store for many sessions: fixed-stride landmark records in
+one memory-mapped file, plus small session and rep indexes. Reps are read as
+zero-copy NumPy views, so a query only touches the pages it returns.
+
+Only landmarks and timestamps are stored - never camera images.
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.landmark_utils import NUM_LANDMARKS
+from src.rep_events import EXERCISE_CODES, UNKNOWN_CODE
+
+FRAMES_FILE = "frames.bin"
+SESSIONS_FILE = "sessions.idx"
+REPS_FILE = "reps.idx"
+
+FRAME_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("landmarks", "f4", (NUM_LANDMARKS, 4)),
+])
+
+SESSION_DTYPE = np.dtype([
+    ("session_id", "S36"),
+    ("user_id", "S36"),
+    ("exercise", "u1"),
+    ("start", "f8"),
+    ("end", "f8"),
+    ("first_frame", "u8"),   # record index in frames.bin
+    ("frame_count", "u4"),
+    ("first_rep", "u8"),     # row index in reps.idx
+    ("rep_count", "u4"),
+])
+
+ARCHIVE_REP_DTYPE = np.dtype([
+    ("session", "u4"),       # row index in sessions.idx
+    ("exercise", "u1"),
+    ("rep", "u4"),
+    ("start", "f8"),
+    ("bottom", "f8"),
+    ("end", "f8"),
+    ("start_frame", "u8"),   # absolute record indices, end exclusive
+    ("bottom_frame", "u8"),
+    ("end_frame", "u8"),
+    ("min_angle", "f4"),
+    ("max_angle", "f4"),
+])
+
+_EXERCISE_NAMES = {code: name for name, code in EXERCISE_CODES.items()}
+
+
+def _key(value: str, field: str) -> bytes:
+    encoded = value.encode("utf-8")
+    if len(encoded) > SESSION_DTYPE[field].itemsize:
+        raise ValueError(f"{field} is longer than {SESSION_DTYPE[field].itemsize} bytes: {value!r}")
+    return encoded
+
+
+def _map(path: str, dtype: np.dtype) -> np.ndarray:
+    """Read-only memmap of whole records (an empty array for an empty file)"""
+    count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class SessionArchive:
+    """
+    A directory holding the archive files.
+
+    Sessions are appended whole (see `SessionRecorder`): frames first, then
+    reps, and the session row last, so a crash mid-append leaves only
+    trailing bytes that the next writer truncates. Readers see sessions up
+    to the last `refresh()`.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self._lock = threading.Lock()
+        if writable:
+            os.makedirs(path, exist_ok=True)
+            self._recover()
+        self.refresh()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _recover(self):
+        """Drop frames/reps written after the last committed session row"""
+        sessions = _map(self._file(SESSIONS_FILE), SESSION_DTYPE)
+        frames_end = reps_end = 0
+        if len(sessions):
+            last = sessions[-1]
+            frames_end = int(last["first_frame"]) + int(last["frame_count"])
+            reps_end = int(last["first_rep"]) + int(last["rep_count"])
+        del sessions
+        for name, dtype, count in ((FRAMES_FILE, FRAME_DTYPE, frames_end),
+                                   (REPS_FILE, ARCHIVE_REP_DTYPE, reps_end),
+                                   (SESSIONS_FILE, SESSION_DTYPE, None)):
+            path = self._file(name)
+            with open(path, "ab") as f:
+                size = f.tell()
+                if count is None:
+                    count = size // dtype.itemsize
+                if size != count * dtype.itemsize:
+                    f.truncate(count * dtype.itemsize)
+
+    def refresh(self):
+        """Re-map the files to pick up sessions appended since opening"""
+        self.frames = _map(self._file(FRAMES_FILE), FRAME_DTYPE)
+        self.reps = _map(self._file(REPS_FILE), ARCHIVE_REP_DTYPE)
+        self.sessions = _map(self._file(SESSIONS_FILE), SESSION_DTYPE)
+
+    # ------------------
+    # Writing
+    # ------------------
+    def recorder(self, session_id: str, user_id: str, exercise_type: str) -> "SessionRecorder":
+        return SessionRecorder(self, session_id, user_id, exercise_type)
+
+    def append_session(self, session_id: str, user_id: str, exercise_type: str,
+                       frames: np.ndarray, reps: np.ndarray) -> int:
+        """
+        Append one session. `frames` is a FRAME_DTYPE array in time order and
+        `reps` a RepEventLog REP_DTYPE array; returns the session's row index.
+        Reps are indexed into the frames, so a session with reps needs frames.
+        """
+        if not self.writable:
+            raise RuntimeError("Archive was opened read-only")
+        session_key = _key(session_id, "session_id")
+        user_key = _key(user_id, "user_id")
+        frames = np.ascontiguousarray(frames, dtype=FRAME_DTYPE)
+        if len(reps) and not len(frames):
+            raise ValueError("Reps need the frames they were counted on; got reps without frames")
+        exercise = EXERCISE_CODES.get(exercise_type, UNKNOWN_CODE)
+
+        with self._lock:
+            first_frame = os.path.getsize(self._file(FRAMES_FILE)) // FRAME_DTYPE.itemsize
+            first_rep = os.path.getsize(self._file(REPS_FILE)) // ARCHIVE_REP_DTYPE.itemsize
+            index = os.path.getsize(self._file(SESSIONS_FILE)) // SESSION_DTYPE.itemsize
+
+            # Rep times -> frame indices (the first frame at or after each time)
+            times = frames["timestamp"]
+            rows = np.zeros(len(reps), dtype=ARCHIVE_REP_DTYPE)
+            rows["session"] = index
+            rows["exercise"] = exercise
+            for field in ("rep", "start", "bottom", "end", "min_angle", "max_angle"):
+                rows[field] = reps[field]
+            rows["start_frame"] = first_frame + np.searchsorted(times, reps["start"])
+            rows["bottom_frame"] = first_frame + np.minimum(
+                np.searchsorted(times, reps["bottom"]), len(frames) - 1)
+            rows["end_frame"] = first_frame + np.searchsorted(times, reps["end"], side="right")
+
+            session = np.zeros(1, dtype=SESSION_DTYPE)
+            session["session_id"] = session_key
+            session["user_id"] = user_key
+            session["exercise"] = exercise
+            session["start"] = times[0] if len(frames) else np.nan
+            session["end"] = times[-1] if len(frames) else np.nan
+            session["first_frame"] = first_frame
+            session["frame_count"] = len(frames)
+            session["first_rep"] = first_rep
+            session["rep_count"] = len(rows)
+
+            # The session row is the commit record: write it last
+            for name, data in ((FRAMES_FILE, frames), (REPS_FILE, rows), (SESSIONS_FILE, session)):
+                with open(self._file(name), "ab") as f:
+                    f.write(data.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+        return index
+
+    # ------------------
+    # Reading (views into the memory maps - nothing is copied)
+    # ------------------
+    def session_frames(self, index: int) -> np.ndarray:
+        session = self.sessions[index]
+        start = int(session["first_frame"])
+        return self.frames[start:start + int(session["frame_count"])]
+
+    def session_reps(self, index: int) -> np.ndarray:
+        session = self.sessions[index]
+        start = int(session["first_rep"])
+        return self.reps[start:start + int(session["rep_count"])]
+
+    def rep_frames(self, rep: np.void) -> np.ndarray:
+        """Frames of one rep row (from `reps` or `find_reps`)"""
+        return self.frames[int(rep["start_frame"]):int(rep["end_frame"])]
+
+    def find_sessions(self, user_id: Optional[str] = None, exercise_type: Optional[str] = None,
+                      since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+        """Row indices of matching sessions (only the session index is read)"""
+        mask = np.ones(len(self.sessions), dtype=bool)
+        if user_id is not None:
+            mask &= self.sessions["user_id"] == _key(user_id, "user_id")
+        if exercise_type is not None:
+            mask &= self.sessions["exercise"] == EXERCISE_CODES.get(exercise_type, UNKNOWN_CODE)
+        if since is not None:
+            mask &= self.sessions["end"] >= since
+        if until is not None:
+            mask &= self.sessions["start"] < until
+        return np.flatnonzero(mask)
+
+    def find_reps(self, user_id: Optional[str] = None, exercise_type: Optional[str] = None,
+                  since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+        """Matching rep rows; only the index pages of matching sessions are read"""
+        sessions = self.find_sessions(user_id, exercise_type, since, until)
+        if not len(sessions):
+            return np.zeros(0, dtype=ARCHIVE_REP_DTYPE)
+        rows = np.concatenate([np.arange(int(s["first_rep"]), int(s["first_rep"]) + int(s["rep_count"]))
+                               for s in self.sessions[sessions]])
+        reps = self.reps[rows]
+        mask = np.ones(len(reps), dtype=bool)
+        if since is not None:
+            mask &= reps["end"] >= since
+        if until is not None:
+            mask &= reps["start"] < until
+        return reps[mask]
+
+    def bottoms(self, reps: np.ndarray) -> np.ndarray:
+        """(n, 33, 4) landmarks at each rep's bottom; reads one record per rep"""
+        return self.frames["landmarks"][reps["bottom_frame"].astype(np.intp)]
+
+    def session_info(self, index: int) -> Dict:
+        session = self.sessions[index]
+        return {
+            "session_id": session["session_id"].decode("utf-8"),
+            "user_id": session["user_id"].decode("utf-8"),
+            "exercise": _EXERCISE_NAMES.get(int(session["exercise"])),
+            "start": float(session["start"]),
+            "end": float(session["end"]),
+            "frames": int(session["frame_count"]),
+            "reps": int(session["rep_count"]),
+        }
+
+
+class SessionRecorder:
+    """
+    Collects one live session and appends it to the archive on `commit()`.
+
+    Frames go into a growing preallocated buffer; completed reps are pulled
+    from the detector's RepEventLog as they happen, so none are lost to its
+    ring buffer on long sessions.
+    """
+
+    def __init__(self, archive: SessionArchive, session_id: str, user_id: str,
+                 exercise_type: str, initial_capacity: int = 4096):
+        self.archive = archive
+        self.session_id = session_id
+        self.user_id = user_id
+        self.exercise_type = exercise_type
+        self.frames = np.zeros(initial_capacity, dtype=FRAME_DTYPE)
+        self.count = 0
+        self.reps = []
+        self._rep_seq = 0
+
+    def add_frame(self, timestamp: float, landmarks: np.ndarray):
+        if self.count == len(self.frames):
+            grown = np.zeros(2 * len(self.frames), dtype=FRAME_DTYPE)
+            grown[:self.count] = self.frames
+            self.frames = grown
+        record = self.frames[self.count]
+        record["timestamp"] = timestamp
+        record["landmarks"] = landmarks
+        self.count += 1
+
+    def observe(self, detector):
+        """Record the detector's latest pose and any reps it completed since the last call"""
+        # A frame without a pose leaves frame_time and last_landmarks as they were: skip it
+        # rather than store the previous pose again
+        fresh = self.count == 0 or detector.frame_time != self.frames[self.count - 1]["timestamp"]
+        if detector.last_landmarks is not None and fresh:
+            self.add_frame(detector.frame_time, detector.last_landmarks)
+        reps, self._rep_seq = detector.rep_events.reps_since(self._rep_seq)
+        if len(reps):
+            self.reps.append(reps)
+
+    def commit(self) -> int:
+        reps = np.concatenate(self.reps) if self.reps else np.zeros(0, dtype=ARCHIVE_REP_DTYPE)
+        return self.archive.append_session(self.session_id, self.user_id, self.exercise_type,
+                                           self.frames[:self.count], reps)
@@ -0,0 +1,139 @@
+"""
+Session checkpointing
+Packs PoseDetector progress (plus the last landmarks) into a small binary
+snapshot that can be written periodically and restored into a fresh detector.
+The landmarks prime the restored detector's smoothing windows and pose cache.
+"""
+import math
+import os
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+from src.landmark_utils import NUM_LANDMARKS
+from src.rep_events import EXERCISE_CODES, STAGE_CODES, UNKNOWN_CODE
+
+MAGIC = b"NLFS"
+VERSION = 2
+
+# magic, version, flags, exercise, stage, arm circle stage, rep count, saved_at,
+# plank start/duration/pause, wall-sit start/duration. Start and pause times are
+# seconds before the detector's frame time, so a restored hold neither counts
+# the downtime nor depends on which clock the timestamps use.
+_HEADER = struct.Struct("<4sBBBBBxxxi d ddd dd")
+_LANDMARKS_BYTES = NUM_LANDMARKS * 4 * 4
+
+FLAG_PLANK_HOLD_ACTIVE = 0x01
+FLAG_HAS_LANDMARKS = 0x02
+
+_EXERCISE_NAMES = {code: name for name, code in EXERCISE_CODES.items()}
+_STAGE_NAMES = {code: name for name, code in STAGE_CODES.items()}
+
+
+def _age_or_nan(value: Optional[float], now: float) -> float:
+    return math.nan if value is None else now - value
+
+
+def _nan_to_none(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def save_checkpoint(detector) -> bytes:
+    """Serialize a detector's session progress (64 bytes, 592 with landmarks)"""
+    state = detector.state
+    landmarks = getattr(detector, "last_landmarks", None)
+    now = detector.frame_time
+
+    flags = 0
+    if state.plank_hold_active:
+        flags |= FLAG_PLANK_HOLD_ACTIVE
+    if landmarks is not None:
+        flags |= FLAG_HAS_LANDMARKS
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, flags,
+        EXERCISE_CODES.get(state.current_exercise, UNKNOWN_CODE),
+        STAGE_CODES.get(state.stage, UNKNOWN_CODE),
+        STAGE_CODES.get(state.arm_circle_stage, UNKNOWN_CODE),
+        state.rep_count,
+        time.time(),
+        _age_or_nan(state.plank_start_time, now), state.plank_duration, _age_or_nan(state.plank_pause_time, now),
+        _age_or_nan(state.wall_sit_start_time, now), state.wall_sit_duration,
+    )
+    if landmarks is None:
+        return header
+    return header + np.asarray(landmarks, dtype="<f4").tobytes()
+
+
+def restore_checkpoint(detector, data: bytes) -> float:
+    """
+    Load a snapshot into `detector` in place; returns the (wall clock) time it
+    was saved. Hold timers continue from the first frame processed afterwards,
+    and the saved pose primes the detector so its gates need no settle period.
+    """
+    (magic, version, flags, exercise, stage, arm_circle_stage, rep_count, saved_at,
+     plank_start, plank_duration, plank_pause,
+     wall_sit_start, wall_sit_duration) = _HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise ValueError("Not a session checkpoint")
+    if version != VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version}")
+
+    detector.reset()
+    state = detector.state
+    state.current_exercise = _EXERCISE_NAMES.get(exercise)
+    state.stage = _STAGE_NAMES.get(stage)
+    state.arm_circle_stage = _STAGE_NAMES.get(arm_circle_stage)
+    state.rep_count = rep_count
+    # Times relative to a frame time of 0; the detector rebases them on its next frame
+    state.plank_start_time = _nan_to_none(-plank_start)
+    state.plank_duration = plank_duration
+    state.plank_hold_active = bool(flags & FLAG_PLANK_HOLD_ACTIVE)
+    state.plank_pause_time = _nan_to_none(-plank_pause)
+    state.wall_sit_start_time = _nan_to_none(-wall_sit_start)
+    state.wall_sit_duration = wall_sit_duration
+    detector.rebase_timers = True
+
+    if flags & FLAG_HAS_LANDMARKS:
+        payload = data[_HEADER.size:_HEADER.size + _LANDMARKS_BYTES]
+        landmarks = np.frombuffer(payload, dtype="<f4").reshape(NUM_LANDMARKS, 4).copy()
+        detector.last_landmarks = landmarks
+        if state.current_exercise is not None:
+            detector.prime(landmarks, state.current_exercise)
+
+    return saved_at
+
+
+class CheckpointWriter:
+    """Writes a detector's checkpoint to disk at most every `interval` seconds"""
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.last_write = 0.0
+
+    def maybe_write(self, detector, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if now - self.last_write < self.interval:
+            return False
+        self.write(detector)
+        self.last_write = now
+        return True
+
+    def write(self, detector):
+        # Write-then-rename so a crash never leaves a torn checkpoint behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(save_checkpoint(detector))
+        os.replace(tmp_path, self.path)
+
+    def load_into(self, detector) -> Optional[float]:
+        """Restore the last written checkpoint, if any"""
+        try:
+            with open(self.path, "rb") as f:
+                return restore_checkpoint(detector, f.read())
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,88 @@
+"""
+Per-session detector state
+A slotted record with a fixed field layout, cheap reset and snapshot/restore
+"""
+from typing import Optional, Tuple
+
+
+class SessionState:
+    """
+    Everything PoseDetector remembers between frames for one user.
+
+    Fields used per exercise:
+        all rep exercises:  rep_count, stage
+        plank:              plank_start_time, plank_duration, plank_hold_active, plank_pause_time
+        wall-sit:           wall_sit_start_time, wall_sit_duration
+        arm-circles:        arm_circle_stage
+    Timers are None when inactive - no attribute is ever added or deleted.
+    """
+
+    __slots__ = (
+        "current_exercise",
+        "rep_count",
+        "stage",
+        "form_feedback",
+        "plank_start_time",
+        "plank_duration",
+        "plank_hold_active",
+        "plank_pause_time",
+        "wall_sit_start_time",
+        "wall_sit_duration",
+        "arm_circle_stage",
+    )
+
+    def __init__(self, current_exercise: Optional[str] = None):
+        self.current_exercise = current_exercise
+        self.reset()
+
+    def reset(self):
+        """Clear progress for a new workout session (keeps the exercise)"""
+        self.rep_count = 0
+        self.stage = None
+        self.form_feedback = ""
+        self.plank_start_time = None
+        self.plank_duration = 0
+        self.plank_hold_active = False
+        self.plank_pause_time = None
+        self.wall_sit_start_time = None
+        self.wall_sit_duration = 0
+        self.arm_circle_stage = None
+
+        # Jumping jacks start in their own init stage
+        if self.current_exercise == "jumping-jack":
+            self.stage = "init"
+
+    def shift_timers(self, delta: float):
+        """Move the hold timers by `delta` seconds (e.g. onto another clock)"""
+        if self.plank_start_time is not None:
+            self.plank_start_time += delta
+        if self.plank_pause_time is not None:
+            self.plank_pause_time += delta
+        if self.wall_sit_start_time is not None:
+            self.wall_sit_start_time += delta
+
+    def snapshot(self) -> Tuple:
+        """Plain tuple of all fields - cheap to copy, pickle or send to another process"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def restore(self, snapshot: Tuple):
+        if len(snapshot) != len(self.__slots__):
+            raise ValueError(f"Snapshot has {len(snapshot)} fields, expected {len(self.__slots__)}")
+        for name, value in zip(self.__slots__, snapshot):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Tuple) -> "SessionState":
+        state = cls.__new__(cls)
+        state.restore(snapshot)
+        return state
+
+    def __getstate__(self):
+        return self.snapshot()
+
+    def __setstate__(self, snapshot):
+        self.restore(snapshot)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"SessionState({fields})"
@@ -0,0 +1,229 @@
+"""
+Preview stream encoder
+Turns detector output into compact binary messages for a client display:
+either the annotated frame (JPEG/WebP, quality and size adapted to a
+bandwidth budget) or just the landmark array plus an occasional thumbnail,
+with the skeleton drawn by the client.
+
+Previews are only meant for the user's own display (e.g. the client that
+sent the frames); nothing here stores images.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.landmark_utils import NUM_LANDMARKS
+
+# Binary message tags (first byte of a binary WebSocket message)
+TAG_LANDMARKS = ord("L")      # followed by 33 x 4 little-endian float32 (x, y, z, visibility)
+TAG_LANDMARKS_F16 = ord("H")  # followed by 33 x 4 little-endian float16
+TAG_FRAME = ord("F")          # followed by a JPEG/PNG/WebP encoded frame
+TAG_THUMBNAIL = ord("T")      # followed by a small JPEG/WebP of the camera frame
+
+LANDMARK_PAYLOAD_BYTES = NUM_LANDMARKS * 4 * 4
+LANDMARK_F16_PAYLOAD_BYTES = NUM_LANDMARKS * 4 * 2
+
+CODECS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+# Options a remote client may set, with the range each is clamped to
+CLIENT_OPTION_RANGES = {
+    "bandwidth_kbps": (10.0, 20000.0),
+    "fps": (1.0, 60.0),
+    "quality": (1, 100),
+    "min_quality": (1, 100),
+    "max_quality": (1, 100),
+    "min_scale": (0.05, 1.0),
+    "thumbnail_interval": (0.1, 60.0),
+    "thumbnail_quality": (1, 100),
+}
+THUMBNAIL_SIZE_RANGE = (16, 640)
+
+
+def _clamp(value, low: float, high: float, name: str) -> float:
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number")
+    return min(high, max(low, value))
+
+
+def client_options(options: Dict) -> Dict:
+    """
+    Validated StreamEncoder keyword arguments from a client's "preview" object:
+    unknown keys are rejected and numbers are clamped to CLIENT_OPTION_RANGES
+    """
+    if not isinstance(options, dict):
+        raise ValueError("preview must be an object")
+    unknown = set(options) - set(CLIENT_OPTION_RANGES) - {"mode", "codec", "thumbnail_size"}
+    if unknown:
+        raise ValueError(f"unknown preview options: {', '.join(sorted(map(str, unknown)))}")
+
+    kwargs = {}
+    for name in ("mode", "codec"):
+        if name in options:
+            if not isinstance(options[name], str):
+                raise ValueError(f"{name} must be a string")
+            kwargs[name] = options[name]
+    for name, (low, high) in CLIENT_OPTION_RANGES.items():
+        if name in options:
+            kwargs[name] = type(low)(_clamp(options[name], low, high, name))
+    if "thumbnail_size" in options:
+        size = options["thumbnail_size"]
+        if not isinstance(size, (list, tuple)) or len(size) != 2:
+            raise ValueError("thumbnail_size must be [width, height]")
+        kwargs["thumbnail_size"] = tuple(int(_clamp(v, *THUMBNAIL_SIZE_RANGE, "thumbnail_size")) for v in size)
+    if kwargs.get("min_quality", 30) > kwargs.get("max_quality", 90):
+        raise ValueError("min_quality is above max_quality")
+    return kwargs
+
+
+def encode_landmarks(landmarks: np.ndarray, half: bool = False) -> bytes:
+    """Pack a (33, 4) landmark array into a tagged binary message (float16 halves the size)"""
+    if half:
+        return bytes([TAG_LANDMARKS_F16]) + np.asarray(landmarks, dtype="<f2").tobytes()
+    return bytes([TAG_LANDMARKS]) + np.asarray(landmarks, dtype="<f4").tobytes()
+
+
+def decode_landmarks(tag: int, payload: bytes) -> Optional[np.ndarray]:
+    """(33, 4) float32 array from a landmark message payload, or None if malformed"""
+    if tag == TAG_LANDMARKS and len(payload) == LANDMARK_PAYLOAD_BYTES:
+        return np.frombuffer(payload, dtype="<f4").reshape(NUM_LANDMARKS, 4)
+    if tag == TAG_LANDMARKS_F16 and len(payload) == LANDMARK_F16_PAYLOAD_BYTES:
+        return np.frombuffer(payload, dtype="<f2").reshape(NUM_LANDMARKS, 4).astype(np.float32)
+    return None
+
+
+class StreamEncoder:
+    """
+    Per-client preview encoder.
+
+    mode "frame":     every call encodes the annotated frame. Quality moves
+                      towards the per-frame byte budget; when quality bottoms
+                      out the frame is also downscaled (and scaled back up
+                      once there is headroom).
+    mode "landmarks": every call sends float16 landmarks, plus a thumbnail
+                      of the camera frame every `thumbnail_interval` seconds.
+    """
+
+    def __init__(self, mode: str = "landmarks", codec: str = "jpeg",
+                 bandwidth_kbps: float = 1000, fps: float = 15,
+                 quality: int = 75, min_quality: int = 30, max_quality: int = 90,
+                 min_scale: float = 0.25, thumbnail_size: Tuple[int, int] = (160, 120),
+                 thumbnail_interval: float = 2.0, thumbnail_quality: int = 60):
+        if mode not in ("frame", "landmarks"):
+            raise ValueError(f"Unknown preview mode '{mode}' (use 'frame' or 'landmarks')")
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}' (supported: {', '.join(CODECS)})")
+        if bandwidth_kbps <= 0 or fps <= 0:
+            raise ValueError("bandwidth_kbps and fps must be positive")
+        self.mode = mode
+        self.extension, quality_flag = CODECS[codec]
+        self.frame_budget = bandwidth_kbps * 1000 / 8 / fps  # bytes per frame
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.min_scale = min_scale
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_interval = thumbnail_interval
+
+        # Encoder parameter lists are built once and updated in place
+        self.quality = quality
+        self._params = [quality_flag, quality]
+        self._thumbnail_params = [quality_flag, thumbnail_quality]
+        self.scale = 1.0
+        self._scaled = None     # resize target, reallocated only when the size changes
+        self._thumbnail = None
+        self.last_thumbnail = None
+
+        self.bytes_out = 0
+        self.messages_out = 0
+        self.avg_frame_bytes = 0.0
+
+    # ------------------
+    # Buffers
+    # ------------------
+    def _resize(self, image: np.ndarray, size: Tuple[int, int], buffer_name: str) -> np.ndarray:
+        buffer = getattr(self, buffer_name)
+        if buffer is None or buffer.shape[1::-1] != size or buffer.shape[2:] != image.shape[2:]:
+            buffer = np.empty((size[1], size[0]) + image.shape[2:], dtype=image.dtype)
+            setattr(self, buffer_name, buffer)
+        return cv2.resize(image, size, dst=buffer, interpolation=cv2.INTER_AREA)
+
+    def _encode(self, tag: int, image: np.ndarray, params: List[int]) -> bytes:
+        ok, encoded = cv2.imencode(self.extension, image, params)
+        if not ok:
+            raise ValueError(f"Could not encode {self.extension} image")
+        # One copy: the tag byte plus the encoder's buffer
+        return bytes([tag]) + encoded.data
+
+    # ------------------
+    # Rate control
+    # ------------------
+    def _adapt(self, size: int):
+        self.avg_frame_bytes += 0.2 * (size - self.avg_frame_bytes)
+        ratio = self.frame_budget / max(size, 1)
+        # Roughly: +-10 quality points per doubling/halving of the size
+        step = int(round(10 * math.log2(ratio))) if abs(math.log2(ratio)) > 0.15 else 0
+        quality = min(self.max_quality, max(self.min_quality, self.quality + step))
+
+        if ratio < 0.85 and quality == self.min_quality and self.scale > self.min_scale:
+            self.scale = max(self.min_scale, self.scale * 0.8)
+        elif ratio > 2.0 and self.quality == self.max_quality and self.scale < 1.0:
+            self.scale = min(1.0, self.scale / 0.8)
+        self.quality = quality
+        self._params[1] = quality
+
+    # ------------------
+    # Encoding
+    # ------------------
+    def encode_frame(self, image: np.ndarray) -> bytes:
+        if self.scale < 1.0:
+            h, w = image.shape[:2]
+            image = self._resize(image, (max(1, int(w * self.scale)), max(1, int(h * self.scale))), "_scaled")
+        message = self._encode(TAG_FRAME, image, self._params)
+        self._adapt(len(message))
+        return message
+
+    def encode_thumbnail(self, frame: np.ndarray) -> bytes:
+        return self._encode(TAG_THUMBNAIL, self._resize(frame, self.thumbnail_size, "_thumbnail"),
+                            self._thumbnail_params)
+
+    def encode(self, image: np.ndarray, landmarks: Optional[np.ndarray],
+               timestamp: float) -> List[bytes]:
+        """
+        Messages to send for one processed frame.
+
+        image is the annotated frame in "frame" mode and the plain camera
+        frame in "landmarks" mode (the client draws the skeleton itself).
+        """
+        if self.mode == "frame":
+            messages = [self.encode_frame(image)]
+        else:
+            messages = []
+            if self.last_thumbnail is None or timestamp - self.last_thumbnail >= self.thumbnail_interval:
+                messages.append(self.encode_thumbnail(image))
+                self.last_thumbnail = timestamp
+            if landmarks is not None:
+                messages.append(encode_landmarks(landmarks, half=True))
+
+        self.messages_out += len(messages)
+        self.bytes_out += sum(len(message) for message in messages)
+        return messages
+
+    def reset(self):
+        self.last_thumbnail = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "quality": self.quality,
+            "scale": self.scale,
+            "avg_frame_bytes": self.avg_frame_bytes,
+            "frame_budget": self.frame_budget,
+            "bytes_out": self.bytes_out,
+            "messages_out": self.messages_out,
+        }
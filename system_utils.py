@@ -1,6 +1,7 @@
 """
 System utilities for hardware detection and optimization
 """
+import math
 import os
 import platform
 import subprocess
@@ -22,6 +23,97 @@ def get_gifs_path() -> str:
     return os.path.join(base, "assets", "gifs")
 
 
+def read_cgroup_value(*paths: str):
+    """First readable cgroup file among paths (v2 path first), stripped, or None"""
+    for path in paths:
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            continue
+    return None
+
+def get_cgroup_cpu_limit():
+    """CPU quota of this container in cores (e.g. 2.5), or None when unlimited"""
+    # cgroup v2: "max 100000" or "250000 100000"
+    value = read_cgroup_value("/sys/fs/cgroup/cpu.max")
+    try:
+        if value is not None:
+            quota, _, period = value.partition(" ")
+            if quota == "max":
+                return None
+            return int(quota) / int(period or 100000)
+
+        # cgroup v1: quota of -1 means unlimited
+        quota = read_cgroup_value("/sys/fs/cgroup/cpu/cpu.cfs_quota_us",
+                                  "/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us")
+        period = read_cgroup_value("/sys/fs/cgroup/cpu/cpu.cfs_period_us",
+                                   "/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_period_us")
+        if quota is None or period is None or int(quota) <= 0:
+            return None
+        return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        # Unparsable or zero-period files: treat the quota as unknown
+        return None
+
+def get_usable_cpus() -> int:
+    """CPUs this process can actually use: affinity mask capped by the cgroup quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on Windows/macOS
+        cpus = os.cpu_count() or 4
+
+    limit = get_cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+def get_cgroup_memory_limit_mb():
+    """Memory limit of this container in MB, or None when unlimited"""
+    value = read_cgroup_value("/sys/fs/cgroup/memory.max",
+                              "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if value is None or value == "max":
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        return None
+    # cgroup v1 reports "unlimited" as a huge page-aligned number
+    if limit >= 2 ** 60:
+        return None
+    return limit // (1024 * 1024)
+
+def get_total_memory_mb():
+    """Physical memory from /proc/meminfo (Linux), or None"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def get_cpu_flags() -> set:
+    """CPU feature flags from /proc/cpuinfo (Linux x86), empty if unknown"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+# Rough single-core MediaPipe Pose throughput (inferences/s) by model complexity on
+# an AVX2 x86 core, and resident memory per session; used for capacity estimates
+INFERENCES_PER_CORE = {0: 60, 1: 30, 2: 10}
+SESSION_MEMORY_MB = {0: 90, 1: 130, 2: 220}
+BASE_PROCESS_MEMORY_MB = 300
+
+
 class SystemOptimizer:
     """Detects hardware capabilities and optimizes settings"""
 
@@ -29,9 +121,38 @@ class SystemOptimizer:
         self.has_gpu = False
         self.gpu_name = None
         self.available_vram = 0
-        self.cpu_cores = os.cpu_count() or 4
+
+        # Inside a container os.cpu_count() reports the host; use what we may actually run on
+        self.host_cpu_cores = os.cpu_count() or 4
+        self.cpu_limit = get_cgroup_cpu_limit()
+        self.cpu_cores = get_usable_cpus()
+        self.effective_cpus = min(float(self.cpu_cores), self.cpu_limit or float(self.cpu_cores))
+
+        total_memory = get_total_memory_mb()
+        memory_limit = get_cgroup_memory_limit_mb()
+        known = [m for m in (total_memory, memory_limit) if m is not None]
+        self.memory_mb = min(known) if known else None
+
+        self.cpu_flags = get_cpu_flags()
+        self.has_avx2 = "avx2" in self.cpu_flags
+        self.has_avx512 = "avx512f" in self.cpu_flags
+        self.tier_cpus = self.compute_tier_cpus()
+
         self.detect_hardware()
 
+    def compute_tier_cpus(self) -> float:
+        """CPU count used for tier selection, discounted for missing SIMD and tight memory"""
+        cpus = self.effective_cpus
+        # x86 without AVX2 runs the TFLite kernels far slower; one tier down
+        if self.cpu_flags and "sse2" in self.cpu_flags and not self.has_avx2:
+            cpus /= 2
+        if self.memory_mb is not None:
+            if self.memory_mb < 1024:
+                cpus = min(cpus, 2)
+            elif self.memory_mb < 2048:
+                cpus = min(cpus, 4)
+        return cpus
+
     def detect_hardware(self):
         """Detect available hardware (GPU/VRAM)"""
         try:
@@ -47,6 +168,14 @@ class SystemOptimizer:
             print(f"🖥️  HARDWARE DETECTION RESULTS")
             print(f"{'=' * 50}")
             print(f"✅ CPU Cores: {self.cpu_cores}")
+            if self.cpu_cores != self.host_cpu_cores or self.cpu_limit is not None:
+                quota = f", quota {self.cpu_limit:g}" if self.cpu_limit is not None else ""
+                print(f"   └─ Container limits: host has {self.host_cpu_cores}{quota}")
+            if self.memory_mb is not None:
+                print(f"✅ Memory Available: {self.memory_mb} MB")
+            if self.cpu_flags:
+                print(f"✅ CPU Features: AVX2 {'✔' if self.has_avx2 else '✘'}, "
+                      f"AVX-512 {'✔' if self.has_avx512 else '✘'}")
 
             if self.has_gpu:
                 print(f"✅ GPU Detected: {self.gpu_name}")
@@ -55,6 +184,7 @@ class SystemOptimizer:
             else:
                 print(f"⚠️  No GPU detected")
                 print(f"✅ Mode: CPU OPTIMIZED 💻")
+            print(f"✅ Capacity: ~{self.estimate_capacity()['max_sessions']} concurrent sessions")
             print(f"{'=' * 50}\n")
 
         except Exception as e:
@@ -150,6 +280,7 @@ class SystemOptimizer:
                 "camera_height": 480,
                 "camera_fps": 30,
                 "process_every_n_frames": 1,  # Process every frame
+                "delegate": "GPU",  # Inference delegate for the MediaPipe Tasks backend
                 "description": "GPU Accelerated (High Quality)"
             }
 
@@ -164,10 +295,11 @@ class SystemOptimizer:
                 "camera_height": 480,
                 "camera_fps": 30,
                 "process_every_n_frames": 2,  # Process every 2nd frame
+                "delegate": "GPU",
                 "description": "GPU Accelerated (Balanced)"
             }
 
-        elif self.cpu_cores >= 8:
+        elif self.tier_cpus >= 8:
             # HIGH-END CPU: 8+ cores, no GPU
             return {
                 "model_complexity": 1,
@@ -178,10 +310,11 @@ class SystemOptimizer:
                 "camera_height": 480,
                 "camera_fps": 30,
                 "process_every_n_frames": 2,  # Process every 2nd frame
+                "delegate": "CPU",
                 "description": "CPU Optimized (Multi-Core)"
             }
 
-        elif self.cpu_cores >= 4:
+        elif self.tier_cpus >= 4:
             # MID-RANGE CPU: 4-7 cores, no GPU
             return {
                 "model_complexity": 1,
@@ -192,6 +325,7 @@ class SystemOptimizer:
                 "camera_height": 360,
                 "camera_fps": 25,
                 "process_every_n_frames": 3,  # Process every 3rd frame
+                "delegate": "CPU",
                 "description": "CPU Optimized (Balanced)"
             }
 
@@ -206,5 +340,44 @@ class SystemOptimizer:
                 "camera_height": 240,
                 "camera_fps": 20,
                 "process_every_n_frames": 4,  # Process every 4th frame
+                "delegate": "CPU",
                 "description": "CPU Optimized (Low-End Performance Mode)"
-            }
\ No newline at end of file
+            }
+
+    def estimate_capacity(self, settings=None):
+        """How many concurrent sessions this node can sustain with the given settings"""
+        if settings is None:
+            settings = self.get_optimal_settings()
+        complexity = settings["model_complexity"]
+
+        per_core = INFERENCES_PER_CORE[complexity]
+        if self.cpu_flags and "sse2" in self.cpu_flags and not self.has_avx2:
+            per_core /= 2
+        elif self.has_avx512:
+            per_core *= 1.2
+        inferences_per_session = settings["camera_fps"] / settings["process_every_n_frames"]
+        cpu_sessions = int(self.effective_cpus * per_core / inferences_per_session)
+        # The per-core rates are for CPU inference: they only bound sessions when the backend
+        # these settings build runs on the CPU (a GPU tier without a Tasks bundle still does)
+        from src.inference_backend import backend_candidates
+        _, device = backend_candidates(settings)[0]
+        cpu_bound = None if device == "GPU" else cpu_sessions
+
+        memory_bound = None
+        if self.memory_mb is not None:
+            # Leave 20% headroom under the limit
+            usable = self.memory_mb * 0.8 - BASE_PROCESS_MEMORY_MB
+            memory_bound = max(0, int(usable / SESSION_MEMORY_MB[complexity]))
+
+        bounds = [bound for bound in (cpu_bound, memory_bound) if bound is not None]
+        # With neither bound known, the CPU estimate is the only figure to go on
+        max_sessions = min(bounds) if bounds else cpu_sessions
+        return {
+            "max_sessions": max(0, max_sessions),
+            "cpu_bound": cpu_bound,
+            "memory_bound": memory_bound,
+            "inferences_per_session": inferences_per_session,
+            "inference_device": device,
+            "effective_cpus": self.effective_cpus,
+            "memory_mb": self.memory_mb,
+        }
\ No newline at end of file
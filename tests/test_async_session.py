@@ -0,0 +1,66 @@
+"""
+Async sessions: frames in flight when a session closes
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src.async_session import AsyncPoseSession  # noqa: E402
+
+
+class BlockingDetector:
+    """Stands in for PoseDetector; process_frame waits until the test lets it finish"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.proceed = threading.Event()
+        self.image = np.zeros((4, 4, 3), dtype=np.uint8)
+        self.released = []
+
+    def process_frame(self, frame, exercise_type, timestamp):
+        self.started.set()
+        self.proceed.wait(5)
+        return self.image, False, "", 0
+
+    def release_frame(self, image):
+        self.released.append(image)
+
+    def release(self):
+        pass
+
+
+async def run_session(close_mid_inference: bool):
+    detector = BlockingDetector()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        session = AsyncPoseSession("squat", detector=detector, executor=executor)
+        await session.submit(np.zeros((4, 4, 3), dtype=np.uint8), 0.0)
+        await asyncio.get_running_loop().run_in_executor(None, detector.started.wait, 5)
+        if close_mid_inference:
+            closing = asyncio.get_running_loop().create_task(session.close())
+            await asyncio.sleep(0.01)
+            detector.proceed.set()
+            await closing
+        else:
+            detector.proceed.set()
+            result = await session.__anext__()
+            assert result.image is detector.image
+            await session.close()
+        return detector, [result async for result in session]
+
+
+def test_image_of_a_cancelled_frame_goes_back_to_the_pool():
+    detector, results = asyncio.run(run_session(close_mid_inference=True))
+    assert results == []
+    assert len(detector.released) == 1 and detector.released[0] is detector.image
+
+
+def test_queued_results_keep_their_image():
+    detector, results = asyncio.run(run_session(close_mid_inference=False))
+    assert results == []
+    assert detector.released == []
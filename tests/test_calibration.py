@@ -0,0 +1,49 @@
+"""
+Calibration replays: the vectorized engine and the detector must agree
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src.calibration import (  # noqa: E402
+    LabelledTrace, _replay_detector, _replay_vectorized, calibrate, threshold_grid, uses_engine,
+)
+from src.system_utils import SystemOptimizer  # noqa: E402
+from traces import FPS, TRACES, synthetic_trace  # noqa: E402
+
+GRIDS = {
+    "push-up": {"up_angle": [150, 165], "down_angle": [80, 100]},
+    "squat": {"leg_symmetry": [20, 30, 40]},
+    "sit-up": {"knee_bent_angle": [85, 95, 105]},
+    "tricep-dip": {"wrist_offset": [0.0, 0.05]},
+}
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+@pytest.mark.parametrize("exercise_type", sorted(TRACES))
+def test_engine_replay_matches_the_detector(settings, exercise_type):
+    assert uses_engine(exercise_type)
+    landmarks = synthetic_trace(exercise_type, seed=7)
+    trace = LabelledTrace("synthetic", exercise_type, np.arange(len(landmarks)) / FPS, landmarks, 0)
+    grid = threshold_grid(exercise_type, GRIDS[exercise_type])
+
+    vectorized = _replay_vectorized(trace, grid)
+    detected = _replay_detector(trace, grid, settings)
+    assert any(len(times) for times in detected)
+    for setting, engine_times, detector_times in zip(grid, vectorized, detected):
+        np.testing.assert_array_equal(engine_times, detector_times, err_msg=str(setting))
+
+
+def test_holds_are_rejected(settings):
+    with pytest.raises(ValueError, match="hold"):
+        threshold_grid("wall-sit", {"sit_min_angle": [70, 80]})
+
+    trace = LabelledTrace("wall", "wall-sit", np.zeros(1), np.zeros((1, 33, 4), dtype=np.float32), 0)
+    with pytest.raises(ValueError, match="hold"):
+        calibrate([trace], [{"sit_min_angle": 80}], settings=settings, workers=1)
@@ -0,0 +1,53 @@
+"""
+Form rule replays against the behaviour of the hand-written detector checks
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src.pose_detector import PoseDetector  # noqa: E402
+from src.system_utils import SystemOptimizer  # noqa: E402
+
+PLANK_MESSAGE = "Get in proper plank position - body straight, hands below shoulders"
+
+
+def plank_frame(elbow_angle: float, right_offset: float = 0.0, hips_raised: float = 0.0) -> np.ndarray:
+    """Side-view push-up pose; right_offset bends the right arm differently, hips_raised breaks the plank"""
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, 3] = 1.0
+    for shoulder, elbow, wrist, offset in ((11, 13, 15, 0.0), (12, 14, 16, right_offset)):
+        t = np.radians(elbow_angle + offset)
+        landmarks[shoulder, :2] = (0.3, 0.5)
+        landmarks[elbow, :2] = (0.3, 0.62)
+        landmarks[wrist, :2] = (0.3 + 0.12 * np.sin(t), 0.62 - 0.12 * np.cos(t))
+    landmarks[[23, 24], :2] = (0.55, 0.52 - hips_raised)
+    landmarks[[27, 28], :2] = (0.8, 0.54)
+    return landmarks
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+def test_blocked_frames_stay_out_of_the_symmetry_window(settings):
+    detector = PoseDetector(settings=settings, load_model=False)
+    timestamp = 0.0
+    # Out of plank with very uneven arms: only the plank message, nothing smoothed
+    for _ in range(6):
+        timestamp += 0.1
+        assert detector.process_landmarks(plank_frame(170, -80, hips_raised=0.3), "push-up", timestamp) \
+            == (False, PLANK_MESSAGE)
+    # Back in plank with even arms: the earlier uneven frames must not trigger KEEP ARMS EVEN
+    for _ in range(3):
+        timestamp += 0.1
+        assert detector.process_landmarks(plank_frame(170), "push-up", timestamp) == (False, "START PUSH UP")
+
+
+def test_uneven_arms_in_plank_are_smoothed(settings):
+    detector = PoseDetector(settings=settings, load_model=False)
+    feedback = [detector.process_landmarks(plank_frame(170, -80), "push-up", 0.1 * i)[1] for i in range(3)]
+    assert feedback[-1] == "KEEP ARMS EVEN"
+    assert detector.form.last_check.codes == ["ARMS_UNEVEN"]
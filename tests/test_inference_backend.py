@@ -0,0 +1,101 @@
+"""
+Inference backends on the CPU: backend selection and output layout
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src import inference_backend  # noqa: E402
+from src.inference_backend import (  # noqa: E402
+    OnnxPoseBackend, SolutionPoseBackend, TasksPoseBackend, backend_candidates, create_backend,
+)
+from src.system_utils import SystemOptimizer  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+def test_create_backend_falls_back_in_order(monkeypatch, tmp_path, settings):
+    attempts = []
+
+    def failing_onnx(self, model_path, settings, **threads):
+        attempts.append(("onnx", None))
+        raise RuntimeError("no onnxruntime")
+
+    def failing_tasks(self, model_path, settings, delegate="CPU", running_mode="VIDEO",
+                      on_result=None, cpus=None):
+        attempts.append(("tasks", delegate, cpus))
+        raise RuntimeError(f"no {delegate} delegate")
+
+    def solution(self, settings, model_complexity):
+        attempts.append(("solution", model_complexity))
+
+    monkeypatch.setattr(OnnxPoseBackend, "__init__", failing_onnx)
+    monkeypatch.setattr(TasksPoseBackend, "__init__", failing_tasks)
+    monkeypatch.setattr(SolutionPoseBackend, "__init__", solution)
+
+    bundle = tmp_path / "pose.task"
+    bundle.write_bytes(b"")
+    config = dict(settings, onnx_model_path="missing.onnx", pose_model_path=str(bundle),
+                  delegate="GPU", tasks_cpus=[0])
+    assert [name for name, _ in backend_candidates(config)] == [
+        "onnxruntime", "mediapipe-tasks", "mediapipe-tasks", "mediapipe-solution"]
+
+    backend = create_backend(config, model_complexity=1)
+    assert isinstance(backend, SolutionPoseBackend)
+    # Only the CPU delegate gets a CPU slice
+    assert attempts == [("onnx", None), ("tasks", "GPU", None), ("tasks", "CPU", [0]), ("solution", 1)]
+
+
+def test_without_model_files_only_the_solution_model_is_tried(settings):
+    assert backend_candidates(dict(settings, delegate="GPU")) == [("mediapipe-solution", "CPU")]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="CPU affinity is Linux only")
+def test_tasks_landmarker_threads_start_on_the_given_cpus(monkeypatch, settings):
+    from mediapipe.tasks.python import vision
+
+    calls = []
+    monkeypatch.setattr(inference_backend.os, "sched_setaffinity", lambda pid, cpus: calls.append(set(cpus)))
+    monkeypatch.setattr(vision.PoseLandmarker, "create_from_options",
+                        classmethod(lambda cls, options: calls.append("create") or object()))
+    previous = os.sched_getaffinity(0)
+
+    backend = TasksPoseBackend("pose.task", settings, "CPU", cpus=[0])
+    assert backend.cpus == [0]
+    assert calls == [{0}, "create", previous]
+
+
+def test_solution_backend_finds_no_pose_in_an_empty_frame(settings):
+    backend = SolutionPoseBackend(settings, model_complexity=0)
+    try:
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        assert backend.infer(frame, 0.0) is None
+        assert backend.last_world_landmarks is None
+        assert backend.infer_batch([frame, frame], [0.1, 0.2]) == [None, None]
+        assert backend.last_world_batch == [None, None]
+    finally:
+        backend.close()
+
+
+def test_solution_backend_returns_33_landmarks_per_pose(settings):
+    class Results:
+        point = type("Landmark", (), {"x": 0.5, "y": 0.25, "z": -0.1, "visibility": 0.9})()
+        pose_landmarks = type("Landmarks", (), {"landmark": [point] * 33})()
+        pose_world_landmarks = pose_landmarks
+
+    backend = SolutionPoseBackend(settings, model_complexity=0)
+    real_model, backend.model = backend.model, type("Model", (), {"process": lambda self, image: Results})()
+    try:
+        landmarks = backend.infer(np.zeros((240, 320, 3), dtype=np.uint8), 0.0)
+        assert landmarks.shape == (33, 4)
+        assert backend.last_world_landmarks.shape == (33, 4)
+        np.testing.assert_allclose(landmarks[0], [0.5, 0.25, -0.1, 0.9], rtol=1e-6)
+    finally:
+        real_model.close()
@@ -0,0 +1,40 @@
+"""
+Landmark server: control messages
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("mediapipe")
+pytest.importorskip("websockets")
+
+from src.landmark_server import ClientSession, LandmarkServer  # noqa: E402
+from src.system_utils import SystemOptimizer  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+def send(server, session, message):
+    async def handle():
+        return await server.handle_message(asyncio.get_running_loop(), session, json.dumps(message))
+    return asyncio.run(handle())
+
+
+def test_reset_needs_a_started_exercise(settings):
+    server = LandmarkServer(settings=settings)
+    session = ClientSession(settings)
+    try:
+        events = send(server, session, {"type": "reset"})
+        assert [event["type"] for event in events] == ["error"]
+        assert session.exercise_type is None
+
+        assert send(server, session, {"type": "start", "exercise": "squat"}) == [
+            {"type": "started", "exercise": "squat"}]
+        assert send(server, session, {"type": "reset"}) == [{"type": "started", "exercise": "squat"}]
+    finally:
+        session.release()
@@ -0,0 +1,131 @@
+"""
+ONNX Runtime backend: batching and mapping landmarks back to the frame
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+pytest.importorskip("onnxruntime")
+onnx = pytest.importorskip("onnx")
+
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+from src.inference_backend import OnnxPoseBackend  # noqa: E402
+from src.landmark_utils import NUM_LANDMARKS  # noqa: E402
+from src.system_utils import SystemOptimizer  # noqa: E402
+
+# Model landmarks in 256x256 input pixels: the centre, then the corners of a
+# letterboxed 4:3 landscape frame and of a 3:4 portrait one
+CENTRE, LANDSCAPE_TOP_LEFT, LANDSCAPE_BOTTOM_RIGHT, PORTRAIT_TOP_LEFT, PORTRAIT_BOTTOM_RIGHT = range(5)
+INPUT_POINTS = [(128, 128), (0, 32), (256, 224), (32, 0), (224, 256)]
+DEPTH = 25.6  # input pixels; a tenth of a 640 px wide frame once scaled back
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+def write_model(path, batch="N", channels_first=False) -> str:
+    """
+    Tiny BlazePose-shaped model. Landmarks are the constants above; the pose
+    score and world landmarks follow the input's mean brightness, so each
+    output row can be traced back to its frame and a black frame has no pose.
+    """
+    landmarks = np.zeros((39, 5), dtype=np.float32)
+    landmarks[:len(INPUT_POINTS), :2] = INPUT_POINTS
+    landmarks[:, 2] = DEPTH
+    world = np.arange(39 * 3, dtype=np.float32) / 100
+    shape = [batch, 3, 256, 256] if channels_first else [batch, 256, 256, 3]
+
+    graph = helper.make_graph([
+        helper.make_node("ReduceMean", ["image", "axes"], ["mean"], keepdims=0),
+        helper.make_node("Unsqueeze", ["mean", "column"], ["brightness"]),
+        helper.make_node("Mul", ["brightness", "zero"], ["zeros"]),
+        helper.make_node("Add", ["zeros", "landmarks"], ["Identity"]),
+        helper.make_node("Mul", ["brightness", "gain"], ["logit"]),
+        helper.make_node("Add", ["logit", "bias"], ["Identity_1"]),
+        helper.make_node("Add", ["brightness", "world"], ["Identity_4"]),
+    ], "pose", [helper.make_tensor_value_info("image", TensorProto.FLOAT, shape)], [
+        helper.make_tensor_value_info("Identity", TensorProto.FLOAT, [batch, 195]),
+        helper.make_tensor_value_info("Identity_1", TensorProto.FLOAT, [batch, 1]),
+        helper.make_tensor_value_info("Identity_4", TensorProto.FLOAT, [batch, 117]),
+    ], [
+        numpy_helper.from_array(np.array([1, 2, 3], dtype=np.int64), "axes"),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "column"),
+        numpy_helper.from_array(np.zeros((1, 1), dtype=np.float32), "zero"),
+        numpy_helper.from_array(landmarks.reshape(1, 195), "landmarks"),
+        numpy_helper.from_array(np.full((1, 1), 20.0, dtype=np.float32), "gain"),
+        numpy_helper.from_array(np.full((1, 1), -1.0, dtype=np.float32), "bias"),
+        numpy_helper.from_array(world.reshape(1, 117), "world"),
+    ])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 18)])
+    model.ir_version = 9
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def gray_frames(*levels, shape=(480, 640)):
+    return [np.full(shape + (3,), level, dtype=np.uint8) for level in levels]
+
+
+@pytest.mark.parametrize("shape, top_left, bottom_right", [
+    ((480, 640), LANDSCAPE_TOP_LEFT, LANDSCAPE_BOTTOM_RIGHT),
+    ((640, 480), PORTRAIT_TOP_LEFT, PORTRAIT_BOTTOM_RIGHT),
+])
+def test_landmarks_are_unmapped_from_the_letterbox(tmp_path, settings, shape, top_left, bottom_right):
+    backend = OnnxPoseBackend(write_model(tmp_path / "pose.onnx"), settings)
+    landmarks = backend.infer(gray_frames(128, shape=shape)[0], 0.0)
+
+    assert landmarks.shape == (NUM_LANDMARKS, 4)
+    np.testing.assert_allclose(landmarks[CENTRE, :2], [0.5, 0.5], atol=1e-6)
+    np.testing.assert_allclose(landmarks[top_left, :2], [0.0, 0.0], atol=1e-6)
+    np.testing.assert_allclose(landmarks[bottom_right, :2], [1.0, 1.0], atol=1e-6)
+    # Depth is scaled like x; a zero visibility logit is an even chance
+    np.testing.assert_allclose(landmarks[:, 2], DEPTH / (256 / max(shape)) / shape[1], rtol=1e-6)
+    np.testing.assert_allclose(landmarks[:, 3], 0.5)
+
+
+@pytest.mark.parametrize("count", [1, 3, 5, 7])
+def test_fixed_batches_are_padded_and_split_like_a_dynamic_one(tmp_path, settings, count):
+    dynamic = OnnxPoseBackend(write_model(tmp_path / "dynamic.onnx"), settings)
+    fixed = [OnnxPoseBackend(write_model(tmp_path / "fixed4.onnx", batch=4, channels_first=True), settings),
+             OnnxPoseBackend(write_model(tmp_path / "fixed1.onnx", batch=1), settings)]
+    assert dynamic.supports_batch
+    assert [(b.supports_batch, b.batch_size, b.channels_first) for b in fixed] == [(False, 4, True),
+                                                                                   (False, 1, False)]
+
+    # Black frames have no pose, so a row landing on the wrong frame shows up as a None in the wrong place
+    frames = gray_frames(*[0 if i % 3 == 1 else 40 + 30 * i for i in range(count)])
+    expected = dynamic.infer_batch(frames, [0.0] * count)
+    expected_world = dynamic.last_world_batch
+    assert [lm is None for lm in expected] == [i % 3 == 1 for i in range(count)]
+
+    for backend in fixed:
+        result = backend.infer_batch(frames, [0.0] * count)
+        assert len(result) == len(backend.last_world_batch) == count
+        for got, want in zip(result + backend.last_world_batch, expected + expected_world):
+            if want is None:
+                assert got is None
+            else:
+                np.testing.assert_allclose(got, want, rtol=1e-5)
+
+
+def test_world_landmarks_follow_their_frame(tmp_path, settings):
+    backend = OnnxPoseBackend(write_model(tmp_path / "pose.onnx", batch=2), settings)
+    frames = gray_frames(60, 0, 200)
+    landmarks = backend.infer_batch(frames, [0.0, 0.1, 0.2])
+    world = backend.last_world_batch
+
+    assert world[1] is None
+    base = (np.arange(39 * 3, dtype=np.float32) / 100).reshape(39, 3)[:NUM_LANDMARKS]
+    offsets = [w[:, :3] - base for w in (world[0], world[2])]
+    # Each frame's brightness is added to every coordinate, brighter frame, bigger offset
+    for offset in offsets:
+        np.testing.assert_allclose(offset, offset[0, 0], atol=1e-5)
+    assert 0 < offsets[0][0, 0] < offsets[1][0, 0]
+    np.testing.assert_array_equal(world[0][:, 3], landmarks[0][:, 3])
+
+    backend.infer(frames[2], 0.3)
+    np.testing.assert_allclose(backend.last_world_landmarks, world[2], rtol=1e-6)
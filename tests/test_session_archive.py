@@ -0,0 +1,120 @@
+"""
+Session archive: commit ordering, crash recovery and zero-copy reads
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import os
+import types
+
+import numpy as np
+import pytest
+
+from src import session_archive
+from src.rep_events import REP_DTYPE, RepEventLog
+from src.session_archive import (
+    ARCHIVE_REP_DTYPE, FRAME_DTYPE, FRAMES_FILE, REPS_FILE, SESSION_DTYPE, SESSIONS_FILE, SessionArchive,
+)
+
+
+def make_frames(count: int, start: float = 0.0) -> np.ndarray:
+    frames = np.zeros(count, dtype=FRAME_DTYPE)
+    frames["timestamp"] = start + np.arange(count) / 10
+    frames["landmarks"] = np.arange(count, dtype=np.float32)[:, None, None] + start
+    return frames
+
+
+def make_reps(*spans) -> np.ndarray:
+    reps = np.zeros(len(spans), dtype=REP_DTYPE)
+    for i, (start, bottom, end) in enumerate(spans):
+        reps[i]["rep"] = i + 1
+        reps[i]["start"], reps[i]["bottom"], reps[i]["end"] = start, bottom, end
+    return reps
+
+
+def file_records(path, name, dtype) -> int:
+    return os.path.getsize(os.path.join(path, name)) // dtype.itemsize
+
+
+def test_reps_are_read_as_views_of_the_mapped_frames(tmp_path):
+    archive = SessionArchive(str(tmp_path), writable=True)
+    archive.append_session("a", "user-1", "squat", make_frames(20), make_reps((0.0, 0.5, 0.9)))
+    archive.append_session("b", "user-2", "squat", make_frames(20, 100.0), make_reps((100.0, 100.3, 100.6)))
+    archive.append_session("c", "user-1", "push-up", make_frames(10, 200.0), make_reps((200.0, 200.2, 200.4)))
+
+    reader = SessionArchive(str(tmp_path))
+    reps = reader.find_reps(user_id="user-1", exercise_type="squat")
+    assert len(reps) == 1 and reps[0]["session"] == 0
+
+    frames = reader.rep_frames(reps[0])
+    assert np.shares_memory(frames, reader.frames)
+    np.testing.assert_array_equal(frames["timestamp"], make_frames(20)["timestamp"][:10])
+    # The bottom at t = 0.5 is the record of the first frame at or after it
+    np.testing.assert_array_equal(reader.bottoms(reps)[0], make_frames(20)["landmarks"][5])
+
+    assert [reader.session_info(i)["session_id"] for i in reader.find_sessions(since=100.0)] == ["b", "c"]
+
+
+def test_crash_before_the_session_row_is_truncated_on_reopen(tmp_path, monkeypatch):
+    path = str(tmp_path)
+    archive = SessionArchive(path, writable=True)
+    archive.append_session("a", "user-1", "squat", make_frames(20), make_reps((0.0, 0.5, 0.9)))
+
+    real_open = open
+
+    def crash_on_session_row(name, mode="r", *args, **kwargs):
+        if name.endswith(SESSIONS_FILE) and mode == "ab":
+            raise OSError("simulated crash")
+        return real_open(name, mode, *args, **kwargs)
+
+    monkeypatch.setattr(session_archive, "open", crash_on_session_row, raising=False)
+    with pytest.raises(OSError):
+        archive.append_session("b", "user-1", "squat", make_frames(30, 100.0), make_reps((100.0, 100.5, 101.0)))
+    monkeypatch.undo()
+    # Frames and reps of "b" reached the disk, its session row did not
+    assert file_records(path, FRAMES_FILE, FRAME_DTYPE) == 50
+    assert file_records(path, REPS_FILE, ARCHIVE_REP_DTYPE) == 2
+
+    reader = SessionArchive(path)
+    assert len(reader.sessions) == 1
+
+    reopened = SessionArchive(path, writable=True)
+    assert file_records(path, FRAMES_FILE, FRAME_DTYPE) == 20
+    assert file_records(path, REPS_FILE, ARCHIVE_REP_DTYPE) == 1
+    assert file_records(path, SESSIONS_FILE, SESSION_DTYPE) == 1
+
+    index = reopened.append_session("c", "user-1", "squat", make_frames(5, 300.0), make_reps((300.0, 300.2, 300.4)))
+    reopened.refresh()
+    np.testing.assert_array_equal(reopened.session_frames(index)["timestamp"], make_frames(5, 300.0)["timestamp"])
+    assert reopened.session_reps(index)[0]["start_frame"] == 20
+
+
+def test_torn_session_row_is_dropped(tmp_path):
+    path = str(tmp_path)
+    SessionArchive(path, writable=True).append_session("a", "user-1", "squat", make_frames(3), make_reps())
+    with open(os.path.join(path, SESSIONS_FILE), "ab") as f:
+        f.write(b"\0" * (SESSION_DTYPE.itemsize // 2))
+    SessionArchive(path, writable=True)
+    assert os.path.getsize(os.path.join(path, SESSIONS_FILE)) == SESSION_DTYPE.itemsize
+
+
+def test_reps_without_frames_are_rejected(tmp_path):
+    archive = SessionArchive(str(tmp_path), writable=True)
+    with pytest.raises(ValueError):
+        archive.append_session("a", "user-1", "squat", make_frames(0), make_reps((0.0, 0.5, 0.9)))
+
+
+def test_recorder_skips_frames_without_a_pose(tmp_path):
+    archive = SessionArchive(str(tmp_path), writable=True)
+    recorder = archive.recorder("a", "user-1", "squat")
+    detector = types.SimpleNamespace(last_landmarks=None, frame_time=0.0, rep_events=RepEventLog())
+
+    recorder.observe(detector)  # no pose yet
+    detector.last_landmarks, detector.frame_time = make_frames(1)["landmarks"][0], 1.0
+    recorder.observe(detector)
+    recorder.observe(detector)  # no pose: the detector still holds the frame at t = 1.0
+    detector.frame_time = 2.0
+    recorder.observe(detector)
+
+    index = recorder.commit()
+    archive.refresh()
+    frames = archive.session_frames(index)
+    assert frames["timestamp"].tolist() == [1.0, 2.0]
@@ -0,0 +1,73 @@
+"""
+Session checkpoints: progress, hold timers and priming survive a restore
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import struct
+
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src.pose_detector import PoseDetector  # noqa: E402
+from src.session_checkpoint import restore_checkpoint, save_checkpoint  # noqa: E402
+from src.system_utils import SystemOptimizer  # noqa: E402
+from traces import situp_frame, squat_frame  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+def test_restore_keeps_progress_and_primes_the_gates(settings):
+    detector = PoseDetector(settings=settings, load_model=False)
+    detector.current_exercise = "squat"
+    for i, angle in enumerate([170, 120, 80, 170, 120, 80]):
+        detector.process_landmarks(squat_frame(angle, 0.0), "squat", 100.0 + i / 30)
+    assert (detector.rep_count, detector.stage) == (1, "down")
+
+    restored = PoseDetector(settings=settings, load_model=False)
+    restore_checkpoint(restored, save_checkpoint(detector))
+    assert (restored.rep_count, restored.stage) == (1, "down")
+    # The symmetry window is full and the pose cache treats the saved pose as settled
+    assert restored.angle_stats.get("knee_asymmetry").count == restored.form.window
+    assert restored.form.current_scores()["frames"] == 0
+    hits = restored.pose_cache.hits
+    restored.process_landmarks(squat_frame(80, 0.0), "squat", 5.0)
+    assert restored.pose_cache.hits == hits + 1
+
+    assert restored.process_landmarks(squat_frame(170, 0.0), "squat", 5.1)[0]
+    assert restored.rep_count == 2
+
+
+def test_restore_primes_the_situp_leg_window(settings):
+    detector = PoseDetector(settings=settings, load_model=False)
+    detector.current_exercise = "sit-up"
+    detector.process_landmarks(situp_frame(120, 0.0), "sit-up", 1.0)
+
+    restored = PoseDetector(settings=settings, load_model=False)
+    restore_checkpoint(restored, save_checkpoint(detector))
+    assert restored.angle_stats.get("situp_leg_angle").count == restored.angle_stats.window
+
+
+def test_wall_sit_hold_continues_on_a_new_clock(settings):
+    detector = PoseDetector(settings=settings, load_model=False)
+    detector.current_exercise = "wall-sit"
+    # Knees near 90 degrees with the torso upright is a wall-sit
+    detector.process_landmarks(squat_frame(95, 0.0), "wall-sit", 1000.0)
+    detector.process_landmarks(squat_frame(96, 0.0), "wall-sit", 1012.0)
+    assert detector.rep_count == 12
+
+    restored = PoseDetector(settings=settings, load_model=False)
+    restore_checkpoint(restored, save_checkpoint(detector))
+    # Another clock after the restore: the hold goes on from 12 s, downtime not counted
+    restored.process_landmarks(squat_frame(95, 0.0), "wall-sit", 3.0)
+    restored.process_landmarks(squat_frame(96, 0.0), "wall-sit", 5.0)
+    assert restored.rep_count == 14
+
+
+def test_unknown_versions_are_rejected(settings):
+    data = bytearray(save_checkpoint(PoseDetector(settings=settings, load_model=False)))
+    struct.pack_into("<B", data, 4, 1)
+    with pytest.raises(ValueError, match="version 1"):
+        restore_checkpoint(PoseDetector(settings=settings, load_model=False), bytes(data))
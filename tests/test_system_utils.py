@@ -0,0 +1,34 @@
+"""
+Hardware profiling: cgroup parsing and capacity estimates
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src import system_utils  # noqa: E402
+from src.inference_backend import TASK_MODEL_FILES  # noqa: E402
+from src.system_utils import SystemOptimizer  # noqa: E402
+
+
+@pytest.mark.parametrize("cpu_max", ["garbage 100000", "200000 0", "max 100000"])
+def test_unusable_cgroup_cpu_quota_is_unknown(monkeypatch, cpu_max):
+    monkeypatch.setattr(system_utils, "read_cgroup_value", lambda *paths: cpu_max)
+    assert system_utils.get_cgroup_cpu_limit() is None
+
+
+def test_unusable_cgroup_memory_limit_is_unknown(monkeypatch):
+    monkeypatch.setattr(system_utils, "read_cgroup_value", lambda *paths: "garbage")
+    assert system_utils.get_cgroup_memory_limit_mb() is None
+
+
+def test_gpu_tier_keeps_the_cpu_bound_without_a_gpu_backend(tmp_path):
+    optimizer = SystemOptimizer()
+    settings = dict(optimizer.get_optimal_settings(), delegate="GPU", model_complexity=1)
+    # No Tasks bundle configured: the legacy solution model runs on the CPU
+    assert optimizer.estimate_capacity(settings)["cpu_bound"] is not None
+
+    (tmp_path / TASK_MODEL_FILES[1]).write_bytes(b"")
+    capacity = optimizer.estimate_capacity(dict(settings, pose_model_dir=str(tmp_path)))
+    assert capacity["inference_device"] == "GPU"
+    assert capacity["cpu_bound"] is None
@@ -0,0 +1,48 @@
+"""
+BatchRepEngine against the live detector on synthetic traces
+Run from the directory that contains the engine as `src/`: python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src.pose_detector import PoseDetector  # noqa: E402
+from src.system_utils import SystemOptimizer  # noqa: E402
+from src.vector_engine import EXERCISE_SIGNALS, BatchRepEngine  # noqa: E402
+from traces import FPS, TRACES, synthetic_trace  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return SystemOptimizer().get_optimal_settings()
+
+
+def test_every_supported_exercise_has_a_trace():
+    assert set(TRACES) == set(EXERCISE_SIGNALS)
+
+
+@pytest.mark.parametrize("exercise_type", sorted(TRACES))
+def test_engine_counts_like_the_detector(settings, exercise_type):
+    traces = np.stack([synthetic_trace(exercise_type, seed) for seed in range(4)], axis=1)
+    engine = BatchRepEngine(exercise_type, capacity=traces.shape[1])
+    slots = np.array([engine.add_session() for _ in range(traces.shape[1])])
+    detectors = [PoseDetector(settings=settings, load_model=False) for _ in slots]
+
+    for i, poses in enumerate(traces):
+        timestamp = i / FPS
+        completed = engine.step(poses, slots, timestamp)
+        expected = [detector.process_landmarks(pose, exercise_type, timestamp)[0]
+                    for detector, pose in zip(detectors, poses)]
+        assert completed.tolist() == expected, f"frame {i}"
+
+    for slot, detector in zip(slots, detectors):
+        state = engine.session_state(slot)
+        assert detector.rep_count > 0
+        assert state["rep_count"] == detector.rep_count
+        assert state["stage"] == detector.stage
+
+
+def test_hold_exercises_are_rejected():
+    with pytest.raises(ValueError, match="hold"):
+        BatchRepEngine("wall-sit")
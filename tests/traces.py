@@ -0,0 +1,83 @@
+"""
+Synthetic landmark traces for the rep-counting tests
+"""
+import numpy as np
+
+FPS = 30.0
+
+
+def place(vertex, reference, angle: float, length: float, turn: float = 1.0):
+    """Point `length` from vertex whose angle to `reference` (at the vertex) is `angle` degrees"""
+    direction = np.arctan2(reference[1] - vertex[1], reference[0] - vertex[0]) + turn * np.radians(angle)
+    return vertex[0] + length * np.cos(direction), vertex[1] + length * np.sin(direction)
+
+
+def blank() -> np.ndarray:
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, 3] = 1.0
+    return landmarks
+
+
+def pushup_frame(angle: float, gate: float) -> np.ndarray:
+    """Side-view plank; gate > 0.5 raises the hips out of the plank"""
+    landmarks = blank()
+    for shoulder, elbow, wrist in ((11, 13, 15), (12, 14, 16)):
+        landmarks[shoulder, :2] = (0.3, 0.5)
+        landmarks[elbow, :2] = (0.3, 0.62)
+        landmarks[wrist, :2] = place((0.3, 0.62), (0.3, 0.5), angle, 0.12, turn=-1.0)
+    landmarks[[23, 24], :2] = (0.55, 0.52 - (0.3 if gate > 0.5 else 0.0))
+    landmarks[[27, 28], :2] = (0.8, 0.54)
+    return landmarks
+
+
+def squat_frame(angle: float, gate: float) -> np.ndarray:
+    """Front-view squat; gate spreads the two knee angles by up to 60 degrees"""
+    landmarks = blank()
+    for hip, knee, ankle, x, offset in ((23, 25, 27, 0.45, 0.0), (24, 26, 28, 0.55, 60 * gate)):
+        landmarks[hip, :2] = (x, 0.5)
+        landmarks[knee, :2] = (x, 0.7)
+        landmarks[ankle, :2] = place((x, 0.7), (x, 0.5), angle - offset, 0.2)
+    landmarks[[11, 12], :2] = ((0.45, 0.3), (0.55, 0.3))
+    return landmarks
+
+
+def situp_frame(angle: float, gate: float) -> np.ndarray:
+    """Side-view sit-up at the given torso angle; gate sweeps the knees from 70 to 120 degrees"""
+    landmarks = blank()
+    hip, knee = (0.5, 0.7), (0.6, 0.6)
+    for h, k, a in ((23, 25, 27), (24, 26, 28)):
+        landmarks[h, :2] = hip
+        landmarks[k, :2] = knee
+        landmarks[a, :2] = place(knee, hip, 70 + 50 * gate, 0.15)
+    landmarks[[11, 12], :2] = place(hip, knee, angle, 0.3, turn=-1.0)
+    return landmarks
+
+
+def tricep_dip_frame(angle: float, gate: float) -> np.ndarray:
+    """Side-view dip; gate > 0.8 takes the hands off the bench"""
+    landmarks = blank()
+    for shoulder, elbow, wrist in ((11, 13, 15), (12, 14, 16)):
+        landmarks[shoulder, :2] = (0.5, 0.3)
+        landmarks[elbow, :2] = (0.6, 0.45)
+        landmarks[wrist, :2] = place((0.6, 0.45), (0.5, 0.3), angle, 0.15)
+    landmarks[[23, 24], :2] = (0.9 if gate > 0.8 else 0.3, 0.5)
+    return landmarks
+
+
+# Exercise -> (frame builder, primary angle range swept by each rep)
+TRACES = {
+    "push-up": (pushup_frame, (60, 175)),
+    "squat": (squat_frame, (70, 175)),
+    "sit-up": (situp_frame, (40, 150)),
+    "tricep-dip": (tricep_dip_frame, (70, 175)),
+}
+
+
+def synthetic_trace(exercise_type: str, seed: int, frames: int = 600) -> np.ndarray:
+    """(T, 33, 4) trace: the primary angle swings through reps while a form gate flickers"""
+    build, (low, high) = TRACES[exercise_type]
+    rng = np.random.default_rng(seed)
+    phase = np.cumsum(rng.uniform(0.15, 0.45, frames))
+    angles = low + (high - low) * (0.5 + 0.5 * np.cos(phase)) + rng.normal(0, 3, frames)
+    gates = rng.uniform(0, 1, frames)
+    return np.stack([build(angle, gate) for angle, gate in zip(angles, gates)])
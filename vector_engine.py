@@ -0,0 +1,209 @@
+"""
+Columnar rep-counting engine
+Holds the state of many sessions doing the same exercise in NumPy columns and
+advances every session's up/down state machine in one vectorized step.
+"""
+import copy
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.landmark_utils import (
+    LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST,
+    RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST,
+    X, Y, joint_angles,
+)
+from src.pose_detector import DETECTOR_THRESHOLDS, HOLD_EXERCISES
+
+# Stage codes (match the strings used by PoseDetector)
+STAGE_NONE, STAGE_UP, STAGE_DOWN = 0, 1, 2
+STAGE_NAMES = {STAGE_NONE: None, STAGE_UP: "up", STAGE_DOWN: "down"}
+
+
+def _pushup_signals(lm, th, smooth):
+    left = joint_angles(lm, LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST)
+    right = joint_angles(lm, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)
+    avg = (left + right) / 2
+    body = joint_angles(lm, LEFT_SHOULDER, LEFT_HIP, LEFT_ANKLE)
+
+    # The plank form rules: inclusive ranges, judged on the current frame
+    valid = ((body >= th["body_min_angle"]) & (body <= th["body_max_angle"]) &
+             (np.abs(lm[:, LEFT_SHOULDER, Y] - lm[:, LEFT_HIP, Y]) <= th["shoulder_hip_offset"]) &
+             (lm[:, LEFT_WRIST, Y] >= lm[:, LEFT_SHOULDER, Y]) &
+             (lm[:, RIGHT_WRIST, Y] >= lm[:, RIGHT_SHOULDER, Y]))
+    # Leaving the plank keeps the stage (like detect_pushup)
+    return avg, valid, np.zeros_like(valid), avg > th["up_angle"], avg < th["down_angle"]
+
+
+def _squat_signals(lm, th, smooth):
+    left = joint_angles(lm, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+    right = joint_angles(lm, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+    avg = (left + right) / 2
+    # The LEGS_UNEVEN form rule judges the mean asymmetry of recent frames
+    valid = smooth("knee_asymmetry", np.abs(left - right)) <= th["leg_symmetry"]
+    return avg, valid, np.zeros_like(valid), avg > th["up_angle"], avg < th["down_angle"]
+
+
+def _situp_signals(lm, th, smooth):
+    left_leg = joint_angles(lm, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+    right_leg = joint_angles(lm, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+    torso = joint_angles(lm, LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)
+    # Like detect_situp, the pyramid check uses the mean leg angle of recent frames
+    valid = smooth("situp_leg_angle", (left_leg + right_leg) / 2) < th["knee_bent_angle"]
+    # Sitting up is the "up" stage and has the *smaller* torso angle
+    return torso, valid, np.zeros_like(valid), torso < th["up_angle"], torso > th["down_angle"]
+
+
+def _tricep_dip_signals(lm, th, smooth):
+    left = joint_angles(lm, LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST)
+    right = joint_angles(lm, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)
+    avg = (left + right) / 2
+    avg_wrist_x = (lm[:, LEFT_WRIST, X] + lm[:, RIGHT_WRIST, X]) / 2
+    valid = avg_wrist_x > lm[:, LEFT_HIP, X] + th["wrist_offset"]
+    # Hands off the bench clears the stage (like detect_tricep_dip)
+    return avg, valid, ~valid, avg > th["up_angle"], avg < th["down_angle"]
+
+
+EXERCISE_SIGNALS = {
+    "push-up": _pushup_signals,
+    "squat": _squat_signals,
+    "sit-up": _situp_signals,
+    "tricep-dip": _tricep_dip_signals,
+}
+
+
+class BatchRepEngine:
+    """
+    Struct-of-arrays state for up to `capacity` sessions of one exercise.
+
+    Thresholds default to DETECTOR_THRESHOLDS and may be overridden with
+    scalars or with per-session arrays of length `capacity`. Gates the
+    detector smooths (squat leg symmetry, the sit-up knee bend) use the mean
+    of each session's last `window` frames, like PoseDetector.angle_stats.
+
+    Counts match PoseDetector.process_landmarks frame for frame, except that
+    the engine evaluates every frame: the detector's pose cache skips a still
+    body once its smoothing windows have settled, so a smoothed gate sitting
+    exactly on its threshold can resolve differently. Holds (plank,
+    wall-sit) have no reps and are not supported.
+    """
+
+    def __init__(self, exercise_type: str, capacity: int = 64,
+                 thresholds: Optional[Dict] = None, window: int = 5):
+        if exercise_type in HOLD_EXERCISES:
+            raise ValueError(f"'{exercise_type}' is a hold; BatchRepEngine only counts reps")
+        if exercise_type not in EXERCISE_SIGNALS:
+            raise ValueError(f"No vectorized state machine for '{exercise_type}' "
+                             f"(supported: {', '.join(EXERCISE_SIGNALS)})")
+        self.exercise_type = exercise_type
+        self.signals = EXERCISE_SIGNALS[exercise_type]
+        self.thresholds = copy.deepcopy(DETECTOR_THRESHOLDS[exercise_type])
+        if thresholds:
+            self.thresholds.update(thresholds)
+        self.window = window
+
+        self.capacity = 0
+        self.history = {}  # smoothed signal -> (capacity, window) recent values
+        self.pushed = np.zeros(0, dtype=np.int64)  # frames pushed per session
+        self.active = np.zeros(0, dtype=bool)
+        self.stage = np.zeros(0, dtype=np.int8)
+        self.rep_count = np.zeros(0, dtype=np.int32)
+        self.last_rep_time = np.zeros(0, dtype=np.float64)
+        self.last_angle = np.zeros(0, dtype=np.float32)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        extra = capacity - self.capacity
+        self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+        self.stage = np.concatenate([self.stage, np.zeros(extra, dtype=np.int8)])
+        self.rep_count = np.concatenate([self.rep_count, np.zeros(extra, dtype=np.int32)])
+        self.last_rep_time = np.concatenate([self.last_rep_time, np.full(extra, np.nan)])
+        self.last_angle = np.concatenate([self.last_angle, np.full(extra, np.nan, dtype=np.float32)])
+        self.pushed = np.concatenate([self.pushed, np.zeros(extra, dtype=np.int64)])
+        for name, values in self.history.items():
+            self.history[name] = np.concatenate([values, np.zeros((extra, self.window))])
+        for name, value in self.thresholds.items():
+            if isinstance(value, np.ndarray) and len(value) < capacity:
+                self.thresholds[name] = np.concatenate([value, np.full(capacity - len(value), value[-1])])
+        self.capacity = capacity
+
+    def add_session(self) -> int:
+        """Claim a free slot and return its index"""
+        free = np.flatnonzero(~self.active)
+        if len(free) == 0:
+            self._grow(self.capacity * 2)
+            free = np.flatnonzero(~self.active)
+        slot = int(free[0])
+        self.active[slot] = True
+        self.reset_session(slot)
+        return slot
+
+    def remove_session(self, slot: int):
+        self.active[slot] = False
+
+    def reset_session(self, slot: int):
+        self.stage[slot] = STAGE_NONE
+        self.rep_count[slot] = 0
+        self.last_rep_time[slot] = np.nan
+        self.last_angle[slot] = np.nan
+        self.pushed[slot] = 0
+
+    def _thresholds_for(self, slots: np.ndarray) -> Dict:
+        return {name: value[slots] if isinstance(value, np.ndarray) else value
+                for name, value in self.thresholds.items()}
+
+    def _smoother(self, slots: np.ndarray):
+        """smooth(name, values) for this step: push one value per session, return the window means"""
+        count = np.minimum(self.pushed[slots] + 1, self.window)
+        column = self.pushed[slots] % self.window
+
+        def smooth(name: str, values: np.ndarray) -> np.ndarray:
+            history = self.history.get(name)
+            if history is None:
+                history = self.history[name] = np.zeros((self.capacity, self.window))
+            history[slots, column] = values
+            # Columns not written since the session was reset hold stale values; only sum the filled ones
+            filled = np.arange(self.window) < count[:, None]
+            return np.where(filled, history[slots], 0.0).sum(axis=1) / count
+
+        return smooth
+
+    def step(self, landmarks: np.ndarray, slots: Optional[np.ndarray] = None,
+             timestamp: float = 0.0) -> np.ndarray:
+        """
+        Advance the given sessions by one frame.
+
+        landmarks: (N, 33, 4) array, one pose per session in `slots`
+        slots:     (N,) session indices; None means slots 0..N-1
+        Returns a (N,) bool array of sessions that completed a rep this frame.
+        """
+        if slots is None:
+            slots = np.arange(len(landmarks))
+        slots = np.asarray(slots)
+
+        th = self._thresholds_for(slots)
+        angle, valid, clear, is_up, is_down = self.signals(landmarks, th, self._smoother(slots))
+        self.pushed[slots] += 1
+
+        stage = self.stage[slots]
+        up = valid & is_up
+        down = valid & ~is_up & is_down
+        rep_complete = up & (stage == STAGE_DOWN)
+
+        stage = np.where(up, STAGE_UP, np.where(down, STAGE_DOWN, stage))
+        stage = np.where(clear, STAGE_NONE, stage)
+
+        self.stage[slots] = stage
+        self.rep_count[slots] += rep_complete
+        self.last_angle[slots] = angle
+        self.last_rep_time[slots[rep_complete]] = timestamp
+        return rep_complete
+
+    def session_state(self, slot: int) -> Dict:
+        return {
+            "exercise": self.exercise_type,
+            "stage": STAGE_NAMES[int(self.stage[slot])],
+            "rep_count": int(self.rep_count[slot]),
+            "last_rep_time": float(self.last_rep_time[slot]),
+            "angle": float(self.last_angle[slot]),
+        }
@@ -0,0 +1,230 @@
+"""
+Prefetching video reader for offline jobs
+Decodes on a background thread (through an ffmpeg pipe when ffmpeg is
+installed, OpenCV otherwise) at the inference resolution, so decoding overlaps
+with inference instead of competing with it. Segments can be read
+independently for chunked parallel processing.
+"""
+import functools
+import queue
+import re
+import shutil
+import subprocess
+import threading
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class VideoFrame(NamedTuple):
+    index: int          # frame number in the source video
+    timestamp: float    # seconds from the start of the video
+    image: np.ndarray   # BGR, at the requested size
+
+
+def probe_video(path: str) -> dict:
+    """fps, frame count, size and duration of a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {
+            "fps": fps,
+            "frame_count": frames,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "duration": frames / fps,
+        }
+    finally:
+        cap.release()
+
+
+def video_segments(path: str, count: int) -> List[Tuple[float, float]]:
+    """Split a video into `count` (start, end) time ranges on frame boundaries"""
+    info = probe_video(path)
+    bounds = np.linspace(0, info["frame_count"], count + 1).round().astype(int)
+    return [(float(a / info["fps"]), float(b / info["fps"])) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+@functools.lru_cache(maxsize=1)
+def ffmpeg_passthrough_option() -> str:
+    """-fps_mode needs ffmpeg 5.1+; older releases only know the (since deprecated) -vsync"""
+    try:
+        output = subprocess.run(["ffmpeg", "-hide_banner", "-version"], capture_output=True,
+                                text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return "-vsync"
+    match = re.search(r"ffmpeg version n?(\d+)\.(\d+)", output)
+    # Git snapshots ("N-12345-g...") are newer than any release
+    if match and (int(match.group(1)), int(match.group(2))) < (5, 1):
+        return "-vsync"
+    return "-fps_mode"
+
+
+_END = object()
+
+
+class VideoReader:
+    """
+    Iterate over `VideoFrame`s of [start, end) seconds of a video file.
+
+    size:      (width, height) to decode to, e.g. the detector's camera size;
+               None keeps the source size
+    every_n:   keep every n-th frame (like process_every_n_frames)
+    prefetch:  decoded frames buffered ahead of the consumer
+    backend:   "ffmpeg", "opencv", or None to use ffmpeg when available
+    """
+
+    def __init__(self, path: str, size: Optional[Tuple[int, int]] = None,
+                 start: float = 0.0, end: Optional[float] = None, every_n: int = 1,
+                 prefetch: int = 8, backend: Optional[str] = None):
+        self.path = path
+        self.info = probe_video(path)
+        self.fps = self.info["fps"]
+        self.size = tuple(size) if size else (self.info["width"], self.info["height"])
+        self.start = start
+        self.end = end
+        self.every_n = max(1, every_n)
+        if backend is None:
+            backend = "ffmpeg" if shutil.which("ffmpeg") else "opencv"
+        self.backend = backend
+
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._thread = None
+        self._process = None
+        self.frames_decoded = 0
+
+    # ------------------
+    # Decoding (background thread)
+    # ------------------
+    def _first_index(self) -> int:
+        return int(round(self.start * self.fps))
+
+    def _last_index(self) -> Optional[int]:
+        return int(round(self.end * self.fps)) if self.end is not None else None
+
+    def _frames_ffmpeg(self) -> Iterator[np.ndarray]:
+        width, height = self.size
+        command = ["ffmpeg", "-v", "error", "-nostdin"]
+        if self.start > 0:
+            # Input-side seek: jumps to the nearest keyframe, then decodes accurately to start
+            command += ["-ss", f"{self.start:.6f}"]
+        command += ["-i", self.path]
+        if self.end is not None:
+            command += ["-t", f"{self.end - self.start:.6f}"]
+        # Scaling happens inside the decode pipeline; no full-size frame reaches Python
+        command += ["-vf", f"scale={width}:{height}:flags=area", ffmpeg_passthrough_option(), "passthrough",
+                    "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+
+        frame_bytes = width * height * 3
+        # With -v error, stderr only carries the failure reason, so the pipe cannot fill up
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=frame_bytes)
+        self._process = process
+        try:
+            while True:
+                buffer = bytearray(frame_bytes)
+                view = memoryview(buffer)
+                filled = 0
+                while filled < frame_bytes:
+                    n = process.stdout.readinto(view[filled:])
+                    if not n:
+                        # EOF: end of the video, unless ffmpeg failed (and not because close() killed it)
+                        if process.wait() != 0 and not self._stop.is_set():
+                            error = process.stderr.read().decode("utf-8", errors="replace").strip()
+                            raise RuntimeError(f"ffmpeg exited with code {process.returncode}: {error}")
+                        return
+                    filled += n
+                yield np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+    def _frames_opencv(self) -> Iterator[np.ndarray]:
+        cap = cv2.VideoCapture(self.path)
+        try:
+            if self.start > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, self._first_index())
+            resize = self.size != (self.info["width"], self.info["height"])
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                yield cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA) if resize else frame
+        finally:
+            cap.release()
+
+    def _decode(self):
+        frames = self._frames_ffmpeg() if self.backend == "ffmpeg" else self._frames_opencv()
+        last = self._last_index()
+        index = self._first_index()
+        try:
+            for image in frames:
+                if self._stop.is_set() or (last is not None and index >= last):
+                    break
+                if (index - self._first_index()) % self.every_n == 0:
+                    self.frames_decoded += 1
+                    self._put(VideoFrame(index, index / self.fps, image))
+                index += 1
+        except Exception as e:
+            self._put(e)
+        finally:
+            frames.close()
+            self._put(_END)
+
+    def _put(self, item):
+        # Wait for the consumer, but give up as soon as the reader is closed
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    # ------------------
+    # Consumer side
+    # ------------------
+    def __iter__(self) -> Iterator[VideoFrame]:
+        if self._thread is not None:
+            raise RuntimeError("A VideoReader can only be iterated once")
+        self._thread = threading.Thread(target=self._decode, name="video-decode", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        # Unblocks a decode thread waiting on the pipe; the thread reaps the process
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_frames(path: str, settings: Optional[dict] = None, **kwargs) -> Iterator[VideoFrame]:
+    """Frames at the detector's camera resolution and frame skip (see SystemOptimizer settings)"""
+    if settings is not None:
+        kwargs.setdefault("size", (settings["camera_width"], settings["camera_height"]))
+        kwargs.setdefault("every_n", settings["process_every_n_frames"])
+    return iter(VideoReader(path, **kwargs))
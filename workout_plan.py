@@ -0,0 +1,218 @@
+"""
+Workout plan runner
+Runs an ordered list of exercises with rep/hold targets and rest periods,
+resolving every step up front and pre-warming the pose model for the next
+exercise in the background so transitions never stall a frame.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.exercise_categories import get_exercise_info
+from src.pose_detector import HOLD_EXERCISES, PoseDetector
+
+# Model complexity relative to the hardware tier: fast cardio moves can use a
+# lighter model, slow holds can afford a heavier one
+EXERCISE_MODEL_OFFSET = {
+    "jumping-jack": -1,
+    "high-knees": -1,
+    "burpee": -1,
+    "plank": +1,
+    "wall-sit": +1,
+}
+
+DEFAULT_REST_SECONDS = 20
+
+
+class ModelPool:
+    """
+    MediaPipe Pose instances keyed by model complexity.
+    Models are built on a background thread so the frame loop never waits.
+    """
+
+    def __init__(self, detector: PoseDetector):
+        self.detector = detector
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-prewarm")
+        self.models = {}
+        self.pending = {}
+        self.failed = set()  # complexities whose model could not be built
+
+    def prewarm(self, complexity: int):
+        if complexity in self.models or complexity in self.pending or complexity in self.failed:
+            return
+        self.pending[complexity] = self.executor.submit(self.detector.create_model, complexity)
+
+    def get(self, complexity: int):
+        """Return the model if it is ready, otherwise None (never blocks)"""
+        future = self.pending.get(complexity)
+        if future is not None and future.done():
+            del self.pending[complexity]
+            try:
+                self.models[complexity] = future.result()
+            except Exception as e:
+                # Callers keep their current model
+                print(f"⚠️  Could not build pose model (complexity {complexity}): {e}")
+                self.failed.add(complexity)
+        return self.models.get(complexity)
+
+    def put(self, complexity: int, model):
+        self.models[complexity] = model
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        models = list(self.models.values())
+        for future in self.pending.values():
+            if future.exception() is None:
+                models.append(future.result())
+        for model in models:
+            model.close()
+        self.models = {}
+        self.pending = {}
+
+
+def compile_plan(plan: List[Dict], base_complexity: int) -> List[Dict]:
+    """
+    Validate a plan and resolve everything a step needs before the workout starts.
+
+    Each plan entry: {"id": "squat", "reps": 15} or {"id": "plank", "hold": 30},
+    optionally with "rest" (seconds after the step) and "model_complexity".
+    """
+    steps = []
+    for i, entry in enumerate(plan):
+        exercise_id = entry["id"]
+        info = get_exercise_info(exercise_id)
+        if info is None:
+            raise ValueError(f"Step {i + 1}: unknown exercise '{exercise_id}'")
+
+        is_hold = exercise_id in HOLD_EXERCISES
+        target = entry.get("hold" if is_hold else "reps")
+        if target is None:
+            raise ValueError(f"Step {i + 1}: '{exercise_id}' needs a "
+                             f"{'hold' if is_hold else 'reps'} target")
+
+        complexity = entry.get("model_complexity",
+                               base_complexity + EXERCISE_MODEL_OFFSET.get(exercise_id, 0))
+        steps.append({
+            "id": exercise_id,
+            "display_name": info["display_name"],
+            "is_hold": is_hold,
+            "target": target,
+            "rest": entry.get("rest", DEFAULT_REST_SECONDS),
+            "model_complexity": int(np.clip(complexity, 0, 2)),
+        })
+    return steps
+
+
+class WorkoutPlanRunner:
+    """Drives one detector through a compiled plan, frame by frame"""
+
+    def __init__(self, plan: List[Dict], detector: Optional[PoseDetector] = None):
+        self.detector = detector or PoseDetector()
+        base_complexity = self.detector.settings['model_complexity']
+        self.steps = compile_plan(plan, base_complexity)
+
+        self.pool = ModelPool(self.detector)
+        if self.detector.pose is not None:
+            self.pool.put(base_complexity, self.detector.pose)
+        self.active_complexity = base_complexity
+
+        # Warm every distinct model the plan needs, first step first
+        for step in self.steps:
+            self.pool.prewarm(step["model_complexity"])
+
+        self.step_index = 0
+        self.phase = "exercise"
+        self.rest_until = None
+        self._start_step(0)
+
+    @property
+    def current_step(self) -> Optional[Dict]:
+        if self.step_index >= len(self.steps):
+            return None
+        return self.steps[self.step_index]
+
+    def _start_step(self, index: int):
+        self.step_index = index
+        step = self.current_step
+        if step is None:
+            self.phase = "done"
+            return
+        self.phase = "exercise"
+        self.detector.current_exercise = step["id"]
+        self.detector.reset()
+        self._switch_model(step["model_complexity"])
+
+    def _switch_model(self, complexity: int):
+        if complexity == self.active_complexity:
+            return
+        model = self.pool.get(complexity)
+        # Not warm yet: keep the current model rather than stalling a frame
+        if model is not None:
+            self.detector.pose = model
+            self.active_complexity = complexity
+
+    def process_frame(self, frame, timestamp: float) -> Tuple[np.ndarray, Dict]:
+        """
+        Returns the annotated frame and a status dict for the UI. In every
+        phase the frame comes from the detector's pool: hand it back with
+        detector.release_frame() once shown.
+        """
+        if self.phase == "done":
+            status = {"phase": "done", "feedback": "WORKOUT COMPLETE! 🏆"}
+            return self.detector.frame_pool.copy(frame), status
+
+        if self.phase == "rest":
+            remaining = self.rest_until - timestamp
+            if remaining > 0:
+                next_step = self.steps[self.step_index + 1]
+                status = {"phase": "rest", "rest_remaining": remaining,
+                          "feedback": f"REST {int(remaining) + 1}s - NEXT: {next_step['display_name']}"}
+                return self.detector.frame_pool.copy(frame), status
+            self._start_step(self.step_index + 1)
+
+        step = self.current_step
+        # The model for this step may have finished warming since the transition
+        self._switch_model(step["model_complexity"])
+
+        image, rep_complete, feedback, count = self.detector.process_frame(frame, step["id"], timestamp)
+        status = {
+            "phase": "exercise",
+            "step": self.step_index + 1,
+            "total_steps": len(self.steps),
+            "exercise": step["id"],
+            "progress": count,
+            "target": step["target"],
+            "rep_complete": rep_complete,
+            "feedback": feedback,
+        }
+
+        if count >= step["target"]:
+            self._finish_step(timestamp)
+            status["step_complete"] = True
+        return image, status
+
+    def _finish_step(self, timestamp: float):
+        step = self.current_step
+        print(f"✅ Step {self.step_index + 1}/{len(self.steps)} complete: {step['display_name']}")
+        if self.step_index + 1 >= len(self.steps):
+            self.step_index += 1
+            self.phase = "done"
+            return
+
+        next_step = self.steps[self.step_index + 1]
+        self.pool.prewarm(next_step["model_complexity"])
+        if step["rest"] > 0:
+            self.phase = "rest"
+            self.rest_until = timestamp + step["rest"]
+        else:
+            self._start_step(self.step_index + 1)
+
+    def skip_rest(self):
+        if self.phase == "rest":
+            self._start_step(self.step_index + 1)
+
+    def release(self):
+        # The detector's current model belongs to the pool
+        self.detector.pose = None
+        self.pool.close()